@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of the per-turn orchestration overhead of PersonaAgent as the dialogue grows.
+
+Uses a zero-latency dummy LLM, so the measured time is only sdialog's own overhead (memory and dialogue state
+bookkeeping plus orchestrators). With the incrementally maintained ``DialogState`` the per-turn time should stay
+flat as the dialogue grows.
+
+Usage:
+    python benchmarks/bench_dialog_state.py [--turns 2000] [--orchestrators 4]
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import argparse
+
+from time import perf_counter
+
+from sdialog.personas import PersonaAgent, Persona
+from sdialog.orchestrators import (LengthOrchestrator, ChangeMindOrchestrator,
+                                   SimpleReflexOrchestrator, InstructionListOrchestrator)
+
+
+class DummyLLM:
+    seed = 0
+    num_predict = None
+
+    def invoke(self, memory):
+        return type("Msg", (), {"content": "Sure, sounds good.", "response_metadata": {}})()
+
+    def __str__(self):
+        return "dummy"
+
+
+def main(n_turns: int = 2000, n_orchestrators: int = 4, window: int = 100):
+    orchestrators = [LengthOrchestrator(min=3),
+                     InstructionListOrchestrator({1: "Ask for the price."}),
+                     SimpleReflexOrchestrator(lambda utt: "problem" in utt, "Apologize."),
+                     ChangeMindOrchestrator(probability=0)]
+    agent = PersonaAgent(DummyLLM(), Persona(name="A"), name="A",
+                         orchestrators=[orchestrators[ix % len(orchestrators)].clone()
+                                        for ix in range(n_orchestrators)])
+    agent.reset(0)
+
+    print(f"{'turns':>8} {'us/turn':>10}")
+    start = perf_counter()
+    for turn in range(1, n_turns + 1):
+        agent("How much is it?")
+        if turn % window == 0:
+            elapsed = perf_counter() - start
+            print(f"{turn:>8} {elapsed / window * 1e6:>10.1f}")
+            start = perf_counter()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--orchestrators", type=int, default=4)
+    args = parser.parse_args()
+    main(args.turns, args.orchestrators)
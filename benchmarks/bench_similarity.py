@@ -0,0 +1,64 @@
+"""
+Recall/latency benchmark of the similarity search backends (``sdialog.similarity``) against the previous full
+similarity + ``argsort`` approach, on a synthetic clustered embedding table (e.g. a large merged action inventory).
+
+Usage:
+    python benchmarks/bench_similarity.py [--n 50000] [--dim 768] [--k 5] [--queries 200]
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import argparse
+import numpy as np
+
+from time import perf_counter
+
+from sdialog.similarity import ExactIndex, IVFIndex
+
+
+def main(n: int = 50000, dim: int = 768, k: int = 5, n_queries: int = 200, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 100, 1), dim))
+    embs = (centers[rng.integers(len(centers), size=n)] + rng.normal(scale=.5, size=(n, dim))).astype(np.float32)
+    queries = (embs[rng.integers(n, size=n_queries)]
+               + rng.normal(scale=.5, size=(n_queries, dim))).astype(np.float32)
+
+    # Previous approach: full cosine similarity matrix row + full argsort
+    norm_embs = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+    start = perf_counter()
+    reference = []
+    for query in queries:
+        sims = norm_embs @ (query / np.linalg.norm(query))
+        reference.append(set(np.argsort(-sims)[:k]))
+    baseline = (perf_counter() - start) / n_queries
+
+    backends = [("exact float32", lambda: ExactIndex(embs, "float32")),
+                ("exact float16", lambda: ExactIndex(embs, "float16")),
+                ("exact int8", lambda: ExactIndex(embs, "int8")),
+                ("ivf float32 (n_probe=4)", lambda: IVFIndex(embs, "float32", n_probe=4)),
+                ("ivf float32 (n_probe=16)", lambda: IVFIndex(embs, "float32", n_probe=16)),
+                ("ivf int8 (n_probe=16)", lambda: IVFIndex(embs, "int8", n_probe=16))]
+
+    print(f"{n} x {dim} embeddings, top-{k}, {n_queries} queries")
+    print(f"{'backend':<26} {'build (s)':>10} {'ms/query':>10} {'speedup':>8} {'recall@k':>9} {'MB':>8}")
+    print(f"{'argsort float32':<26} {'-':>10} {baseline * 1e3:>10.3f} {1:>8.1f} {1:>9.3f} {embs.nbytes / 2**20:>8.1f}")
+    for name, build in backends:
+        start = perf_counter()
+        index = build()
+        build_time = perf_counter() - start
+        start = perf_counter()
+        results = [set(index.search(query, k)[0]) for query in queries]
+        latency = (perf_counter() - start) / n_queries
+        recall = np.mean([len(res & ref) / k for res, ref in zip(results, reference)])
+        print(f"{name:<26} {build_time:>10.2f} {latency * 1e3:>10.3f} {baseline / latency:>8.1f} "
+              f"{recall:>9.3f} {index.embs.nbytes / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.n, args.dim, args.k, args.queries)
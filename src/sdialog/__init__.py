@@ -8,6 +8,7 @@ supports dialogue orchestration, scenario management, and flexible serialization
 Main components:
 
     - Dialog, Turn, Event: Data structures for representing dialogues and their events.
+    - DialogState: Incrementally maintained view of the dialogue, as seen by an agent.
     - Persona and PersonaAgent: For defining and simulating role-played agents.
     - Orchestrators: For controlling agent behavior during dialogue generation.
     - Utility functions for serialization, pretty-printing, and file I/O.
@@ -20,6 +21,7 @@ import re
 import json
 import subprocess
 
+from functools import lru_cache
 from pydantic import BaseModel, Field
 from typing import List, Union, Optional, Any
 from print_color import print
@@ -30,10 +32,12 @@ from .util import make_serializable
 __version__ = "0.0.2"
 
 
+@lru_cache(maxsize=1)
 def _get_dynamic_version() -> str:
     """ Retrieves the current version of the package, appending the current git commit hash if available."""
     try:
-        commit_hash = subprocess.check_output(["git", "rev-parse", "HEAD"]).strip().decode("utf-8")
+        commit_hash = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                              stderr=subprocess.DEVNULL).strip().decode("utf-8")
         # If not a valid commit hash, set to empty string
         if re.match(r"\b[0-9a-f]{5,40}\b", commit_hash):
             return f"{__version__}+{commit_hash}"
@@ -88,7 +92,7 @@ class Dialog(BaseModel):
     :ivar seed: The random seed used for generation.
     :vartype seed: Optional[int]
     :ivar dialogId: Unique identifier for the dialogue.
-    :vartype dialogId: Optional[int]
+    :vartype dialogId: Optional[Union[int, str]]
     :ivar complete: Whether the dialogue is complete.
     :vartype complete: Optional[bool]
     :ivar personas: Personas used in the dialogue, mapping speaker names to their attributes.
@@ -98,16 +102,23 @@ class Dialog(BaseModel):
     :vartype turns: List[Turn]
     :ivar events: List of dialogue events (optional).
     :vartype events: Optional[List[Event]]
+    :ivar discard: Whether the dialogue was marked to be discarded (e.g. by a degeneration watchdog).
+    :vartype discard: Optional[bool]
+    :ivar stats: Generation stats (timing and token counts of LLM, orchestrator and encoder calls), if profiled
+                 (see :mod:`sdialog.profiling`).
+    :vartype stats: Optional[dict]
     """
     formatVersion: Optional[str] = Field(default_factory=_get_dynamic_version)  # Version of the format
     model: Optional[str] = None  # the model used to generate the dialogue
     seed: Optional[int] = None  # the seed used to generated
-    dialogId: Optional[int] = None
+    dialogId: Optional[Union[int, str]] = None
     complete: Optional[bool] = None
     personas: Optional[dict[str, dict[str, Any]]] = None  # personas used in the dialogue
     scenario: Optional[Union[dict, str]] = None  # the scenario used to generated the dialogue
     turns: List[Turn]  # the list of turns of the conversation
     events: Optional[List[Event]] = None
+    discard: Optional[bool] = None  # whether the dialogue should be discarded (e.g. degenerated)
+    stats: Optional[dict] = None  # generation stats (if profiled)
 
     def __len__(self):
         """
@@ -257,9 +268,104 @@ class Instruction(BaseModel):
     :vartype text: str
     :ivar events: Associated events (optional).
     :vartype events: Optional[Union[Event, List[Event]]]
+    :ivar response: Speculative response (optional). If given, and no other instruction is provided in the same
+                    turn, the agent commits it as its response instead of generating a new one.
+    :vartype response: Optional[str]
     """
     text: str = None
     events: Optional[Union[Event, List[Event]]] = None  # extra events
+    response: Optional[str] = None  # speculative response (e.g. an already generated lookahead response)
+
+
+class DialogState:
+    """
+    Incrementally maintained view of a dialogue (as seen by an agent) that can be read in constant time.
+
+    :ivar turns: List of dialogue turns so far (should be treated as read-only).
+    :vartype turns: List[Turn]
+    :ivar speaker_turns: Number of turns per speaker.
+    :vartype speaker_turns: dict[str, int]
+    :ivar last_utterances: Last utterance per speaker.
+    :vartype last_utterances: dict[str, str]
+    """
+    def __init__(self):
+        self.turns = []
+        self.speaker_turns = {}
+        self.last_utterances = {}
+
+    def __len__(self):
+        """
+        Returns the number of turns in the dialogue.
+
+        :return: Number of turns.
+        :rtype: int
+        """
+        return len(self.turns)
+
+    def add(self, speaker: Optional[str], text: str):
+        """
+        Adds a new turn to the dialogue state.
+
+        :param speaker: The speaker of the turn.
+        :type speaker: Optional[str]
+        :param text: The utterance text.
+        :type text: str
+        """
+        self.turns.append(Turn(speaker=speaker, text=text))
+        self.speaker_turns[speaker] = self.speaker_turns.get(speaker, 0) + 1
+        self.last_utterances[speaker] = text
+
+    def n_turns(self, speaker: Optional[str] = None) -> int:
+        """
+        Returns the number of turns of a given speaker (or of the whole dialogue if no speaker is given).
+
+        :param speaker: The speaker.
+        :type speaker: Optional[str]
+        :return: Number of turns.
+        :rtype: int
+        """
+        return self.speaker_turns.get(speaker, 0) if speaker is not None else len(self.turns)
+
+    def last_utterance(self, speaker: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the last utterance of a given speaker (`None` for the other speaker).
+
+        :param speaker: The speaker.
+        :type speaker: Optional[str]
+        :return: The last utterance, or None if the speaker has not spoken yet.
+        :rtype: Optional[str]
+        """
+        return self.last_utterances.get(speaker)
+
+    def last_turn(self) -> Optional[Turn]:
+        """
+        Returns the last turn of the dialogue.
+
+        :return: The last turn, or None if the dialogue is empty.
+        :rtype: Optional[Turn]
+        """
+        return self.turns[-1] if self.turns else None
+
+    def clear(self):
+        """
+        Clears the dialogue state.
+        """
+        self.turns = []
+        self.speaker_turns = {}
+        self.last_utterances = {}
+
+    def copy(self) -> "DialogState":
+        """
+        Returns a copy of the dialogue state (turns are shared).
+
+        :return: The copied state.
+        :rtype: DialogState
+        """
+        state = DialogState()
+        state.turns = list(self.turns)
+        state.speaker_turns = dict(self.speaker_turns)
+        state.last_utterances = dict(self.last_utterances)
+        return state
 
 
 def _print_dialog(dialog: Union[Dialog, dict], scenario: bool = False, orchestration: bool = False):
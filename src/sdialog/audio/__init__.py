@@ -12,6 +12,7 @@ import soundfile as sf
 from kokoro import KPipeline
 
 from sdialog import Dialog
+from sdialog import profiling
 
 
 pipeline = KPipeline(lang_code='a')
@@ -58,9 +59,10 @@ def generate_utterance(text: str, persona: dict, voice: str = "af_heart") -> np.
     :rtype: np.ndarray
     """
 
-    generator = pipeline(text, voice=voice)
+    with profiling.span("tts", voice):
+        generator = pipeline(text, voice=voice)
 
-    gs, ps, audio = next(iter(generator))
+        gs, ps, audio = next(iter(generator))
 
     return audio
 
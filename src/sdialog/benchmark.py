@@ -0,0 +1,497 @@
+"""
+benchmark: Generation Throughput Benchmarks for sdialog
+
+This module provides a benchmark suite to measure sdialog's own overhead and how it scales, independently of any
+real LLM backend. It includes a configurable mock chat model (:class:`MockChatModel`, with fixed or sampled latency,
+token rate and STOP-word behavior), an offline sentence encoder (:class:`HashingEncoder`) and a synthetic STAR-like
+dataset (:func:`make_synthetic_star`) to benchmark the dialogue generators, ``dialog_with`` with each orchestrator
+type and the STAR agent builders. Results (dialogues/sec, per-turn overhead and peak memory) are stored as JSON
+so that regressions can be detected between versions:
+
+.. code-block:: bash
+
+    python -m sdialog.benchmark run --output results-new.json
+    python -m sdialog.benchmark compare results-old.json results-new.json
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import re
+import sys
+import copy
+import json
+import time
+import zlib
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+
+from typing import List, Dict, Callable
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from . import profiling, _get_dynamic_version
+from .datasets import STAR
+from .personas import Persona, PersonaAgent
+from .generators import DialogGenerator, PersonaDialogGenerator
+from .embeddings import register_sentence_encoder
+from .orchestrators import (LengthOrchestrator, ChangeMindOrchestrator, SimpleReflexOrchestrator,
+                            SimpleResponseOrchestrator, InstructionListOrchestrator, FlowGraphOrchestrator)
+
+ENCODER_NAME = "sdialog-benchmark-hashing-encoder"
+WORDS = ("sure", "the", "price", "is", "fine", "thanks", "could", "you", "tell", "me", "more", "about", "it",
+         "booking", "hotel", "table", "tonight", "for", "two", "people", "please", "name", "great", "okay")
+
+
+class MockChatModel:
+    """
+    Mock chat model with a configurable latency model, to benchmark sdialog without a real LLM backend.
+
+    Each call waits for the (first token) latency plus the time to generate the response tokens at the given
+    token rate, and returns a deterministic random response (given the seed and the number of input messages).
+    It supports ``invoke`` and ``stream`` and reports token usage like real backends.
+
+    :param latency: Mean latency (in seconds) before the first token.
+    :type latency: float
+    :param latency_std: Standard deviation of the latency (sampled from a normal distribution, clipped at 0).
+    :type latency_std: float
+    :param token_rate: Generation speed in tokens per second (None for instantaneous generation).
+    :type token_rate: float
+    :param response_tokens: Number of tokens (words) of each response.
+    :type response_tokens: int
+    :param stop_after: Number of turns after which the agent ends the conversation with the STOP word
+                       (None to never end it).
+    :type stop_after: int
+    :param stop_probability: Probability of ending the conversation with the STOP word in each turn.
+    :type stop_probability: float
+    :param dialog_turns: Number of turns of the dialogues generated when a structured output format is requested
+                         (i.e. by :class:`~sdialog.generators.DialogGenerator`).
+    :type dialog_turns: int
+    :param seed: Random seed.
+    :type seed: int
+    """
+    num_predict = None
+    format = None
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 latency_std: float = 0.0,
+                 token_rate: float = None,
+                 response_tokens: int = 12,
+                 stop_after: int = None,
+                 stop_probability: float = 0.0,
+                 dialog_turns: int = 10,
+                 seed: int = 0):
+        self.latency = latency
+        self.latency_std = latency_std
+        self.token_rate = token_rate
+        self.response_tokens = response_tokens
+        self.stop_after = stop_after
+        self.stop_probability = stop_probability
+        self.dialog_turns = dialog_turns
+        self.seed = seed
+        self.calls = 0
+
+    def __str__(self):
+        return "mock"
+
+    def _response(self, messages: list):
+        """
+        Returns the response tokens, the first token latency and the number of prompt tokens for the given messages.
+        """
+        rng = random.Random(f"{self.seed}-{len(messages)}-{len(messages[-1].content) if messages else 0}")
+        latency = max(rng.gauss(self.latency, self.latency_std), 0) if self.latency_std else self.latency
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+
+        if self.num_predict == 1:  # (e.g. prompt-cache reset calls)
+            return [rng.choice(WORDS)], 0, prompt_tokens
+
+        if self.format:
+            turns = [{"speaker": ["Alice", "Bob"][ix % 2],
+                      "text": " ".join(rng.choice(WORDS) for _ in range(self.response_tokens))}
+                     for ix in range(self.dialog_turns)]
+            return [json.dumps({"dialog": turns})], latency, prompt_tokens
+
+        tokens = [(" " if ix else "") + rng.choice(WORDS) for ix in range(self.response_tokens)]
+        n_agent_turns = sum(1 for message in messages if isinstance(message, AIMessage))
+        if (self.stop_after is not None and n_agent_turns + 1 >= self.stop_after) or \
+           (self.stop_probability and rng.random() < self.stop_probability):
+            tokens.append(f" {PersonaAgent.STOP_WORD}")
+        return tokens, latency, prompt_tokens
+
+    def _usage(self, prompt_tokens: int, completion_tokens: int) -> dict:
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def invoke(self, messages: list) -> AIMessage:
+        """
+        Returns the (mock) response to the given messages.
+
+        :param messages: Input messages.
+        :type messages: list
+        :return: The response.
+        :rtype: AIMessage
+        """
+        self.calls += 1
+        tokens, latency, prompt_tokens = self._response(messages)
+        if self.num_predict != 1:
+            delay = latency + (len(tokens) / self.token_rate if self.token_rate else 0)
+            if delay:
+                time.sleep(delay)
+        return AIMessage(content="".join(tokens), usage_metadata=self._usage(prompt_tokens, len(tokens)))
+
+    def stream(self, messages: list):
+        """
+        Streams the (mock) response to the given messages, token by token.
+
+        :param messages: Input messages.
+        :type messages: list
+        :return: Generator of response chunks (the last one including the token usage).
+        """
+        self.calls += 1
+        tokens, latency, prompt_tokens = self._response(messages)
+        if latency:
+            time.sleep(latency)
+        for ix, token in enumerate(tokens):
+            if self.token_rate:
+                time.sleep(1 / self.token_rate)
+            usage = self._usage(prompt_tokens, len(tokens)) if ix == len(tokens) - 1 else None
+            yield AIMessageChunk(content=token, usage_metadata=usage)
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words (hashing) sentence encoder, to run embedding-based orchestrators offline.
+
+    :param dimension: Embedding dimension.
+    :type dimension: int
+    """
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes a list of texts.
+
+        :param texts: The texts to encode.
+        :type texts: List[str]
+        :return: The (L2-normalized) embeddings, one row per text.
+        :rtype: np.ndarray
+        """
+        embs = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for ix, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                embs[ix, zlib.crc32(word.encode()) % self.dimension] += 1
+        return embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+
+def make_synthetic_star(path: str, n_dialogs: int = 20, n_tasks: int = 4, n_actions: int = 8, seed: int = 0) -> str:
+    """
+    Writes a synthetic dataset with the same layout as STAR (dialogues with scenarios, events and user
+    instructions, plus task flowcharts and responses), to be used with :class:`~sdialog.datasets.STAR`.
+
+    :param path: Output directory.
+    :type path: str
+    :param n_dialogs: Number of dialogues.
+    :type n_dialogs: int
+    :param n_tasks: Number of tasks.
+    :type n_tasks: int
+    :param n_actions: Number of system actions per task flowchart.
+    :type n_actions: int
+    :param seed: Random seed.
+    :type seed: int
+    :return: The output directory.
+    :rtype: str
+    """
+    rng = random.Random(seed)
+    domains = ["bank", "hotel", "restaurant", "trip", "doctor", "weather"]
+    tasks = []
+    for task_ix in range(n_tasks):
+        task_name = f"task_{task_ix}"
+        domain = domains[task_ix % len(domains)]
+        actions = ["hello"] + [f"{domain}_action_{ix}" for ix in range(1, n_actions - 1)] + ["goodbye"]
+        graph = {}
+        for ix, action in enumerate(actions[:-1]):
+            graph[action] = f"user_{action}"
+            graph[f"user_{action}"] = actions[ix + 1]
+        responses = {action: f"{action.replace('_', ' ')} " + " ".join(rng.choice(WORDS) for _ in range(6))
+                     + " {Value:value}" for action in actions}
+        responses["out_of_scope"] = "Sorry, I cannot help with that."
+        os.makedirs(os.path.join(path, "tasks", task_name), exist_ok=True)
+        with open(os.path.join(path, "tasks", task_name, f"{task_name}.json"), "w") as writer:
+            json.dump({"task": task_name, "graph": graph}, writer)
+        with open(os.path.join(path, "tasks", task_name, "responses.json"), "w") as writer:
+            json.dump(responses, writer)
+        tasks.append((task_name, domain, actions, responses))
+
+    os.makedirs(os.path.join(path, "dialogues"), exist_ok=True)
+    for dialog_id in range(1, n_dialogs + 1):
+        task_name, domain, actions, responses = tasks[rng.randrange(len(tasks))]
+        events, unix_time = [], 1_500_000_000 + dialog_id * 1000
+        for action in actions:
+            if rng.random() < .3:
+                events.append({"Agent": "UserGuide", "Action": "instruct", "Text": f"Ask about {action}.",
+                               "UnixTime": unix_time})
+            events.append({"Agent": "User", "Action": "utter", "UnixTime": unix_time,
+                           "Text": " ".join(rng.choice(WORDS) for _ in range(8))})
+            events.append({"Agent": "Wizard", "Action": "pick_suggestion", "ActionLabel": action,
+                           "UnixTime": unix_time + 1, "Text": responses[action].replace("{Value:value}", "VALUE")})
+            unix_time += 10
+        scenario = {"Domains": [domain], "Happy": rng.random() < .7, "MultiTask": False,
+                    "UserTask": f"Ask the assistant to perform {task_name}.",
+                    "WizardTask": f"Help the user with {task_name}.",
+                    "WizardCapabilities": [{"Task": task_name, "Domain": domain}]}
+        with open(os.path.join(path, "dialogues", f"{dialog_id}.json"), "w") as writer:
+            json.dump({"DialogueID": dialog_id, "Scenario": scenario, "Events": events}, writer)
+    return path
+
+
+def get_benchmarks(llm: MockChatModel, max_turns: int, star_path: str) -> Dict[str, Callable[[int], object]]:
+    """
+    Returns the benchmark cases, each one a function generating one dialogue given its seed.
+
+    :param llm: The mock chat model used by all the cases.
+    :type llm: MockChatModel
+    :param max_turns: Maximum number of turns per agent in each dialogue.
+    :type max_turns: int
+    :param star_path: Path to a (synthetic or real) STAR dataset, the STAR path must be set to it (the STAR cases
+                      cycle over its dialogues and the orchestrator cases use the task of the first one).
+    :type star_path: str
+    :return: The benchmark cases, by name.
+    :rtype: Dict[str, Callable[[int], object]]
+    """
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    alice, bob = Persona(name="Alice", role="customer"), Persona(name="Bob", role="shop assistant")
+    star_ids = STAR.get_dialog_ids() if star_path else []
+    task_name = STAR.get_dialog_task_names(star_ids[0])[0] if star_ids else None
+    graph = STAR.read_graph(task_name, as_dot=False) if task_name else None
+    responses = STAR.read_graph_responses(task_name, as_dict=True) if task_name else None
+
+    def dialog_with(*orchestrators):
+        def run(seed: int):
+            agent_a = PersonaAgent(llm, alice, name="Alice", orchestrators=[orc.clone() for orc in orchestrators])
+            agent_b = PersonaAgent(llm, bob, name="Bob")
+            return agent_a.dialog_with(agent_b, max_iterations=max_turns, seed=seed, keep_bar=False)
+        return run
+
+    def star(flow_graph: bool):
+        # Same as STAR.get_agents_from_dialogue_with_orchestration() but with the offline encoder
+        def run(seed: int):
+            dialog_id = star_ids[seed % len(star_ids)]
+            system, user = STAR.get_agents_from_dialogue(dialog_id, llm, set_first_utterance=True)
+            graphs, responses = STAR.get_dialog_graphs_and_responses(dialog_id)
+            if flow_graph:
+                system = system | FlowGraphOrchestrator(graphs[0], responses[0], sbert_model=ENCODER_NAME)
+            else:
+                system = system | SimpleResponseOrchestrator(responses[0], graph=graphs[0], sbert_model=ENCODER_NAME)
+            user = user | InstructionListOrchestrator(STAR.get_dialog_user_instructions(dialog_id), persistent=True)
+            return system.dialog_with(user, max_iterations=max_turns, seed=seed, keep_bar=False)
+        return run
+
+    persona_generator = PersonaDialogGenerator(llm, alice, bob)
+    dialog_generator = DialogGenerator(copy.copy(llm),  # (the generator sets the output format of its LLM)
+                                       "A dialogue between a customer and a shop assistant.")
+    benchmarks = {
+        "DialogGenerator": lambda seed: dialog_generator.generate(seed=seed),
+        "PersonaDialogGenerator": lambda seed: persona_generator.generate(seed=seed, max_iterations=max_turns),
+        "dialog_with": dialog_with(),
+        "dialog_with+LengthOrchestrator": dialog_with(LengthOrchestrator(min=max_turns // 2, max=max_turns * 2)),
+        "dialog_with+ChangeMindOrchestrator": dialog_with(ChangeMindOrchestrator(probability=.5, max_times=2)),
+        "dialog_with+SimpleReflexOrchestrator": dialog_with(SimpleReflexOrchestrator(lambda utt: "price" in utt,
+                                                                                     "Offer a discount.")),
+        "dialog_with+InstructionListOrchestrator": dialog_with(InstructionListOrchestrator({1: "Ask the price.",
+                                                                                            3: "Say thanks."})),
+    }
+    if star_ids:
+        benchmarks.update({
+            "dialog_with+SimpleResponseOrchestrator": dialog_with(
+                SimpleResponseOrchestrator(responses, graph=graph, sbert_model=ENCODER_NAME)),
+            "dialog_with+FlowGraphOrchestrator": dialog_with(
+                FlowGraphOrchestrator(graph, responses, sbert_model=ENCODER_NAME)),
+            "STAR.get_agents_from_dialogue+SimpleResponseOrchestrator": star(flow_graph=False),
+            "STAR.get_agents_from_dialogue+FlowGraphOrchestrator": star(flow_graph=True),
+        })
+    return benchmarks
+
+
+def _run_benchmark(run: Callable[[int], object], n_dialogs: int, seed: int) -> dict:
+    """
+    Runs a benchmark case and returns its results.
+    """
+    n_turns = 0
+    with profiling.profile() as recorder:
+        for ix in range(n_dialogs):
+            output = run(seed + ix)
+            n_turns += len(output) if hasattr(output, "turns") else 1
+    stats = recorder.stats()
+    wall = stats["wall_ns"] / 1e9
+    llm = stats["kinds"].get("llm", {"calls": 0, "total_ns": 0})
+
+    # Peak memory is measured in a separate (single dialogue) run, since tracing allocations slows down execution
+    tracemalloc.start()
+    run(seed)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"dialogs": n_dialogs,
+            "turns": n_turns,
+            "llm_calls": llm["calls"],
+            "seconds": wall,
+            "dialogs_per_sec": n_dialogs / wall,
+            "turns_per_sec": n_turns / wall,
+            "llm_ms_per_turn": llm["total_ns"] / 1e6 / max(n_turns, 1),
+            "overhead_ms_per_turn": (stats["wall_ns"] - llm["total_ns"]) / 1e6 / max(n_turns, 1),
+            "peak_memory_mb": peak_memory / 2**20}
+
+
+def run_benchmarks(n_dialogs: int = 20,
+                   max_turns: int = 10,
+                   latency: float = 0.0,
+                   latency_std: float = 0.0,
+                   token_rate: float = None,
+                   stop_after: int = None,
+                   names: List[str] = None,
+                   star_path: str = None,
+                   seed: int = 0,
+                   verbose: bool = False) -> dict:
+    """
+    Runs the benchmark suite.
+
+    :param n_dialogs: Number of dialogues generated per benchmark case.
+    :type n_dialogs: int
+    :param max_turns: Maximum number of turns per agent in each dialogue.
+    :type max_turns: int
+    :param latency: Mean first-token latency of the mock LLM (in seconds).
+    :type latency: float
+    :param latency_std: Standard deviation of the mock LLM latency.
+    :type latency_std: float
+    :param token_rate: Token rate of the mock LLM (tokens per second).
+    :type token_rate: float
+    :param stop_after: Number of turns after which the mock LLM outputs the STOP word.
+    :type stop_after: int
+    :param names: Names of the benchmark cases to run (substrings, all by default).
+    :type names: List[str]
+    :param star_path: Path to a STAR(-like) dataset (a synthetic one is created by default).
+    :type star_path: str
+    :param seed: Random seed.
+    :type seed: int
+    :param verbose: If True, prints the results of each case as it finishes.
+    :type verbose: bool
+    :return: The results (configuration, environment and results per benchmark case).
+    :rtype: dict
+    """
+    config = {"n_dialogs": n_dialogs, "max_turns": max_turns, "latency": latency, "latency_std": latency_std,
+              "token_rate": token_rate, "stop_after": stop_after, "seed": seed}
+    llm = MockChatModel(latency=latency, latency_std=latency_std, token_rate=token_rate, stop_after=stop_after,
+                        dialog_turns=max_turns * 2, seed=seed)
+    previous_star_path = STAR._path
+    with tempfile.TemporaryDirectory() as tmp_path:
+        if star_path is None:
+            star_path = make_synthetic_star(tmp_path, seed=seed)
+        STAR.set_path(star_path)
+        try:
+            results = {}
+            for name, run in get_benchmarks(llm, max_turns, star_path).items():
+                if names and not any(pattern in name for pattern in names):
+                    continue
+                results[name] = _run_benchmark(run, n_dialogs, seed)
+                if verbose:
+                    print(f"{name:<62} {results[name]['dialogs_per_sec']:>10.2f} dialogs/s "
+                          f"{results[name]['overhead_ms_per_turn']:>8.3f} ms/turn overhead "
+                          f"{results[name]['peak_memory_mb']:>8.2f} MB", flush=True)
+        finally:
+            STAR.set_path(previous_star_path)
+
+    return {"version": _get_dynamic_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config,
+            "results": results}
+
+
+def compare_results(baseline: dict, results: dict, threshold: float = 0.1) -> List[dict]:
+    """
+    Compares two benchmark results and returns the regressions, i.e. the cases whose dialogues/sec decreased or
+    per-turn overhead or peak memory increased more than the given relative threshold.
+
+    :param baseline: The baseline results (e.g. of the previous version).
+    :type baseline: dict
+    :param results: The new results.
+    :type results: dict
+    :param threshold: Relative change considered a regression (e.g. 0.1 for 10%).
+    :type threshold: float
+    :return: The regressions (case name, metric, baseline and new values, and relative change).
+    :rtype: List[dict]
+    """
+    regressions = []
+    for name, new in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric, higher_is_better in [("dialogs_per_sec", True),
+                                         ("overhead_ms_per_turn", False),
+                                         ("peak_memory_mb", False)]:
+            if not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append({"name": name, "metric": metric, "baseline": old[metric],
+                                    "value": new[metric], "change": change})
+    return regressions
+
+
+def main(argv: List[str] = None):
+    """
+    Command line interface to run the benchmark suite and compare results.
+    """
+    parser = argparse.ArgumentParser(prog="python -m sdialog.benchmark",
+                                     description="Generation throughput benchmarks for sdialog.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite.")
+    run_parser.add_argument("--output", "-o", help="Output JSON file for the results.")
+    run_parser.add_argument("--dialogs", type=int, default=20, help="Dialogues per benchmark case.")
+    run_parser.add_argument("--turns", type=int, default=10, help="Maximum turns per agent.")
+    run_parser.add_argument("--latency", type=float, default=0.0, help="Mock LLM first-token latency (seconds).")
+    run_parser.add_argument("--latency-std", type=float, default=0.0, help="Mock LLM latency standard deviation.")
+    run_parser.add_argument("--token-rate", type=float, help="Mock LLM tokens per second.")
+    run_parser.add_argument("--stop-after", type=int, help="Turns after which the mock LLM outputs STOP.")
+    run_parser.add_argument("--only", nargs="+", help="Run only the cases containing these names.")
+    run_parser.add_argument("--star", help="Path to the STAR dataset (a synthetic one is used by default).")
+    run_parser.add_argument("--seed", type=int, default=0)
+    compare_parser = subparsers.add_parser("compare", help="Compare two benchmark results.")
+    compare_parser.add_argument("baseline", help="Baseline results (JSON).")
+    compare_parser.add_argument("results", help="New results (JSON).")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative regression threshold.")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(n_dialogs=args.dialogs, max_turns=args.turns, latency=args.latency,
+                                 latency_std=args.latency_std, token_rate=args.token_rate,
+                                 stop_after=args.stop_after, names=args.only, star_path=args.star, seed=args.seed,
+                                 verbose=True)
+        if args.output:
+            with open(args.output, "w") as writer:
+                json.dump(results, writer, indent=2)
+        return 0
+
+    with open(args.baseline) as reader:
+        baseline = json.load(reader)
+    with open(args.results) as reader:
+        results = json.load(reader)
+    regressions = compare_results(baseline, results, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['metric']} {regression['baseline']:.3f} -> "
+              f"{regression['value']:.3f} ({regression['change']:+.1%})")
+    if not regressions:
+        print(f"No regressions (threshold: {args.threshold:.0%}).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+cli: The ``sdialog`` Command Line Interface
+
+This module provides the ``sdialog`` console command, to run config-driven batch generation pipelines and use the
+performance tooling without writing any code:
+
+.. code-block:: bash
+
+    sdialog generate pipeline.yaml --workers 8       # generates the dialogues described in a YAML/JSON config
+    sdialog index STAR/ --retrieval star-index/      # builds the metadata (and retrieval) index of a dataset
+    sdialog stats dialogs.jsonl                      # stats of a generated corpus (or a replay corpus)
+    sdialog bench run --output results.json          # see python -m sdialog.benchmark
+    sdialog replay run --mock --n 200 -o replay.jsonl  # see python -m sdialog.replay
+
+A pipeline config either describes the two agents of the dialogues (their personas, models and orchestrators) or
+a dataset whose dialogues are regenerated (replayed), plus the generation and output options, for instance:
+
+.. code-block:: yaml
+
+    model: qwen2.5:14b            # default model of the agents ("mock" for the mock LLM of sdialog.benchmark)
+    llm_kwargs: {temperature: 0.8}
+    agents:
+      - name: Customer
+        persona: {name: Alice, role: customer, personality: impatient}
+        dialogue_details: Alice wants to cancel her gym membership.
+        orchestrators:
+          - {type: LengthOrchestrator, min: 6, max: 12}
+      - name: Agent
+        persona: {name: Bob, role: gym receptionist}
+    # source: {type: star, path: STAR/, filters: {domain: bank}, n: 100, agent_kwargs: {flow_graph: true}}
+    generation: {n: 100, workers: 8, max_turns: 20, seed: 0, profile: true, watchdog: {action: stop}}
+    output: {path: dialogs.jsonl, resume: true, trace: trace.jsonl}
+
+YAML configs require PyYAML (``pip install pyyaml``); JSON configs have no extra requirements.
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import argparse
+
+from time import perf_counter
+from typing import List, Union, Tuple
+
+from . import Dialog, profiling
+from . import orchestrators as sdialog_orchestrators
+from .personas import BasePersona, Persona, PersonaAgent
+from .datasets import BaseDialogDataset, JSONDialogDataset, STARDataset
+from .replay import (replay, read_replay, get_replay_stats, run_jsonl_jobs, read_jsonl, get_distribution,
+                     print_stats as print_replay_stats)
+
+SOURCES = {"star": STARDataset, "json": JSONDialogDataset}
+
+
+def load_config(path: str) -> dict:
+    """
+    Loads a pipeline config from a YAML (``.yaml`` / ``.yml``) or JSON file.
+
+    :param path: Path of the config file.
+    :type path: str
+    :return: The config.
+    :rtype: dict
+    """
+    with open(path) as reader:
+        if os.path.splitext(path)[1].lower() not in [".yaml", ".yml"]:
+            return json.load(reader)
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required to read YAML configs (`pip install pyyaml`), "
+                              "or use a JSON config instead.")
+        return yaml.safe_load(reader)
+
+
+def _get_model(model: Union[str, dict], config: dict):
+    """
+    Returns the model (name) of an agent, or the mock LLM of :mod:`sdialog.benchmark` if it is ``"mock"``.
+    """
+    if model == "mock":
+        from .benchmark import MockChatModel
+
+        return MockChatModel(**config.get("mock", {}))
+    return model
+
+
+def get_orchestrator(spec: dict) -> sdialog_orchestrators.BaseOrchestrator:
+    """
+    Builds an orchestrator from its config, i.e. the name of its class in :mod:`sdialog.orchestrators`
+    (``"type"``) and the arguments of its constructor (e.g. ``{"type": "LengthOrchestrator", "min": 6}``).
+
+    :param spec: The orchestrator config.
+    :type spec: dict
+    :return: The orchestrator.
+    :rtype: BaseOrchestrator
+    """
+    spec = dict(spec)
+    name = spec.pop("type", None)
+    orchestrator_class = getattr(sdialog_orchestrators, name or "", None)
+    if not (isinstance(orchestrator_class, type)
+            and issubclass(orchestrator_class, sdialog_orchestrators.BaseOrchestrator)):
+        raise ValueError(f"Unknown orchestrator type '{name}'")
+    return orchestrator_class(**spec)
+
+
+def get_agent(spec: dict, config: dict) -> PersonaAgent:
+    """
+    Builds an agent from its config: ``persona`` (persona attributes), ``orchestrators`` (see
+    :func:`get_orchestrator`), ``model`` (the config ``model`` by default) and any other
+    :class:`~sdialog.personas.PersonaAgent` argument (e.g. ``name`` or ``dialogue_details``).
+
+    :param spec: The agent config.
+    :type spec: dict
+    :param config: The pipeline config.
+    :type config: dict
+    :return: The agent.
+    :rtype: PersonaAgent
+    """
+    spec = dict(spec)
+    persona = spec.pop("persona", {})
+    persona = persona if isinstance(persona, BasePersona) else Persona(**persona)
+    orchestrators = [get_orchestrator(orchestrator) for orchestrator in spec.pop("orchestrators", [])]
+    model = _get_model(spec.pop("model", config.get("model")), config)
+    if model is None:
+        raise ValueError("No model given for the agent (set `model` in the config or in the agent)")
+    spec.setdefault("llm_kwargs", config.get("llm_kwargs"))
+    return PersonaAgent(model, persona, orchestrators=orchestrators or None, **spec)
+
+
+def read_dialogs(path: str) -> List[Dialog]:
+    """
+    Reads a corpus of dialogues written by :func:`run_pipeline` (incomplete lines, e.g. of an interrupted run, are
+    ignored).
+
+    :param path: The JSONL file (one dialogue per line).
+    :type path: str
+    :return: The dialogues.
+    :rtype: List[Dialog]
+    """
+    return [Dialog.from_dict(record) for record in read_jsonl(path)]
+
+
+def generate_dialogs(agents: List[PersonaAgent],
+                     output_path: str,
+                     n: int = 1,
+                     workers: int = 4,
+                     max_iterations: int = 20,
+                     seed: int = 0,
+                     resume: bool = True,
+                     watchdog: dict = None,
+                     profile: bool = False,
+                     verbose: bool = True) -> dict:
+    """
+    Generates `n` dialogues between two agents concurrently (each dialogue with forks of the given agents, with
+    their own copy of the LLM client and seed, so the output does not depend on the number of workers), writing
+    each dialogue as one line of the output JSONL file as soon as it is generated. The output file doubles as a
+    checkpoint: when resuming, the dialogues already in it are not generated again.
+
+    :param agents: The two agents (the first one starts the dialogues).
+    :type agents: List[PersonaAgent]
+    :param output_path: Output JSONL file (one dialogue per line).
+    :type output_path: str
+    :param n: Number of dialogues (their IDs are 1 to n).
+    :type n: int
+    :param workers: Number of dialogues generated concurrently.
+    :type workers: int
+    :param max_iterations: Maximum number of turns per agent.
+    :type max_iterations: int
+    :param seed: Base random seed (the seed of each dialogue is the base seed plus its ID).
+    :type seed: int
+    :param resume: If True, the dialogues already in the output file are kept; otherwise, it is overwritten.
+    :type resume: bool
+    :param watchdog: If given, arguments of the :class:`~sdialog.watchdogs.DegenerationWatchdog` monitoring each
+                     dialogue (e.g. ``{"action": "stop"}``).
+    :type watchdog: dict
+    :param profile: If True, each dialogue is profiled (see ``Dialog.stats``).
+    :type profile: bool
+    :param verbose: If True, shows a progress bar.
+    :type verbose: bool
+    :return: The ``throughput`` of this run (number of dialogues and turns, wall time, dialogues and turns per
+             second and LLM calls and tokens).
+    :rtype: dict
+    """
+    if len(agents) != 2:
+        raise ValueError(f"Two agents are required to generate dialogues ({len(agents)} given)")
+
+    def generate(dialog_id: int) -> Tuple[dict, int]:
+        agent_a, agent_b = agents[0].fork(), agents[1].fork()
+        dialog_watchdog = None
+        if watchdog is not None:
+            from .watchdogs import DegenerationWatchdog
+
+            dialog_watchdog = DegenerationWatchdog(**watchdog)
+        dialog = agent_a.dialog_with(agent_b, max_iterations=max_iterations, id=dialog_id, seed=seed + dialog_id,
+                                     keep_bar=False, watchdog=dialog_watchdog, profile=profile)
+        return dialog.json(), len(dialog)
+
+    return run_jsonl_jobs([(dialog_id,) for dialog_id in range(1, n + 1)], generate, output_path,
+                          id_field="dialogId", workers=workers, resume=resume, verbose=verbose)
+
+
+def get_dataset(spec: dict) -> BaseDialogDataset:
+    """
+    Builds a dataset from its config: ``type`` (``"star"`` or ``"json"``), ``path`` and, optionally,
+    ``index_path``.
+
+    :param spec: The dataset config.
+    :type spec: dict
+    :return: The dataset.
+    :rtype: BaseDialogDataset
+    """
+    if spec.get("type") not in SOURCES:
+        raise ValueError(f"Unknown source type '{spec.get('type')}' (valid types: {', '.join(SOURCES)})")
+    return SOURCES[spec["type"]](spec["path"], index_path=spec.get("index_path"))
+
+
+def run_pipeline(config: dict, verbose: bool = True) -> dict:
+    """
+    Runs a generation pipeline described by a config (see the module documentation): dialogues between the
+    configured ``agents`` (see :func:`generate_dialogs`) or replays of the dialogues of a dataset ``source`` (see
+    :func:`sdialog.replay.replay`), with the ``generation`` and ``output`` options.
+
+    :param config: The pipeline config.
+    :type config: dict
+    :param verbose: If True, shows the progress.
+    :type verbose: bool
+    :return: The throughput of the run (plus the replay stats, for a dataset source).
+    :rtype: dict
+    """
+    generation = config.get("generation", {})
+    output = config.get("output", {})
+    if not output.get("path"):
+        raise ValueError("No output path given (set `output.path` in the config)")
+    if ("agents" in config) == ("source" in config):
+        raise ValueError("The config must describe either the `agents` or a dataset `source` (but not both)")
+
+    hooks = []
+    if output.get("trace"):
+        hooks.append(profiling.register_hook(profiling.JSONLTraceSink(output["trace"])))
+    if output.get("chrome_trace"):
+        hooks.append(profiling.register_hook(profiling.ChromeTraceSink(output["chrome_trace"])))
+    try:
+        if "agents" in config:
+            agents = [get_agent(spec, config) for spec in config["agents"]]
+            return generate_dialogs(agents, output["path"], n=generation.get("n", 1),
+                                    workers=generation.get("workers", 4),
+                                    max_iterations=generation.get("max_turns", 20),
+                                    seed=generation.get("seed", 0), resume=output.get("resume", True),
+                                    watchdog=generation.get("watchdog"), profile=generation.get("profile", False),
+                                    verbose=verbose)
+
+        source = config["source"]
+        dataset = get_dataset(source)
+        ids = dataset.get_dialog_ids(**source.get("filters", {}))
+        ids = ids[:source["n"]] if source.get("n") else ids
+        agent_kwargs = dict(source.get("agent_kwargs", {}))
+        if config.get("model") == "mock" and "sbert_model" not in agent_kwargs:
+            from .benchmark import HashingEncoder, ENCODER_NAME
+            from .embeddings import register_sentence_encoder
+
+            register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+            agent_kwargs["sbert_model"] = ENCODER_NAME
+        stats = replay(dataset, ids, _get_model(config.get("model"), config), output["path"],
+                       workers=generation.get("workers", 4), max_iterations=generation.get("max_turns", 20),
+                       seed=generation.get("seed", 0), resume=output.get("resume", True), verbose=verbose,
+                       **agent_kwargs)
+        return {**stats["throughput"], "replay": stats}
+    finally:
+        for hook in hooks:
+            profiling.unregister_hook(hook)
+
+
+def get_corpus_stats(dialogs: List[Dialog]) -> dict:
+    """
+    Computes the stats of a corpus of dialogues.
+
+    :param dialogs: The dialogues.
+    :type dialogs: List[Dialog]
+    :return: Number of dialogues (``n``) and of dialogues marked to be discarded (``discarded``), distributions
+             (mean, 10th, 50th and 90th percentiles) of the number of turns per dialogue (``turns``) and of words
+             per turn (``turn_length``), and the aggregated generation stats of the profiled dialogues
+             (``profile``, see :func:`sdialog.profiling.aggregate_stats`).
+    :rtype: dict
+    """
+    return {"n": len(dialogs),
+            "discarded": sum(bool(dialog.discard) for dialog in dialogs),
+            "turns": get_distribution([len(dialog) for dialog in dialogs]),
+            "turn_length": get_distribution([len(turn.text.split()) for dialog in dialogs for turn in dialog.turns]),
+            "profile": profiling.aggregate_stats(dialogs)}
+
+
+def _print_corpus_stats(stats: dict):
+    print(f"{stats['n']} dialogues ({stats['discarded']} discarded)")
+    print(f"{'':<12} {'mean':>8} {'p10':>8} {'p50':>8} {'p90':>8}")
+    for name in ["turns", "turn_length"]:
+        values = stats[name]
+        print(f"{name:<12} {values['mean']:>8.2f} {values['p10']:>8.2f} {values['p50']:>8.2f} {values['p90']:>8.2f}")
+    if stats["profile"]["n"]:
+        print(f"profiled dialogues: {stats['profile']['n']}")
+        for kind, metrics in sorted(stats["profile"]["kinds"].items()):
+            print(f"  {kind:<12} {metrics['calls']:>6} calls, {metrics['total_ns'] / metrics['calls'] / 1e6:.1f}ms "
+                  f"mean, {metrics['prompt_tokens']} prompt / {metrics['completion_tokens']} completion tokens")
+
+
+def _print_throughput(throughput: dict):
+    print(f"throughput: {throughput['dialogs']} dialogues in {throughput['wall_s']:.2f}s "
+          f"({throughput['dialogs_per_s']:.2f} dialogues/s, {throughput['turns_per_s']:.1f} turns/s, "
+          f"{throughput['llm_calls']} LLM calls)")
+
+
+def _index(args) -> int:
+    source_type = args.type or ("star" if os.path.isdir(os.path.join(args.path, "dialogues")) else "json")
+    dataset = get_dataset({"type": source_type, "path": args.path, "index_path": args.index_path})
+    start = perf_counter()
+    print(f"metadata index: {dataset.build_index(force=args.force)} ({len(dataset)} dialogues, "
+          f"{perf_counter() - start:.2f}s)")
+    if args.retrieval:
+        from .retrieval import DialogIndex
+
+        start = perf_counter()
+        kwargs = {"model": args.encoder} if args.encoder else {}
+        index = DialogIndex.build(dataset.iter_dialogs(workers=args.workers), args.retrieval, **kwargs)
+        print(f"retrieval index: {args.retrieval} ({len(index)} dialogues, {index.config['n_turns']} turns, "
+              f"{perf_counter() - start:.2f}s)")
+    return 0
+
+
+def _stats(args) -> int:
+    with open(args.corpus) as reader:
+        first_line = reader.readline()
+    if "synthetic" in json.loads(first_line or "{}"):
+        stats = get_replay_stats(read_replay(args.corpus))
+        print_replay_stats(stats)
+    else:
+        stats = get_corpus_stats(read_dialogs(args.corpus))
+        _print_corpus_stats(stats)
+    if args.output:
+        with open(args.output, "w") as writer:
+            json.dump(stats, writer, indent=2)
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Entry point of the ``sdialog`` console command.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    # bench and replay are the command line interfaces of their own modules
+    if argv and argv[0] == "bench":
+        from .benchmark import main as bench_main
+        return bench_main(argv[1:])
+    if argv and argv[0] == "replay":
+        from .replay import main as replay_main
+        return replay_main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="sdialog", description="Synthetic dialogue generation and analysis.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate_parser = subparsers.add_parser("generate", help="Run a generation pipeline from a YAML/JSON config.")
+    generate_parser.add_argument("config", help="Pipeline config (YAML or JSON).")
+    generate_parser.add_argument("--output", "-o", help="Output JSONL file (overrides `output.path`).")
+    generate_parser.add_argument("--n", type=int, help="Number of dialogues (overrides `generation.n`).")
+    generate_parser.add_argument("--workers", type=int, help="Dialogues generated concurrently.")
+    generate_parser.add_argument("--seed", type=int, help="Base random seed.")
+    generate_parser.add_argument("--no-resume", action="store_true", help="Overwrite the output file.")
+    generate_parser.add_argument("--quiet", "-q", action="store_true", help="Do not show the progress.")
+    index_parser = subparsers.add_parser("index", help="Build the metadata (and retrieval) index of a dataset.")
+    index_parser.add_argument("path", help="Dataset path (STAR folder, or JSON/JSONL file or folder).")
+    index_parser.add_argument("--type", choices=list(SOURCES), help="Dataset type (detected by default).")
+    index_parser.add_argument("--index-path", help="Path of the metadata index (next to the dataset by default).")
+    index_parser.add_argument("--force", action="store_true", help="Rebuild the metadata index.")
+    index_parser.add_argument("--retrieval", help="Also build a retrieval index (sdialog.retrieval) in this folder.")
+    index_parser.add_argument("--encoder", help="Sentence encoder of the retrieval index.")
+    index_parser.add_argument("--workers", type=int, help="Processes reading the dialogues.")
+    stats_parser = subparsers.add_parser("stats", help="Stats of a generated (or replay) corpus.")
+    stats_parser.add_argument("corpus", help="Corpus (JSONL).")
+    stats_parser.add_argument("--output", "-o", help="Write the stats to this JSON file.")
+    subparsers.add_parser("bench", help="Benchmark suite (see `sdialog bench --help`).")
+    subparsers.add_parser("replay", help="Reference-vs-synthetic replay (see `sdialog replay --help`).")
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        return _index(args)
+    if args.command == "stats":
+        return _stats(args)
+
+    config = load_config(args.config)
+    generation = config.setdefault("generation", {})
+    output = config.setdefault("output", {})
+    for key, value in [("n", args.n), ("workers", args.workers), ("seed", args.seed)]:
+        if value is not None:
+            generation[key] = value
+    if "source" in config and args.n is not None:
+        config["source"]["n"] = args.n
+    if args.output:
+        output["path"] = args.output
+    if args.no_resume:
+        output["resume"] = False
+    throughput = run_pipeline(config, verbose=not args.quiet)
+    if "replay" in throughput:
+        print_replay_stats(throughput["replay"])
+    else:
+        _print_throughput(throughput)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,9 @@ datasets: Dataset Utilities for Synthetic Dialogue Generation
 
 This module provides utilities for loading, parsing, and describing dialogue datasets, including the STAR dataset.
 It supports extracting scenarios, flowcharts, personas, and constructing PersonaAgent objects for simulation.
+Datasets share a common interface (:class:`BaseDialogDataset`) with a persistent metadata index, lazy and parallel
+iteration, random access and deterministic sharding; local JSON / JSONL corpora (e.g. MultiWOZ, SGD) can be read
+with :class:`JSONDialogDataset`.
 """
 
 # SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
@@ -11,36 +14,807 @@ It supports extracting scenarios, flowcharts, personas, and constructing Persona
 import os
 import re
 import json
+import copy
+import sqlite3
+import hashlib
+import threading
 
 from tqdm.auto import tqdm
+from collections import OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from abc import ABC, abstractmethod
+from pydantic import BaseModel
+from typing import List, Dict, Optional, Iterator, Tuple, Union, Any
 
 from . import Dialog, Turn, Event
-from .personas import Persona, PersonaAgent
-from .orchestrators import InstructionListOrchestrator, SimpleResponseOrchestrator
+from .util import count_tokens
+from .personas import Persona, PersonaAgent, Scenario
+from .orchestrators import InstructionListOrchestrator, SimpleResponseOrchestrator, FlowGraphOrchestrator
 
 
-class STAR:
+class BaseDialogDataset(ABC):
     """
-    Utility class for interacting with the STAR dialogue dataset.
+    Base class for dialogue datasets, providing lazy (and parallel) iteration, index-based random access,
+    deterministic sharding, scenario extraction and agent construction hooks.
+
+    Subclasses only have to enumerate the dialogues (:meth:`_scan`) and read one from its location
+    (:meth:`_read_dialog`): a persistent SQLite index with the location and filterable metadata (tags) of each
+    dialogue is built once (see :meth:`build_index`), so that filtered access only reads the matching dialogues.
+
+    :param path: Path to the dataset.
+    :type path: str
+    :param index_path: Path of the metadata index. By default, it is stored next to the dataset (or in
+                       ``~/.cache/sdialog`` if its folder is not writable).
+    :type index_path: str
+    """
+    INDEX_FILE = "sdialog_index.sqlite"
+    INDEX_VERSION = "2"
+
+    def __init__(self, path: str, index_path: str = None):
+        self.path = path
+        self.index_path = index_path
+        self._ids = None  # all dialogue IDs, in index order (for random access)
+        self._index = None  # path of the index, once checked to be up to date (see refresh())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_ids"] = None  # not worth sending to worker processes
+        return state
+
+    @abstractmethod
+    def _scan(self) -> Iterator[Tuple[Any, str, int, Dict[str, list]]]:
+        """
+        Enumerates all the dialogues of the dataset (used to build the index).
 
-    Provides methods for loading dialogues, extracting scenarios, flowcharts, responses, and constructing
-    PersonaAgent objects for simulation and evaluation.
+        :return: Iterator over the (ID, location, number of turns, tags) of each dialogue, where the location is any
+                 string :meth:`_read_dialog` can read the dialogue from, and tags map filter names to their values
+                 (e.g. ``{"domain": ["hotel", "taxi"]}``).
+        :rtype: Iterator[Tuple[Any, str, int, Dict[str, list]]]
+        """
+        pass
+
+    @abstractmethod
+    def _read_dialog(self, id, location: str) -> Dialog:
+        """
+        Reads a dialogue from its location.
+
+        :param id: Dialogue ID.
+        :param location: Dialogue location (as given by :meth:`_scan`).
+        :type location: str
+        :return: The dialogue.
+        :rtype: Dialog
+        """
+        pass
+
+    def _get_index_stamp(self) -> str:
+        """
+        Returns a stamp of the dataset content; the index is rebuilt when it changes (by default, the
+        modification time of the dataset path).
+        """
+        return str(os.stat(self.path).st_mtime_ns)
+
+    def get_scenario(self, id) -> Union[dict, str]:
+        """
+        Gets the scenario of a dialogue.
+
+        :param id: Dialogue ID.
+        :return: Scenario metadata.
+        :rtype: Union[dict, str]
+        """
+        return self.get_dialog(id).scenario
+
+    @abstractmethod
+    def get_agents(self, id, model_name, **kwargs) -> Tuple[PersonaAgent, PersonaAgent]:
+        """
+        Constructs the (system, user) agents to re-generate a dialogue of the dataset.
+
+        :param id: Dialogue ID.
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :return: (system, user) agents.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        pass
+
+    def get_index_path(self) -> str:
+        """
+        Gets the path of the metadata index.
+
+        :return: Path of the SQLite index file.
+        :rtype: str
+        """
+        if self.index_path:
+            return self.index_path
+        if os.path.isdir(self.path):
+            index_path = os.path.join(self.path, self.INDEX_FILE)
+        else:
+            index_path = f"{os.path.abspath(self.path)}.{self.INDEX_FILE}"
+        if os.access(os.path.dirname(index_path), os.W_OK):
+            return index_path
+        path_hash = hashlib.sha256(os.path.abspath(self.path).encode()).hexdigest()[:16]
+        return os.path.join(os.path.expanduser("~"), ".cache", "sdialog", f"{type(self).__name__}-{path_hash}.sqlite")
+
+    def build_index(self, force: bool = False) -> str:
+        """
+        Builds the metadata index (location, number of turns and tags of each dialogue) in a compact SQLite table,
+        scanning the dataset once. The index is only rebuilt if it is missing or stale (see
+        :meth:`_get_index_stamp`) unless `force` is True. Other methods only check it on their first access (see
+        :meth:`refresh`).
+
+        :param force: If True, rebuilds the index even if it is up to date.
+        :type force: bool
+        :return: Path of the index file.
+        :rtype: str
+        """
+        index_path = self.get_index_path()
+        stamp = f"{self.INDEX_VERSION}:{type(self).__name__}:{self._get_index_stamp()}"
+        if not force and os.path.exists(index_path):
+            try:
+                with sqlite3.connect(index_path) as conn:
+                    row = conn.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+                if row and row[0] == stamp:
+                    self._index = index_path
+                    return index_path
+            except sqlite3.DatabaseError:
+                pass
+
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript("""
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE dialogs (ix INTEGER PRIMARY KEY, id, location TEXT, n_turns INTEGER);
+                CREATE TABLE tags (ix INTEGER, key TEXT, value TEXT);
+            """)
+            for ix, (dialog_id, location, n_turns, tags) in enumerate(tqdm(self._scan(), desc="Indexing dialogs",
+                                                                           leave=False)):
+                conn.execute("INSERT INTO dialogs VALUES (?, ?, ?, ?)", (ix, dialog_id, location, n_turns))
+                conn.executemany("INSERT INTO tags VALUES (?, ?, ?)",
+                                 [(ix, key, self._tag_value(value))
+                                  for key, values in tags.items() for value in values])
+            conn.executescript("""
+                CREATE INDEX dialogs_id ON dialogs (id);
+                CREATE INDEX tags_key_value ON tags (key, value);
+            """)
+            conn.execute("INSERT INTO meta VALUES ('stamp', ?)", (stamp,))
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, index_path)  # atomic, concurrent readers never see partial indexes
+        self._index = index_path
+        return index_path
+
+    def refresh(self):
+        """
+        Forgets that the index was checked to be up to date, so that it is checked again (and rebuilt if the
+        dataset changed) on the next access. The index is only checked on the first access otherwise.
+        """
+        self._index = None
+        self._ids = None
+
+    def _get_index(self) -> str:
+        return self._index or self.build_index()
+
+    @staticmethod
+    def _tag_value(value) -> str:
+        return str(int(value)) if isinstance(value, bool) else str(value)
+
+    def _query(self, columns: str, filters: dict, shard_index: int = 0, num_shards: int = 1) -> list:
+        """
+        Returns the given columns of the (sharded) dialogues matching the filters, in index order.
+        """
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(f"Invalid shard index {shard_index} (valid values: 0 to {num_shards - 1})")
+        query, params = f"SELECT {columns} FROM dialogs WHERE 1 = 1", []
+        for key, value in filters.items():
+            if value is not None:
+                query += " AND ix IN (SELECT ix FROM tags WHERE key = ? AND value = ?)"
+                params.extend([key, self._tag_value(value)])
+        with sqlite3.connect(self._get_index()) as conn:
+            return conn.execute(query + " ORDER BY ix", params).fetchall()[shard_index::num_shards]
+
+    def get_dialog_ids(self, shard_index: int = 0, num_shards: int = 1, **filters) -> list:
+        """
+        Gets the IDs of the dialogues matching the given tag filters (e.g. ``domain="hotel"``) from the metadata
+        index, without reading any dialogue.
+
+        :param shard_index: Index of the shard to return (from 0 to `num_shards` - 1).
+        :type shard_index: int
+        :param num_shards: Number of shards the matching dialogues are split into (deterministically, by index
+                           position), so that distributed jobs can split the corpus without coordination.
+        :type num_shards: int
+        :param filters: Tag filters (`None` values are ignored).
+        :return: List of matching dialogue IDs, in index order.
+        :rtype: list
+        """
+        return [row[0] for row in self._query("id", filters, shard_index, num_shards)]
+
+    def get_dialog(self, id) -> Dialog:
+        """
+        Loads a dialogue by ID.
+
+        :param id: Dialogue ID.
+        :return: The dialogue.
+        :rtype: Dialog
+        """
+        with sqlite3.connect(self._get_index()) as conn:
+            row = conn.execute("SELECT location FROM dialogs WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Dialogue '{id}' not found in {self.path}")
+        return self._read_dialog(id, row[0])
+
+    def iter_dialogs(self, workers: int = None, chunk_size: int = 64, ordered: bool = True,
+                     shard_index: int = 0, num_shards: int = 1, **filters) -> Iterator[Dialog]:
+        """
+        Lazily iterates over the dialogues matching the given tag filters, optionally reading them in worker
+        processes (dialogues are yielded as soon as their chunk is read, only a few chunks are kept in memory).
+
+        :param workers: Number of worker processes (if not given or lower than 2, dialogues are read in the
+                        current process).
+        :type workers: int
+        :param chunk_size: Number of dialogues read per worker task.
+        :type chunk_size: int
+        :param ordered: If True, dialogues are yielded in index order; otherwise, as soon as they are read.
+        :type ordered: bool
+        :param shard_index: Index of the shard to iterate (from 0 to `num_shards` - 1).
+        :type shard_index: int
+        :param num_shards: Number of shards the matching dialogues are split into (see :meth:`get_dialog_ids`).
+        :type num_shards: int
+        :param filters: Tag filters (`None` values are ignored).
+        :return: Iterator over the matching dialogues.
+        :rtype: Iterator[Dialog]
+        """
+        entries = self._query("id, location", filters, shard_index, num_shards)
+
+        if not workers or workers < 2:
+            for dialog_id, location in entries:
+                yield self._read_dialog(dialog_id, location)
+            return
+
+        # the dataset is sent once to each worker, tasks only carry their entries
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_dataset_worker, initargs=(self,)) as executor:
+            pending = []  # at most two chunks per worker are in flight (bounded memory)
+
+            def pop_completed():
+                if ordered:
+                    return [pending.pop(0)]
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                return done
+
+            for start in range(0, len(entries), chunk_size):
+                pending.append(executor.submit(_read_dataset_dialogs, entries[start:start + chunk_size]))
+                if len(pending) >= workers * 2:
+                    for future in pop_completed():
+                        yield from future.result()
+            while pending:
+                for future in pop_completed():
+                    yield from future.result()
+
+    def get_dialogs(self, **filters) -> List[Dialog]:
+        """
+        Loads all the dialogues matching the given tag filters.
+
+        :param filters: Tag filters (`None` values are ignored).
+        :return: List of matching dialogues.
+        :rtype: List[Dialog]
+        """
+        return list(tqdm(self.iter_dialogs(**filters), desc="Reading dialogs", leave=False))
+
+    def __len__(self):
+        if self._ids is None:
+            self._ids = self.get_dialog_ids()
+        return len(self._ids)
+
+    def __getitem__(self, ix: int) -> Dialog:
+        if self._ids is None:
+            self._ids = self.get_dialog_ids()
+        return self.get_dialog(self._ids[ix])
+
+    def __iter__(self) -> Iterator[Dialog]:
+        return self.iter_dialogs()
+
+
+class JSONDialogDataset(BaseDialogDataset):
     """
-    _path = None
-    _speakers = ["User", "Wizard"]
+    Streaming reader for local JSON / JSONL dialogue corpora, supporting the common layouts:
+
+    - Schema-Guided Dialogue (SGD) and MultiWOZ 2.2: lists of ``{"dialogue_id", "services", "turns": [{"speaker",
+      "utterance", ...}]}`` dialogues.
+    - MultiWOZ 2.0 / 2.1 (``data.json``): ``{dialogue_id: {"goal", "log": [{"text", ...}]}}`` (alternating user
+      and system turns).
+    - sdialog dialogues (as saved by :meth:`Dialog.to_file`).
+
+    The path can be a single file or a folder (all ``.json`` and ``.jsonl`` files are read recursively, files
+    without dialogues, such as schemas or ontologies, are ignored). JSONL files are read line by line, so only
+    the requested dialogues are parsed; JSON files are parsed once per (worker) process and cached.
+    Dialogues can be filtered by ``domain`` (the dialogue services / goal domains).
+
+    Example:
+
+        .. code-block:: python
+
+            sgd = JSONDialogDataset("dstc8-schema-guided-dialogue/train")
+            for dialog in sgd.iter_dialogs(domain="Restaurants_1", workers=4):
+                ...
+
+    :param path: Path to the corpus file or folder.
+    :type path: str
+    :param index_path: Path of the metadata index (see :class:`BaseDialogDataset`).
+    :type index_path: str
+    """
+    SPEAKERS = {"USER": "User", "SYSTEM": "System"}
+
+    def __init__(self, path: str, index_path: str = None):
+        super().__init__(path, index_path)
+        self._json_cache = (None, None)  # last parsed JSON file
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_json_cache"] = (None, None)
+        return state
+
+    def _get_files(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return [self.path]
+        return sorted(os.path.join(folder, fname)
+                      for folder, _, fnames in os.walk(self.path)
+                      for fname in fnames
+                      if fname.endswith((".json", ".jsonl")) and self.INDEX_FILE not in fname)
+
+    def _get_index_stamp(self) -> str:
+        stats = [(fpath, os.stat(fpath).st_size, os.stat(fpath).st_mtime_ns) for fpath in self._get_files()]
+        return hashlib.sha256(json.dumps(stats).encode()).hexdigest()
+
+    def _read_json(self, fpath: str):
+        if self._json_cache[0] != fpath:
+            with open(fpath) as reader:
+                self._json_cache = (fpath, json.load(reader))
+        return self._json_cache[1]
 
     @staticmethod
-    def set_path(path):
+    def _get_dialogs(data) -> Iterator[Tuple[Any, dict]]:
         """
-        Sets the root path for the STAR dataset.
+        Yields the (position, dialogue) pairs in the content of a JSON file.
+        """
+        if isinstance(data, list):
+            for ix, dialog in enumerate(data):
+                if JSONDialogDataset._is_dialog(dialog):
+                    yield ix, dialog
+        elif JSONDialogDataset._is_dialog(data):
+            yield None, data
+        elif isinstance(data, dict):
+            for dialog_id, dialog in data.items():
+                if JSONDialogDataset._is_dialog(dialog):
+                    yield dialog_id, dialog
 
-        :param path: Path to the STAR dataset root.
-        :type path: str
+    @staticmethod
+    def _is_dialog(data) -> bool:
+        return isinstance(data, dict) and (isinstance(data.get("turns"), list) or isinstance(data.get("log"), list))
+
+    @staticmethod
+    def _get_domains(dialog: dict) -> List[str]:
+        if "services" in dialog:
+            return list(dialog["services"])
+        if isinstance(dialog.get("goal"), dict):
+            return [domain for domain, value in dialog["goal"].items()
+                    if value and domain not in ["message", "topic"]]
+        return []
+
+    def _scan(self) -> Iterator[Tuple[Any, str, int, Dict[str, list]]]:
+        for fpath in self._get_files():
+            rel_path = os.path.relpath(fpath, self.path) if os.path.isdir(self.path) else ""
+            if fpath.endswith(".jsonl"):
+                with open(fpath, "rb") as reader:
+                    offset = 0
+                    for line in reader:
+                        if line.strip():
+                            dialog = json.loads(line)
+                            if self._is_dialog(dialog):
+                                yield self._get_entry(dialog, rel_path, offset)
+                        offset += len(line)
+            else:
+                with open(fpath) as reader:
+                    data = json.load(reader)
+                for position, dialog in self._get_dialogs(data):
+                    yield self._get_entry(dialog, rel_path, position)
+
+    @staticmethod
+    def _get_entry(dialog: dict, rel_path: str, position) -> Tuple[Any, str, int, dict]:
         """
-        STAR._path = path
+        Returns the index entry of a dialogue, located at `position` (byte offset for JSONL files, list index or
+        dictionary key for JSON files) of the given file.
+        """
+        dialog_id = dialog.get("dialogue_id", dialog.get("dialogId"))
+        if dialog_id is None:
+            dialog_id = position if isinstance(position, str) else f"{rel_path}:{position}"
+        turns = dialog["turns"] if "turns" in dialog else dialog["log"]
+        tags = {"domain": JSONDialogDataset._get_domains(dialog)}
+        return dialog_id, json.dumps([rel_path, position]), len(turns), tags
+
+    def _read_dialog(self, id, location: str) -> Dialog:
+        rel_path, position = json.loads(location)
+        fpath = os.path.join(self.path, rel_path) if rel_path else self.path
+        if fpath.endswith(".jsonl"):
+            with open(fpath, "rb") as reader:
+                reader.seek(position)
+                dialog = json.loads(reader.readline())
+        else:
+            data = self._read_json(fpath)
+            dialog = data if position is None else data[position]
+        return self.to_dialog(id, dialog)
 
     @staticmethod
-    def read_graph(task_name, as_dot: bool = True):
+    def to_dialog(id, dialog: dict) -> Dialog:
+        """
+        Converts a dialogue in any of the supported layouts to a :class:`~sdialog.Dialog`.
+
+        :param id: Dialogue ID.
+        :param dialog: The dialogue.
+        :type dialog: dict
+        :return: The dialogue.
+        :rtype: Dialog
+        """
+        if "log" in dialog:  # MultiWOZ 2.0 / 2.1
+            return Dialog(dialogId=id,
+                          scenario={"domains": JSONDialogDataset._get_domains(dialog), "goal": dialog["goal"]},
+                          turns=[Turn(speaker="User" if ix % 2 == 0 else "System", text=turn["text"])
+                                 for ix, turn in enumerate(dialog["log"])])
+        if dialog["turns"] and "utterance" in dialog["turns"][0]:  # SGD / MultiWOZ 2.2
+            return Dialog(dialogId=id,
+                          scenario={"domains": JSONDialogDataset._get_domains(dialog)},
+                          turns=[Turn(speaker=JSONDialogDataset.SPEAKERS.get(turn["speaker"], turn["speaker"]),
+                                      text=turn["utterance"])
+                                 for turn in dialog["turns"]])
+        dialog = Dialog.from_dict(dialog)  # sdialog
+        dialog.dialogId = id
+        return dialog
+
+    def get_agents(self, id, model_name, **kwargs) -> Tuple[PersonaAgent, PersonaAgent]:
+        """
+        Constructs (system, user) agents to re-generate a dialogue of the corpus from its scenario (domains and,
+        if available, user goal) and first system turn.
+
+        :param id: Dialogue ID.
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :param kwargs: Additional arguments for :class:`~sdialog.personas.PersonaAgent`.
+        :return: (system, user) agents.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        dialog = self.get_dialog(id)
+        scenario = dialog.scenario if isinstance(dialog.scenario, dict) else {"description": dialog.scenario}
+        domains = ", ".join(scenario.get("domains", [])) or "any domain"
+        goal = scenario.get("goal", {}).get("message") if isinstance(scenario.get("goal"), dict) else None
+        user = PersonaAgent(model_name,
+                            Persona(role=f"user calling a AI assistant that can perform tasks in: {domains}.",
+                                    circumstances=" ".join(goal) if isinstance(goal, list) else goal or ""),
+                            name="User", can_finish=True, **kwargs)
+        system = PersonaAgent(model_name,
+                              Persona(role=f"AI assistant that can perform tasks in: {domains}."),
+                              name="System", **kwargs)
+        if dialog.turns and dialog.turns[0].speaker == "System":
+            system.set_first_utterances(dialog.turns[0].text)
+        return system, user
+
+
+class STARRecord(BaseModel):
+    """
+    A STAR dialogue parsed once, with all the per-dialogue views used by :class:`STAR` precomputed in a single
+    linear pass over its events.
+
+    :ivar id: Dialogue ID.
+    :vartype id: int
+    :ivar scenario: Scenario metadata.
+    :vartype scenario: dict
+    :ivar events: Raw events of the dialogue (original agent names).
+    :vartype events: List[dict]
+    :ivar first_turn: First turn of any of the speakers (User or Wizard).
+    :vartype first_turn: Optional[Turn]
+    :ivar first_turns: First turn of each agent, by agent name.
+    :vartype first_turns: Dict[str, Turn]
+    :ivar user_instructions: User instructions mapped by the number of user turns before them.
+    :vartype user_instructions: Dict[int, str]
+    """
+    id: int
+    scenario: dict
+    events: List[dict]
+    first_turn: Optional[Turn] = None
+    first_turns: Dict[str, Turn] = {}
+    user_instructions: Dict[int, str] = {}
+
+    @property
+    def task_names(self) -> List[str]:
+        """Task names of the dialogue."""
+        return [task["Task"] for task in self.scenario["WizardCapabilities"]]
+
+    @staticmethod
+    def from_json(id: int, dialog: dict, speakers: List[str] = ("User", "Wizard")) -> "STARRecord":
+        """
+        Builds the record from the content of a STAR dialogue file.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :param dialog: Parsed dialogue file.
+        :type dialog: dict
+        :param speakers: Agents considered speakers for the first turn.
+        :type speakers: List[str]
+        :return: The dialogue record.
+        :rtype: STARRecord
+        """
+        first_turn = None
+        first_turns = {}
+        user_instructions = {}
+        n_user_turns = 0
+        for event in dialog["Events"]:
+            agent = event["Agent"]
+            if agent not in first_turns and "Text" in event:
+                first_turns[agent] = Turn(speaker=agent, text=event["Text"])
+                if first_turn is None and agent in speakers:
+                    first_turn = first_turns[agent]
+            if agent == "User" and event["Action"] == "utter":
+                n_user_turns += 1
+            elif agent == "UserGuide" and event["Action"] == "instruct":
+                user_instructions[n_user_turns] = event["Text"]
+        return STARRecord(id=int(id), scenario=dialog["Scenario"], events=dialog["Events"],
+                          first_turn=first_turn, first_turns=first_turns, user_instructions=user_instructions)
+
+
+class STARTaskAssets(BaseModel):
+    """
+    The assets of a STAR task (action graph and example responses), parsed and rendered once.
+
+    :ivar task_name: Name of the task.
+    :vartype task_name: str
+    :ivar graph: The action graph (action to next action).
+    :vartype graph: dict
+    :ivar dot: The action graph in DOT format.
+    :vartype dot: str
+    :ivar responses: Example response for each action (placeholders normalized to UPPERCASE words).
+    :vartype responses: dict
+    :ivar responses_json: The example responses as an indented JSON string.
+    :vartype responses_json: str
+    :ivar graph_compact: The action graph as a list of paths (``action -> next action -> ...``, one per line), each
+                         transition appearing once.
+    :vartype graph_compact: str
+    :ivar responses_json_compact: The example responses as a JSON string without whitespaces.
+    :vartype responses_json_compact: str
+    """
+    task_name: str
+    graph: dict
+    dot: str
+    responses: dict
+    responses_json: str
+    graph_compact: str = ""
+    responses_json_compact: str = ""
+
+    @staticmethod
+    def from_json(task_name: str, graph: dict, responses: dict) -> "STARTaskAssets":
+        """
+        Builds the task assets from the content of the task graph and responses files.
+
+        :param task_name: Name of the task.
+        :type task_name: str
+        :param graph: The action graph.
+        :type graph: dict
+        :param responses: The raw example responses.
+        :type responses: dict
+        :return: The task assets.
+        :rtype: STARTaskAssets
+        """
+        dot_edges = ";\n".join(f"    {a} -> {b}" for a, b in graph.items())
+        responses = {key: re.sub(r"{(.+?)(?::\w+?)?}", lambda m: m.group(1).upper(), value)
+                     for key, value in responses.items()
+                     if key != "out_of_scope"}
+        return STARTaskAssets(task_name=task_name,
+                              graph=graph,
+                              dot="digraph %s  {\n%s\n}" % (task_name, dot_edges),
+                              responses=responses,
+                              responses_json=json.dumps(responses, indent=2),
+                              graph_compact=STARTaskAssets._get_graph_paths(graph),
+                              responses_json_compact=json.dumps(responses, separators=(",", ":")))
+
+    @staticmethod
+    def _get_graph_paths(graph: dict) -> str:
+        """
+        Encodes the action graph as the minimal list of paths covering all the transitions, by following chains of
+        actions that have a single incoming transition.
+        """
+        in_degree = Counter(graph.values())
+        visited = set()
+        paths = []
+        for action in [a for a in graph if in_degree[a] != 1] + list(graph):  # path starts first, then cycles
+            if action in visited:
+                continue
+            path = [action]
+            while action in graph and action not in visited:
+                visited.add(action)
+                action = graph[action]
+                path.append(action)
+                if in_degree[action] != 1:
+                    break
+            paths.append(" -> ".join(path))
+        return "\n".join(paths)
+
+
+class STARDataset(BaseDialogDataset):
+    """
+    The STAR dataset as a :class:`BaseDialogDataset`. Dialogues can be filtered by ``domain``, ``task_name``,
+    ``happy`` and ``multitask``.
+
+    Each instance keeps its own caches (parsed dialogue records, task assets, personas and the pool of agent
+    templates), so several instances (e.g. for different copies of the dataset) can be used at the same time,
+    from different threads. The static :class:`STAR` utilities are wrappers over a default instance.
+
+    Example:
+
+        .. code-block:: python
+
+            star = STARDataset("STAR/")
+            for dialog in star.iter_dialogs(task_name="bank_balance", happy=True, workers=4):
+                ...
+            system, user = star.get_agents(1, "qwen2.5:14b")
+
+    :param path: Path to the STAR dataset root.
+    :type path: str
+    :param index_path: Path of the metadata index (see :class:`BaseDialogDataset`).
+    :type index_path: str
+    :param flowchart_encoding: How task flowcharts are encoded in scenario descriptions and system prompts (see
+                               :meth:`set_flowchart_encoding`).
+    :type flowchart_encoding: str
+    """
+    RECORD_CACHE_SIZE = 4096  # number of parsed dialogues kept in memory
+    AGENT_POOL_SIZE = 1024  # number of agent templates kept in the pool
+    SPEAKERS = ["User", "Wizard"]
+    USER_SCENARIO_FIELDS = ["domains", "tasks", "user_task", "happy", "multitask"]  # the user persona depends on
+    SYSTEM_SCENARIO_FIELDS = ["tasks", "system_task"]  # the system persona depends on
+    FLOWCHART_ENCODINGS = ["dot", "compact", "graph"]
+
+    def __init__(self, path: str, index_path: str = None, flowchart_encoding: str = "dot"):
+        super().__init__(path, index_path)
+        self.set_flowchart_encoding(flowchart_encoding)
+        self._init_caches()
+
+    def _init_caches(self, task_assets: dict = None):
+        self._lock = threading.RLock()
+        self._records = OrderedDict()  # dialogue ID -> record (LRU)
+        self._task_assets = task_assets or {}  # task name -> assets
+        self._personas = {}  # (role, flowchart encoding, scenario signature) -> persona
+        self._agent_templates = OrderedDict()  # (role, model, flowchart encoding, scenario signature) -> agent (LRU)
+        self._orchestrator_templates = {}  # (task, flow graph, encoder) -> template response orchestrator
+        self._llms = {}  # model name -> LLM client of the agent templates (each pooled agent gets its own copy)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for key in ["_lock", "_records", "_personas", "_agent_templates", "_orchestrator_templates", "_llms"]:
+            del state[key]  # rebuilt in worker processes (agents and locks are not picklable), task assets are kept
+        return state
+
+    def __setstate__(self, state):
+        task_assets = state.pop("_task_assets")
+        self.__dict__.update(state)
+        self._init_caches(task_assets)
+
+    def set_flowchart_encoding(self, encoding: str):
+        """
+        Sets how task flowcharts are encoded in scenario descriptions and system prompts (by default, "dot"):
+
+        - "dot": the action graph in DOT format and the example responses as indented JSON.
+        - "compact": the action graph as a list of paths, each transition appearing once, and the example
+          responses as JSON without whitespaces.
+        - "graph": only the action graph as a list of paths (the example responses relevant to the current action
+          are expected to be provided turn by turn, e.g. by the response orchestrators).
+
+        See :meth:`get_flowchart_token_report` to compare the prompt size of each encoding.
+
+        :param encoding: The flowchart encoding.
+        :type encoding: str
+        """
+        if encoding not in self.FLOWCHART_ENCODINGS:
+            raise ValueError(f"Unknown flowchart encoding '{encoding}' "
+                             f"(valid encodings: {', '.join(self.FLOWCHART_ENCODINGS)})")
+        self.flowchart_encoding = encoding
+
+    def clear_cache(self):
+        """
+        Clears all the in-memory caches (dialogue records, task assets, personas and the agent template pool) and
+        checks the index again on the next access (see :meth:`refresh`).
+        """
+        with self._lock:
+            self._init_caches()
+        self.refresh()
+
+    @staticmethod
+    def to_scenario(scenario: dict) -> Scenario:
+        """
+        Converts the scenario metadata of a STAR dialogue to a :class:`~sdialog.personas.Scenario`.
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :return: The scenario.
+        :rtype: Scenario
+        """
+        return Scenario(domains=list(scenario["Domains"]),
+                        tasks=[{"task": task["Task"], "domain": task["Domain"]}
+                               for task in scenario["WizardCapabilities"]],
+                        user_task=scenario["UserTask"],
+                        system_task=scenario["WizardTask"],
+                        happy=bool(scenario["Happy"]),
+                        multitask=bool(scenario["MultiTask"]))
+
+    def _get_index_stamp(self) -> str:
+        stats = [entry.stat() for entry in os.scandir(os.path.join(self.path, "dialogues"))
+                 if entry.name.endswith(".json")]
+        return f"{len(stats)}:{sum(st.st_size for st in stats)}:{max((st.st_mtime_ns for st in stats), default=0)}"
+
+    def _scan(self) -> Iterator[Tuple[Any, str, int, Dict[str, list]]]:
+        dialogues_path = os.path.join(self.path, "dialogues")
+        dialog_ids = sorted(int(os.path.splitext(fname)[0])
+                            for fname in os.listdir(dialogues_path) if fname.endswith(".json"))
+        for dialog_id in dialog_ids:
+            with open(os.path.join(dialogues_path, f"{dialog_id}.json")) as reader:
+                dialog = json.load(reader)
+            scenario = dialog["Scenario"]
+            yield dialog_id, f"{dialog_id}.json", len(dialog["Events"]), {
+                "domain": scenario["Domains"],
+                "task_name": [capability["Task"] for capability in scenario["WizardCapabilities"]],
+                "happy": [bool(scenario["Happy"])],
+                "multitask": [bool(scenario["MultiTask"])]
+            }
+
+    def _read_dialog(self, id, location: str) -> Dialog:
+        return self._build_dialog(self.get_dialog_record(id))
+
+    def get_dialog(self, id) -> Dialog:
+        return self._read_dialog(id, None)  # file name is known from the ID, no index lookup needed
+
+    def get_task_assets(self, task_name: str) -> STARTaskAssets:
+        """
+        Gets the (cached) assets of a task. Task files are read and parsed only once.
+
+        :param task_name: Name of the task.
+        :type task_name: str
+        :return: The task assets (must not be modified).
+        :rtype: STARTaskAssets
+        """
+        assets = self._task_assets.get(task_name)
+        if assets is None:
+            with open(os.path.join(self.path, f"tasks/{task_name}/{task_name}.json")) as reader:
+                graph = json.load(reader)["graph"]
+            with open(os.path.join(self.path, f"tasks/{task_name}/responses.json")) as reader:
+                responses = json.load(reader)
+            assets = self._task_assets.setdefault(task_name, STARTaskAssets.from_json(task_name, graph, responses))
+        return assets
+
+    def get_task_names(self) -> List[str]:
+        """
+        Gets the names of all the tasks in the dataset.
+
+        :return: Sorted task names.
+        :rtype: List[str]
+        """
+        tasks_path = os.path.join(self.path, "tasks")
+        return sorted(task_name for task_name in os.listdir(tasks_path)
+                      if os.path.exists(os.path.join(tasks_path, task_name, f"{task_name}.json")))
+
+    def preload_task_assets(self) -> List[str]:
+        """
+        Loads the assets of all the tasks in the dataset (e.g. before spawning workers, so that no task file is
+        read afterwards).
+
+        :return: Names of the loaded tasks.
+        :rtype: List[str]
+        """
+        task_names = self.get_task_names()
+        for task_name in task_names:
+            self.get_task_assets(task_name)
+        return task_names
+
+    def read_graph(self, task_name, as_dot: bool = True):
         """
         Reads the action graph for a given task.
 
@@ -51,15 +825,10 @@ class STAR:
         :return: The graph in DOT or dict format.
         :rtype: Union[str, dict]
         """
-        with open(os.path.join(STAR._path, f"tasks/{task_name}/{task_name}.json")) as reader:
-            if not as_dot:
-                return json.load(reader)["graph"]
-            dot_edges = ";\n".join(f"    {a} -> {b}" for a, b in json.load(reader)["graph"].items())
+        assets = self.get_task_assets(task_name)
+        return assets.dot if as_dot else dict(assets.graph)
 
-        return "digraph %s  {\n%s\n}" % (task_name, dot_edges)
-
-    @staticmethod
-    def read_graph_responses(task_name, as_dict: bool = False):
+    def read_graph_responses(self, task_name, as_dict: bool = False):
         """
         Reads example responses for each node in a task's graph.
 
@@ -70,78 +839,54 @@ class STAR:
         :return: Example responses.
         :rtype: Union[str, dict]
         """
-        with open(os.path.join(STAR._path, f"tasks/{task_name}/responses.json")) as reader:
-            responses = json.load(reader)
-            responses = {key: re.sub(r"{(.+?)(?::\w+?)?}", lambda m: m.group(1).upper(), value)
-                         for key, value in responses.items()
-                         if key != "out_of_scope"}
-            return responses if as_dict else json.dumps(responses, indent=2)
+        assets = self.get_task_assets(task_name)
+        return dict(assets.responses) if as_dict else assets.responses_json
 
-    @staticmethod
-    def get_dialog(id):
+    def get_dialog_record(self, id) -> STARRecord:
         """
-        Loads a dialogue by ID.
+        Gets the parsed record of a dialogue. Dialogue files are read and parsed only once (the last
+        ``RECORD_CACHE_SIZE`` records are cached in memory), all the ``get_dialog*`` methods are served from it.
 
         :param id: Dialogue ID.
         :type id: int
-        :return: The loaded dialogue object.
-        :rtype: Dialog
+        :return: The dialogue record (must not be modified).
+        :rtype: STARRecord
         """
-        with open(os.path.join(STAR._path, f"dialogues/{id}.json")) as reader:
-            dialog = json.load(reader)
+        id = int(id)
+        with self._lock:
+            record = self._records.get(id)
+            if record is not None:
+                self._records.move_to_end(id)
+                return record
+        with open(os.path.join(self.path, f"dialogues/{id}.json")) as reader:
+            record = STARRecord.from_json(id, json.load(reader), self.SPEAKERS)
+        with self._lock:
+            self._records[id] = record
+            if len(self._records) > self.RECORD_CACHE_SIZE:
+                self._records.popitem(last=False)
+        return record
 
-        for e in dialog["Events"]:
-            if e["Agent"] == "Wizard":
-                e["Agent"] = "System"
+    @staticmethod
+    def _build_dialog(record: STARRecord) -> Dialog:
+        def agent(e):
+            return "System" if e["Agent"] == "Wizard" else e["Agent"]
 
         return Dialog(
-            dialogId=id,
-            scenario=dialog["Scenario"],
-            turns=[Turn(speaker=e["Agent"], text=e["Text"])
-                   for e in dialog["Events"]
+            dialogId=record.id,
+            scenario=copy.deepcopy(record.scenario),
+            turns=[Turn(speaker=agent(e), text=e["Text"])
+                   for e in record.events
                    if e["Action"] in ["utter", "pick_suggestion"]],
-            events=[Event(agent=e["Agent"],
+            events=[Event(agent=agent(e),
                           action=e["Action"],
                           actionLabel=e["ActionLabel"] if "ActionLabel" in e else None,
                           text=e["Text"],
                           timestamp=e["UnixTime"])
-                    for e in dialog["Events"]
+                    for e in record.events
                     if "Text" in e]
         )
 
-    @staticmethod
-    def get_dialogs(domain: str = None, task_name: str = None, happy: bool = None, multitask: bool = None):
-        """
-        Loads all dialogues matching the specified criteria.
-
-        :param domain: Filter by domain.
-        :type domain: str
-        :param task_name: Filter by task name.
-        :type task_name: str
-        :param happy: Filter by 'happy path' status.
-        :type happy: bool
-        :param multitask: Filter by multitask status.
-        :type multitask: bool
-        :return: List of matching dialogues.
-        :rtype: List[Dialog]
-        """
-        dialogs = []
-        for fname in tqdm(os.listdir(os.path.join(STAR._path, "dialogues/")), desc="Reading dialogs", leave=False):
-            if not fname.endswith(".json"):
-                continue
-            dialog_id = int(os.path.splitext(fname)[0])
-            scenario = STAR.get_dialog_scenario(dialog_id)
-
-            if (domain is None or domain in scenario["Domains"]) and \
-               (happy is None or scenario["Happy"] == happy) and \
-               (multitask is None or scenario["MultiTask"] == multitask) and \
-               (task_name is None or any(capability["Task"] == task_name
-                                         for capability in scenario["WizardCapabilities"])):
-                dialogs.append(STAR.get_dialog(dialog_id))
-        return dialogs
-
-    @staticmethod
-    def get_dialog_scenario(id):
+    def get_scenario(self, id) -> dict:
         """
         Loads the scenario for a given dialogue.
 
@@ -150,11 +895,11 @@ class STAR:
         :return: Scenario metadata.
         :rtype: dict
         """
-        with open(os.path.join(STAR._path, f"dialogues/{id}.json")) as reader:
-            return json.load(reader)["Scenario"]
+        return copy.deepcopy(self.get_dialog_record(id).scenario)
 
-    @staticmethod
-    def get_dialog_first_turn(id, speaker: str = None):
+    get_dialog_scenario = get_scenario
+
+    def get_dialog_first_turn(self, id, speaker: str = None):
         """
         Gets the first turn for a given dialogue and speaker.
 
@@ -165,16 +910,11 @@ class STAR:
         :return: The first turn.
         :rtype: Turn
         """
-        with open(os.path.join(STAR._path, f"dialogues/{id}.json")) as reader:
-            for event in json.load(reader)["Events"]:
-                turn_speaker = event["Agent"]
-                if speaker is None and turn_speaker in STAR._speakers:
-                    return Turn(speaker=turn_speaker, text=event["Text"])
-                elif turn_speaker == speaker:
-                    return Turn(speaker=turn_speaker, text=event["Text"])
+        record = self.get_dialog_record(id)
+        turn = record.first_turn if speaker is None else record.first_turns.get(speaker)
+        return turn.model_copy() if turn is not None else None
 
-    @staticmethod
-    def get_dialog_task_names(id):
+    def get_dialog_task_names(self, id):
         """
         Gets the task names for a given dialogue.
 
@@ -183,11 +923,9 @@ class STAR:
         :return: List of task names.
         :rtype: List[str]
         """
-        scenario = STAR.get_dialog_scenario(id)
-        return [task["Task"] for task in scenario["WizardCapabilities"]]
+        return self.get_dialog_record(id).task_names
 
-    @staticmethod
-    def get_dialog_responses(id):
+    def get_dialog_responses(self, id):
         """
         Gets example responses for all tasks in a dialogue.
 
@@ -196,11 +934,9 @@ class STAR:
         :return: List of response dicts.
         :rtype: List[dict]
         """
-        tasks = STAR.get_dialog_task_names(id)
-        return [STAR.read_graph_responses(task, as_dict=True) for task in tasks]
+        return [self.read_graph_responses(task, as_dict=True) for task in self.get_dialog_task_names(id)]
 
-    @staticmethod
-    def get_dialog_graphs(id):
+    def get_dialog_graphs(self, id):
         """
         Gets action graphs for all tasks in a dialogue.
 
@@ -209,11 +945,9 @@ class STAR:
         :return: List of graphs.
         :rtype: List[dict]
         """
-        tasks = STAR.get_dialog_task_names(id)
-        return [STAR.read_graph(task, as_dot=False) for task in tasks]
+        return [self.read_graph(task, as_dot=False) for task in self.get_dialog_task_names(id)]
 
-    @staticmethod
-    def get_dialog_events(id):
+    def get_dialog_events(self, id):
         """
         Gets all events for a given dialogue.
 
@@ -222,11 +956,9 @@ class STAR:
         :return: List of events.
         :rtype: List[dict]
         """
-        with open(os.path.join(STAR._path, f"dialogues/{id}.json")) as reader:
-            return json.load(reader)["Events"]
+        return [dict(e) for e in self.get_dialog_record(id).events]
 
-    @staticmethod
-    def get_dialog_user_instructions(id):
+    def get_dialog_user_instructions(self, id):
         """
         Gets user instructions for a dialogue, mapped by turn index.
 
@@ -235,16 +967,9 @@ class STAR:
         :return: Mapping from turn index to instruction text.
         :rtype: dict
         """
-        def get_user_n_turns_before(turn_ix, events):
-            return len([e for e in events[:turn_ix]
-                        if e["Agent"] == "User" and e["Action"] == "utter"])
-        events = STAR.get_dialog_events(id)
-        return {get_user_n_turns_before(ix, events): e["Text"]
-                for ix, e in enumerate(events)
-                if e["Action"] == "instruct" and e["Agent"] == "UserGuide"}
+        return dict(self.get_dialog_record(id).user_instructions)
 
-    @staticmethod
-    def get_dialog_graphs_and_responses(id):
+    def get_dialog_graphs_and_responses(self, id):
         """
         Gets both graphs and responses for all tasks in a dialogue.
 
@@ -253,33 +978,45 @@ class STAR:
         :return: Graphs and responses.
         :rtype: Tuple[List[dict], List[dict]]
         """
-        return STAR.get_dialog_graphs(id), STAR.get_dialog_responses(id)
+        return self.get_dialog_graphs(id), self.get_dialog_responses(id)
 
-    @staticmethod
-    def get_scenario_description(scenario):
+    def get_scenario_description(self, scenario, encoding: str = None):
         """
         Generates a natural language description of a scenario, including flowcharts.
 
         :param scenario: Scenario metadata.
         :type scenario: dict
+        :param encoding: Flowchart encoding (see :meth:`set_flowchart_encoding`, by default, the one set there).
+        :type encoding: str
         :return: Natural language scenario description.
         :rtype: str
         """
+        encoding = encoding or self.flowchart_encoding
         # Let's generate the graph description for each task:
         flowcharts = ""
         for task in scenario["WizardCapabilities"]:
             task_name = task["Task"]
-            flowcharts += f"""
+            if encoding == "dot":
+                flowcharts += f"""
 The graph for the task '{task_name}' with domain '{task['Domain']}' is:
 ```dot
-{STAR.read_graph(task_name)}
+{self.read_graph(task_name)}
 ```
 and one example responses for each node is provided in the following json:
 ```json
-{STAR.read_graph_responses(task_name)}
+{self.read_graph_responses(task_name)}
 ```
 
 ---
+"""
+            else:
+                flowcharts += f"""
+The graph for the task '{task_name}' with domain '{task['Domain']}' is:
+{self.get_task_assets(task_name).graph_compact}
+"""
+                if encoding == "compact":
+                    flowcharts += f"""and one example responses for each node is provided in the following json:
+{self.get_task_assets(task_name).responses_json_compact}
 """
         # Finally, let's return the scenario object and natural language description for it.
         return f"""The conversation is between a User and a AI assistant in the following domains: {', '.join(scenario['Domains'])}.
@@ -287,8 +1024,7 @@ and one example responses for each node is provided in the following json:
 The User instructions are: {scenario['UserTask']}
 The AI assistant instructions are: {scenario['WizardTask']}
 
-In addition, the AI assistant is instructed to follow specific flowcharts to address the tasks. Flowcharts are defined as graph described using DOT.
-The actual DOT for the current tasks are:
+In addition, the AI assistant is instructed to follow specific flowcharts to address the tasks. {self._get_flowchart_format(encoding)}
 {flowcharts}
 
 Finally, the following should be considered regarding the conversation:
@@ -301,8 +1037,7 @@ Finally, the following should be considered regarding the conversation:
         "The user is calling to perform only the defined task (" + scenario['WizardCapabilities'][0]['Task'] + "), nothing else"}.
 """  # noqa: E501
 
-    @staticmethod
-    def get_dialog_scenario_description(id):
+    def get_dialog_scenario_description(self, id):
         """
         Gets the scenario and its description for a dialogue.
 
@@ -311,19 +1046,30 @@ Finally, the following should be considered regarding the conversation:
         :return: Scenario and description.
         :rtype: Tuple[dict, str]
         """
-        scenario = STAR.get_dialog_scenario(id)
-        return scenario, STAR.get_scenario_description(scenario)
+        scenario = self.get_scenario(id)
+        return scenario, self.get_scenario_description(scenario)
 
-    @staticmethod
-    def get_user_persona_for_scenario(scenario):
+    def _get_persona(self, role: str, scenario: dict, fields: List[str], build) -> Persona:
+        key = (role, self.flowchart_encoding, self.to_scenario(scenario).signature(fields))
+        with self._lock:
+            if key not in self._personas:
+                self._personas[key] = build(scenario)
+            return self._personas[key]
+
+    def get_user_persona_for_scenario(self, scenario):
         """
-        Constructs a Persona object for the user in a scenario.
+        Constructs a Persona object for the user in a scenario. Personas are memoized by scenario signature
+        (shared by all the dialogues with the same user-related scenario, they must not be modified).
 
         :param scenario: Scenario metadata.
         :type scenario: dict
         :return: The user persona.
         :rtype: Persona
         """
+        return self._get_persona("User", scenario, self.USER_SCENARIO_FIELDS, self._build_user_persona)
+
+    @staticmethod
+    def _build_user_persona(scenario) -> Persona:
         dialogue_details = f"""
 The following should be considered regarding the conversation:
    1. {"The conversation follows a 'happy path', meaning the conversations goes smoothly without any unexpected behavior"
@@ -340,55 +1086,135 @@ The following should be considered regarding the conversation:
             circumstances=scenario["UserTask"],
         )
 
-    @staticmethod
-    def get_flowchart_description_for_scenario(scenario):
+    def get_flowchart_description_for_scenario(self, scenario, encoding: str = None):
         """
         Generates a flowchart description for a scenario.
 
         :param scenario: Scenario metadata.
         :type scenario: dict
+        :param encoding: Flowchart encoding (see :meth:`set_flowchart_encoding`, by default, the one set there).
+        :type encoding: str
         :return: Flowchart description.
         :rtype: str
         """
+        encoding = encoding or self.flowchart_encoding
         flowcharts = ""
         for task in scenario["WizardCapabilities"]:
             task_name = task["Task"]
-            flowcharts += f"""
+            if encoding == "dot":
+                flowcharts += f"""
 ## {task_name} ({task['Domain']})
 
 The flowchart described as an action transition graph for the task '{task_name}' with domain '{task['Domain']}' is:
 ```dot
-{STAR.read_graph(task_name)}
+{self.read_graph(task_name)}
 ```
 Response example for each action is provided in the following json:
 ```json
-{STAR.read_graph_responses(task_name)}
+{self.read_graph_responses(task_name)}
 ```
 where UPPERCASE words above are just example placeholders. You MUST fill in those with any coherent values in the actual conversation.
+"""  # noqa: E501
+                continue
+
+            assets = self.get_task_assets(task_name)
+            flowcharts += f"""
+## {task_name} ({task['Domain']})
+
+{assets.graph_compact}
+"""
+            if encoding == "compact":
+                flowcharts += f"""Response example for each action (UPPERCASE words are placeholders you MUST fill in with coherent values):
+{assets.responses_json_compact}
 """  # noqa: E501
         return flowcharts
 
     @staticmethod
-    def get_system_persona_for_scenario(scenario):
+    def _get_flowchart_format(encoding: str) -> str:
+        """
+        Returns the sentence introducing the flowcharts in the given encoding.
+        """
+        if encoding == "dot":
+            return "Flowcharts are defined as graph described using DOT.\nThe actual DOT for the current tasks are:"
+        return ("Flowcharts are defined as action transition graphs, described as paths of actions "
+                "(`action -> next action -> ...`, one per line).\nThe actual graphs for the current tasks are:")
+
+    def get_flowchart_token_report(self, scenarios: List[dict], tokenizer=None) -> dict:
+        """
+        Compares the size of the flowchart descriptions of the given scenarios (e.g. the ones of the dialogues to
+        generate) in each flowchart encoding (see :meth:`set_flowchart_encoding`).
+
+        Example:
+
+            .. code-block:: python
+
+                scenarios = [STAR.get_dialog_scenario(id) for id in STAR.get_dialog_ids(multitask=True)]
+                STAR.get_flowchart_token_report(scenarios, tokenizer=AutoTokenizer.from_pretrained(...))
+                # {"dot": {"tokens": 3012.4, "max_tokens": 5210, "chars": ..., "ratio": 1.0},
+                #  "compact": {"tokens": 1544.1, ..., "ratio": 0.51}, ...}
+
+        :param scenarios: Scenario metadata of the dialogues.
+        :type scenarios: List[dict]
+        :param tokenizer: Tokenizer used to count tokens (an object with an ``encode()`` method, e.g. a Hugging Face
+                          tokenizer, or a function returning the list of tokens). If not given, tokens are
+                          approximated as words and punctuation marks.
+        :type tokenizer: Any
+        :return: For each encoding, the mean and max number of tokens, the mean number of characters and the ratio
+                 of tokens with respect to the "dot" encoding.
+        :rtype: dict
+        """
+        report = {}
+        for encoding in self.FLOWCHART_ENCODINGS:
+            descriptions = [self.get_flowchart_description_for_scenario(scenario, encoding=encoding)
+                            for scenario in scenarios]
+            tokens = [count_tokens(description, tokenizer) for description in descriptions]
+            report[encoding] = {"tokens": sum(tokens) / max(len(tokens), 1),
+                                "max_tokens": max(tokens, default=0),
+                                "chars": sum(map(len, descriptions)) / max(len(descriptions), 1)}
+        for encoding in self.FLOWCHART_ENCODINGS:
+            report[encoding]["ratio"] = report[encoding]["tokens"] / (report["dot"]["tokens"] or 1)
+        return report
+
+    def get_system_persona_for_scenario(self, scenario):
         """
-        Constructs a Persona object for the system/assistant in a scenario.
+        Constructs a Persona object for the system/assistant in a scenario. Personas are memoized by scenario
+        signature (shared by all the dialogues with the same system-related scenario, they must not be modified).
 
         :param scenario: Scenario metadata.
         :type scenario: dict
         :return: The system persona.
         :rtype: Persona
         """
-        dialogue_details = f"""In the conversation, the AI assistant is instructed to follow specific action flowcharts to address the tasks. Flowcharts are defined as graph described using DOT.
-The actual DOT for the current tasks are:
-{STAR.get_flowchart_description_for_scenario(scenario)}
+        return self._get_persona("System", scenario, self.SYSTEM_SCENARIO_FIELDS, self._build_system_persona)
+
+    def _build_system_persona(self, scenario) -> Persona:
+        dialogue_details = f"""In the conversation, the AI assistant is instructed to follow specific action flowcharts to address the tasks. {self._get_flowchart_format(self.flowchart_encoding)}
+{self.get_flowchart_description_for_scenario(scenario)}
 """  # noqa: E501
         return Persona(
             role="AI assistant.\n" + dialogue_details,
             circumstances=scenario['WizardTask'],
         )
 
-    @staticmethod
-    def get_agents_for_scenario(scenario, model_name):
+    def _get_agent_template(self, role: str, scenario: dict, model_name, fields: List[str], **kwargs) -> PersonaAgent:
+        model_key = model_name if isinstance(model_name, str) else id(model_name)
+        key = (role, model_key, self.flowchart_encoding, self.to_scenario(scenario).signature(fields))
+        with self._lock:
+            if key in self._agent_templates:
+                self._agent_templates.move_to_end(key)
+                return self._agent_templates[key]
+
+            persona = (self.get_user_persona_for_scenario(scenario) if role == "User"
+                       else self.get_system_persona_for_scenario(scenario))
+            agent = PersonaAgent(self._llms.get(model_key, model_name), persona, name=role, **kwargs)
+            if isinstance(model_name, str):
+                self._llms[model_name] = agent.llm
+            self._agent_templates[key] = agent
+            if len(self._agent_templates) > self.AGENT_POOL_SIZE:
+                self._agent_templates.popitem(last=False)
+            return agent
+
+    def get_agents_for_scenario(self, scenario, model_name, pool: bool = True):
         """
         Constructs PersonaAgent objects for the user and system for a scenario.
 
@@ -396,22 +1222,32 @@ The actual DOT for the current tasks are:
         :type scenario: dict
         :param model_name: Model name or LLM to use.
         :type model_name: str
+        :param pool: If True, agents are forked from a pool of template agents keyed by scenario signature, so
+                     agents of dialogues with the same scenario share their prompt, and all agents of the same
+                     model are built from the same LLM client (returned agents are always in their initial state,
+                     each with its own copy of the client, so they can be used from different threads).
+        :type pool: bool
         :return: (system, user) agents.
         :rtype: Tuple[PersonaAgent, PersonaAgent]
         """
+        if pool:
+            user = self._get_agent_template("User", scenario, model_name, self.USER_SCENARIO_FIELDS,
+                                            can_finish=True)
+            system = self._get_agent_template("System", scenario, model_name, self.SYSTEM_SCENARIO_FIELDS)
+            return system.fork(), user.fork()
+
         user = PersonaAgent(model_name,
-                            STAR.get_user_persona_for_scenario(scenario),
+                            self.get_user_persona_for_scenario(scenario),
                             name="User",
                             can_finish=True)
 
         system = PersonaAgent(model_name,
-                              STAR.get_system_persona_for_scenario(scenario),
+                              self.get_system_persona_for_scenario(scenario),
                               name="System")
 
         return system, user
 
-    @staticmethod
-    def get_agents_from_dialogue(id, model_name: str, set_first_utterance: bool = False):
+    def get_agents_from_dialogue(self, id, model_name: str, set_first_utterance: bool = False):
         """
         Constructs PersonaAgent objects for a dialogue, optionally setting the first utterance.
 
@@ -424,11 +1260,11 @@ The actual DOT for the current tasks are:
         :return: (system, user) agents.
         :rtype: Tuple[PersonaAgent, PersonaAgent]
         """
-        scenario = STAR.get_dialog_scenario(id)
-        system, user = STAR.get_agents_for_scenario(scenario, model_name)
+        scenario = self.get_scenario(id)
+        system, user = self.get_agents_for_scenario(scenario, model_name)
 
         if set_first_utterance:
-            first_turn = STAR.get_dialog_first_turn(id)
+            first_turn = self.get_dialog_first_turn(id)
             if first_turn.speaker == "Wizard":
                 system.set_first_utterances(first_turn.text)
             else:
@@ -436,8 +1272,8 @@ The actual DOT for the current tasks are:
 
         return system, user
 
-    @staticmethod
-    def get_agents_from_dialogue_with_orchestration(id, model_name: str, set_first_utterance: bool = False):
+    def get_agents_from_dialogue_with_orchestration(self, id, model_name: str, set_first_utterance: bool = False,
+                                                    flow_graph: bool = False, sbert_model: str = None):
         """
         Constructs PersonaAgent objects with orchestration for a dialogue.
 
@@ -447,16 +1283,606 @@ The actual DOT for the current tasks are:
         :type model_name: str
         :param set_first_utterance: If True, sets the first utterance.
         :type set_first_utterance: bool
+        :param flow_graph: If True, the system follows the task flowchart with a ``FlowGraphOrchestrator`` (no
+                           lookahead LLM calls) instead of a ``SimpleResponseOrchestrator``.
+        :type flow_graph: bool
+        :param sbert_model: Sentence encoder of the response orchestrator (by default, the orchestrator's default).
+        :type sbert_model: str
         :return: (system, user) agents with orchestrators.
         :rtype: Tuple[PersonaAgent, PersonaAgent]
         """
-        system, user = STAR.get_agents_from_dialogue(id, model_name, set_first_utterance)
-
-        graphs, responses = STAR.get_dialog_graphs_and_responses(id)
-        response_action_orchestrator = SimpleResponseOrchestrator(responses[0], graph=graphs[0])
+        system, user = self.get_agents_from_dialogue(id, model_name, set_first_utterance)
+
+        task_name = self.get_dialog_task_names(id)[0]
+        key = (task_name, flow_graph, sbert_model)
+        with self._lock:
+            if key not in self._orchestrator_templates:
+                graph = self.read_graph(task_name, as_dot=False)
+                responses = self.read_graph_responses(task_name, as_dict=True)
+                encoder_kwargs = {"sbert_model": sbert_model} if sbert_model else {}
+                if flow_graph:
+                    self._orchestrator_templates[key] = FlowGraphOrchestrator(graph, responses, **encoder_kwargs)
+                else:
+                    self._orchestrator_templates[key] = SimpleResponseOrchestrator(responses, graph=graph,
+                                                                                   **encoder_kwargs)
+            response_action_orchestrator = self._orchestrator_templates[key].clone()
         instr_list_orchestrator = InstructionListOrchestrator(
-            STAR.get_dialog_user_instructions(id),
+            self.get_dialog_user_instructions(id),
             persistent=True
         )
 
         return system | response_action_orchestrator, user | instr_list_orchestrator
+
+    def get_agents(self, id, model_name, orchestration: bool = True, set_first_utterance: bool = False,
+                   flow_graph: bool = False, sbert_model: str = None) -> Tuple[PersonaAgent, PersonaAgent]:
+        """
+        Constructs the (system, user) agents for a dialogue (see :meth:`get_agents_from_dialogue` and
+        :meth:`get_agents_from_dialogue_with_orchestration`).
+
+        :param id: Dialogue ID.
+        :type id: int
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :param orchestration: If True, agents are orchestrated (flowchart responses and user instructions).
+        :type orchestration: bool
+        :param set_first_utterance: If True, sets the first utterance.
+        :type set_first_utterance: bool
+        :param flow_graph: If True, the system is orchestrated with a ``FlowGraphOrchestrator``.
+        :type flow_graph: bool
+        :param sbert_model: Sentence encoder of the response orchestrator (by default, the orchestrator's default).
+        :type sbert_model: str
+        :return: (system, user) agents.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        if orchestration:
+            return self.get_agents_from_dialogue_with_orchestration(id, model_name, set_first_utterance,
+                                                                    flow_graph=flow_graph, sbert_model=sbert_model)
+        return self.get_agents_from_dialogue(id, model_name, set_first_utterance)
+
+
+class STAR:
+    """
+    Utility class for interacting with the STAR dialogue dataset.
+
+    Provides methods for loading dialogues, extracting scenarios, flowcharts, responses, and constructing
+    PersonaAgent objects for simulation and evaluation. These static methods are wrappers over a default
+    :class:`STARDataset` at the path given to :meth:`set_path` (use :class:`STARDataset` directly to work with
+    several copies of the dataset at once).
+    """
+    _path = None
+    _index_path = None
+    _flowchart_encoding = "dot"
+    _dataset = None  # default STARDataset (at the current path)
+    USER_SCENARIO_FIELDS = STARDataset.USER_SCENARIO_FIELDS
+    SYSTEM_SCENARIO_FIELDS = STARDataset.SYSTEM_SCENARIO_FIELDS
+    FLOWCHART_ENCODINGS = STARDataset.FLOWCHART_ENCODINGS
+
+    @staticmethod
+    def set_path(path, index_path: str = None):
+        """
+        Sets the root path for the STAR dataset.
+
+        :param path: Path to the STAR dataset root.
+        :type path: str
+        :param index_path: Path of the dialogue metadata index (see :meth:`build_index`). By default, it is stored
+                           in the dataset folder (or in ``~/.cache/sdialog`` if the folder is not writable).
+        :type index_path: str
+        """
+        STAR._path = path
+        STAR._index_path = index_path
+        STAR._dataset = None
+
+    @staticmethod
+    def set_flowchart_encoding(encoding: str):
+        """
+        Sets how task flowcharts are encoded in scenario descriptions and system prompts (see
+        :meth:`STARDataset.set_flowchart_encoding`).
+
+        :param encoding: The flowchart encoding ("dot", "compact" or "graph").
+        :type encoding: str
+        """
+        if encoding not in STAR.FLOWCHART_ENCODINGS:
+            raise ValueError(f"Unknown flowchart encoding '{encoding}' "
+                             f"(valid encodings: {', '.join(STAR.FLOWCHART_ENCODINGS)})")
+        STAR._flowchart_encoding = encoding
+        if STAR._dataset is not None:
+            STAR._dataset.set_flowchart_encoding(encoding)
+
+    @staticmethod
+    def clear_cache():
+        """
+        Clears all the in-memory caches (dialogue records, task assets, personas and the agent template pool).
+        """
+        if STAR._dataset is not None:
+            STAR._dataset.clear_cache()
+
+    @staticmethod
+    def get_scenario(scenario: dict) -> Scenario:
+        """
+        Converts the scenario metadata of a STAR dialogue to a :class:`~sdialog.personas.Scenario`.
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :return: The scenario.
+        :rtype: Scenario
+        """
+        return STARDataset.to_scenario(scenario)
+
+    @staticmethod
+    def get_dataset() -> STARDataset:
+        """
+        Gets the default :class:`STARDataset` (at the current path), which all the static methods are served from.
+
+        :return: The dataset.
+        :rtype: STARDataset
+        """
+        if STAR._dataset is None:
+            STAR._dataset = STARDataset(STAR._path, STAR._index_path, flowchart_encoding=STAR._flowchart_encoding)
+        return STAR._dataset
+
+    @staticmethod
+    def get_index_path() -> str:
+        """
+        Gets the path of the dialogue metadata index.
+
+        :return: Path of the SQLite index file.
+        :rtype: str
+        """
+        return STAR.get_dataset().get_index_path()
+
+    @staticmethod
+    def build_index(force: bool = False) -> str:
+        """
+        Builds the dialogue metadata index (domains, tasks, happy and multi-task flags and number of events of
+        each dialogue) in a compact SQLite table, parsing every dialogue once. The index is only rebuilt if it is
+        missing or stale (i.e. dialogues were added, removed or modified) unless `force` is True.
+
+        :param force: If True, rebuilds the index even if it is up to date.
+        :type force: bool
+        :return: Path of the index file.
+        :rtype: str
+        """
+        return STAR.get_dataset().build_index(force=force)
+
+    @staticmethod
+    def get_dialog_ids(domain: str = None, task_name: str = None, happy: bool = None,
+                       multitask: bool = None) -> List[int]:
+        """
+        Gets the IDs of the dialogues matching the specified criteria from the metadata index (built if needed,
+        see :meth:`build_index`), without parsing any dialogue.
+
+        :param domain: Filter by domain.
+        :type domain: str
+        :param task_name: Filter by task name.
+        :type task_name: str
+        :param happy: Filter by 'happy path' status.
+        :type happy: bool
+        :param multitask: Filter by multitask status.
+        :type multitask: bool
+        :return: Sorted list of matching dialogue IDs.
+        :rtype: List[int]
+        """
+        return STAR.get_dataset().get_dialog_ids(domain=domain, task_name=task_name, happy=happy, multitask=multitask)
+
+    @staticmethod
+    def get_task_assets(task_name: str) -> STARTaskAssets:
+        """
+        Gets the (cached) assets of a task. Task files are read and parsed only once.
+
+        :param task_name: Name of the task.
+        :type task_name: str
+        :return: The task assets (must not be modified).
+        :rtype: STARTaskAssets
+        """
+        return STAR.get_dataset().get_task_assets(task_name)
+
+    @staticmethod
+    def get_task_names() -> List[str]:
+        """
+        Gets the names of all the tasks in the dataset.
+
+        :return: Sorted task names.
+        :rtype: List[str]
+        """
+        return STAR.get_dataset().get_task_names()
+
+    @staticmethod
+    def preload_task_assets() -> List[str]:
+        """
+        Loads the assets of all the tasks in the dataset (e.g. before spawning workers, so that no task file is
+        read afterwards).
+
+        :return: Names of the loaded tasks.
+        :rtype: List[str]
+        """
+        return STAR.get_dataset().preload_task_assets()
+
+    @staticmethod
+    def read_graph(task_name, as_dot: bool = True):
+        """
+        Reads the action graph for a given task.
+
+        :param task_name: Name of the task.
+        :type task_name: str
+        :param as_dot: If True, returns DOT format; else, returns dict.
+        :type as_dot: bool
+        :return: The graph in DOT or dict format.
+        :rtype: Union[str, dict]
+        """
+        return STAR.get_dataset().read_graph(task_name, as_dot=as_dot)
+
+    @staticmethod
+    def read_graph_responses(task_name, as_dict: bool = False):
+        """
+        Reads example responses for each node in a task's graph.
+
+        :param task_name: Name of the task.
+        :type task_name: str
+        :param as_dict: If True, returns as dict; else, as JSON string.
+        :type as_dict: bool
+        :return: Example responses.
+        :rtype: Union[str, dict]
+        """
+        return STAR.get_dataset().read_graph_responses(task_name, as_dict=as_dict)
+
+    @staticmethod
+    def get_dialog_record(id) -> STARRecord:
+        """
+        Gets the parsed record of a dialogue. Dialogue files are read and parsed only once (records are cached
+        in memory), all the ``get_dialog*`` methods are served from it.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: The dialogue record (must not be modified).
+        :rtype: STARRecord
+        """
+        return STAR.get_dataset().get_dialog_record(id)
+
+    @staticmethod
+    def get_dialog(id):
+        """
+        Loads a dialogue by ID.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: The loaded dialogue object.
+        :rtype: Dialog
+        """
+        return STAR.get_dataset().get_dialog(id)
+
+    @staticmethod
+    def get_dialogs(domain: str = None, task_name: str = None, happy: bool = None, multitask: bool = None,
+                    use_index: bool = True):
+        """
+        Loads all dialogues matching the specified criteria.
+
+        :param domain: Filter by domain.
+        :type domain: str
+        :param task_name: Filter by task name.
+        :type task_name: str
+        :param happy: Filter by 'happy path' status.
+        :type happy: bool
+        :param multitask: Filter by multitask status.
+        :type multitask: bool
+        :param use_index: If True, matching dialogues are resolved from the metadata index (see
+                          :meth:`build_index`) and only those are parsed (sorted by ID).
+        :type use_index: bool
+        :return: List of matching dialogues.
+        :rtype: List[Dialog]
+        """
+        dataset = STAR.get_dataset()
+        if use_index:
+            return dataset.get_dialogs(domain=domain, task_name=task_name, happy=happy, multitask=multitask)
+
+        dialogs = []
+        for fname in tqdm(os.listdir(os.path.join(dataset.path, "dialogues/")), desc="Reading dialogs", leave=False):
+            if not fname.endswith(".json"):
+                continue
+            dialog_id = int(os.path.splitext(fname)[0])
+            scenario = dataset.get_scenario(dialog_id)
+
+            if (domain is None or domain in scenario["Domains"]) and \
+               (happy is None or scenario["Happy"] == happy) and \
+               (multitask is None or scenario["MultiTask"] == multitask) and \
+               (task_name is None or any(capability["Task"] == task_name
+                                         for capability in scenario["WizardCapabilities"])):
+                dialogs.append(dataset.get_dialog(dialog_id))
+        return dialogs
+
+    @staticmethod
+    def iter_dialogs(domain: str = None, task_name: str = None, happy: bool = None, multitask: bool = None,
+                     workers: int = None, chunk_size: int = 64, ordered: bool = True,
+                     shard_index: int = 0, num_shards: int = 1) -> Iterator[Dialog]:
+        """
+        Lazily iterates over the dialogues matching the specified criteria, optionally parsing them in worker
+        processes (dialogues are yielded as soon as their chunk is parsed, only a few chunks are kept in memory).
+
+        Example:
+
+            .. code-block:: python
+
+                # Process the 2nd quarter of the happy path dialogues of the bank domain, with 8 processes
+                for dialog in STAR.iter_dialogs(domain="bank", happy=True, workers=8, shard_index=1, num_shards=4):
+                    ...
+
+        :param domain: Filter by domain.
+        :type domain: str
+        :param task_name: Filter by task name.
+        :type task_name: str
+        :param happy: Filter by 'happy path' status.
+        :type happy: bool
+        :param multitask: Filter by multitask status.
+        :type multitask: bool
+        :param workers: Number of worker processes (if not given or lower than 2, dialogues are parsed in the
+                        current process).
+        :type workers: int
+        :param chunk_size: Number of dialogues parsed per worker task.
+        :type chunk_size: int
+        :param ordered: If True, dialogues are yielded sorted by ID; otherwise, as soon as they are parsed.
+        :type ordered: bool
+        :param shard_index: Index of the shard to iterate (from 0 to `num_shards` - 1).
+        :type shard_index: int
+        :param num_shards: Number of shards the matching dialogues are split into (deterministically, by ID), so
+                           that distributed jobs can split the corpus without coordination.
+        :type num_shards: int
+        :return: Iterator over the matching dialogues.
+        :rtype: Iterator[Dialog]
+        """
+        return STAR.get_dataset().iter_dialogs(workers=workers, chunk_size=chunk_size, ordered=ordered,
+                                               shard_index=shard_index, num_shards=num_shards,
+                                               domain=domain, task_name=task_name, happy=happy, multitask=multitask)
+
+    @staticmethod
+    def get_dialog_scenario(id):
+        """
+        Loads the scenario for a given dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: Scenario metadata.
+        :rtype: dict
+        """
+        return STAR.get_dataset().get_scenario(id)
+
+    @staticmethod
+    def get_dialog_first_turn(id, speaker: str = None):
+        """
+        Gets the first turn for a given dialogue and speaker.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :param speaker: Speaker name (optional).
+        :type speaker: str
+        :return: The first turn.
+        :rtype: Turn
+        """
+        return STAR.get_dataset().get_dialog_first_turn(id, speaker)
+
+    @staticmethod
+    def get_dialog_task_names(id):
+        """
+        Gets the task names for a given dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: List of task names.
+        :rtype: List[str]
+        """
+        return STAR.get_dataset().get_dialog_task_names(id)
+
+    @staticmethod
+    def get_dialog_responses(id):
+        """
+        Gets example responses for all tasks in a dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: List of response dicts.
+        :rtype: List[dict]
+        """
+        return STAR.get_dataset().get_dialog_responses(id)
+
+    @staticmethod
+    def get_dialog_graphs(id):
+        """
+        Gets action graphs for all tasks in a dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: List of graphs.
+        :rtype: List[dict]
+        """
+        return STAR.get_dataset().get_dialog_graphs(id)
+
+    @staticmethod
+    def get_dialog_events(id):
+        """
+        Gets all events for a given dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: List of events.
+        :rtype: List[dict]
+        """
+        return STAR.get_dataset().get_dialog_events(id)
+
+    @staticmethod
+    def get_dialog_user_instructions(id):
+        """
+        Gets user instructions for a dialogue, mapped by turn index.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: Mapping from turn index to instruction text.
+        :rtype: dict
+        """
+        return STAR.get_dataset().get_dialog_user_instructions(id)
+
+    @staticmethod
+    def get_dialog_graphs_and_responses(id):
+        """
+        Gets both graphs and responses for all tasks in a dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: Graphs and responses.
+        :rtype: Tuple[List[dict], List[dict]]
+        """
+        return STAR.get_dataset().get_dialog_graphs_and_responses(id)
+
+    @staticmethod
+    def get_scenario_description(scenario, encoding: str = None):
+        """
+        Generates a natural language description of a scenario, including flowcharts.
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :param encoding: Flowchart encoding (see :meth:`set_flowchart_encoding`, by default, the one set there).
+        :type encoding: str
+        :return: Natural language scenario description.
+        :rtype: str
+        """
+        return STAR.get_dataset().get_scenario_description(scenario, encoding)
+
+    @staticmethod
+    def get_dialog_scenario_description(id):
+        """
+        Gets the scenario and its description for a dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :return: Scenario and description.
+        :rtype: Tuple[dict, str]
+        """
+        return STAR.get_dataset().get_dialog_scenario_description(id)
+
+    @staticmethod
+    def get_user_persona_for_scenario(scenario):
+        """
+        Constructs a Persona object for the user in a scenario. Personas are memoized by scenario signature
+        (shared by all the dialogues with the same user-related scenario, they must not be modified).
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :return: The user persona.
+        :rtype: Persona
+        """
+        return STAR.get_dataset().get_user_persona_for_scenario(scenario)
+
+    @staticmethod
+    def get_flowchart_description_for_scenario(scenario, encoding: str = None):
+        """
+        Generates a flowchart description for a scenario.
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :param encoding: Flowchart encoding (see :meth:`set_flowchart_encoding`, by default, the one set there).
+        :type encoding: str
+        :return: Flowchart description.
+        :rtype: str
+        """
+        return STAR.get_dataset().get_flowchart_description_for_scenario(scenario, encoding)
+
+    @staticmethod
+    def get_flowchart_token_report(scenarios: List[dict], tokenizer=None) -> dict:
+        """
+        Compares the size of the flowchart descriptions of the given scenarios in each flowchart encoding (see
+        :meth:`STARDataset.get_flowchart_token_report`).
+
+        :param scenarios: Scenario metadata of the dialogues.
+        :type scenarios: List[dict]
+        :param tokenizer: Tokenizer used to count tokens (see :func:`sdialog.util.count_tokens`).
+        :type tokenizer: Any
+        :return: For each encoding, the mean and max number of tokens, the mean number of characters and the ratio
+                 of tokens with respect to the "dot" encoding.
+        :rtype: dict
+        """
+        return STAR.get_dataset().get_flowchart_token_report(scenarios, tokenizer)
+
+    @staticmethod
+    def get_system_persona_for_scenario(scenario):
+        """
+        Constructs a Persona object for the system/assistant in a scenario. Personas are memoized by scenario
+        signature (shared by all the dialogues with the same system-related scenario, they must not be modified).
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :return: The system persona.
+        :rtype: Persona
+        """
+        return STAR.get_dataset().get_system_persona_for_scenario(scenario)
+
+    @staticmethod
+    def get_agents_for_scenario(scenario, model_name, pool: bool = True):
+        """
+        Constructs PersonaAgent objects for the user and system for a scenario.
+
+        :param scenario: Scenario metadata.
+        :type scenario: dict
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :param pool: If True, agents are forked from a pool of template agents keyed by scenario signature (see
+                     :meth:`STARDataset.get_agents_for_scenario`).
+        :type pool: bool
+        :return: (system, user) agents.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        return STAR.get_dataset().get_agents_for_scenario(scenario, model_name, pool=pool)
+
+    @staticmethod
+    def get_agents_from_dialogue(id, model_name: str, set_first_utterance: bool = False):
+        """
+        Constructs PersonaAgent objects for a dialogue, optionally setting the first utterance.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :param set_first_utterance: If True, sets the first utterance.
+        :type set_first_utterance: bool
+        :return: (system, user) agents.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        return STAR.get_dataset().get_agents_from_dialogue(id, model_name, set_first_utterance)
+
+    @staticmethod
+    def get_agents_from_dialogue_with_orchestration(id, model_name: str, set_first_utterance: bool = False,
+                                                    flow_graph: bool = False, sbert_model: str = None):
+        """
+        Constructs PersonaAgent objects with orchestration for a dialogue.
+
+        :param id: Dialogue ID.
+        :type id: int
+        :param model_name: Model name or LLM to use.
+        :type model_name: str
+        :param set_first_utterance: If True, sets the first utterance.
+        :type set_first_utterance: bool
+        :param flow_graph: If True, the system follows the task flowchart with a ``FlowGraphOrchestrator`` (no
+                           lookahead LLM calls) instead of a ``SimpleResponseOrchestrator``.
+        :type flow_graph: bool
+        :param sbert_model: Sentence encoder of the response orchestrator (by default, the orchestrator's default).
+        :type sbert_model: str
+        :return: (system, user) agents with orchestrators.
+        :rtype: Tuple[PersonaAgent, PersonaAgent]
+        """
+        return STAR.get_dataset().get_agents_from_dialogue_with_orchestration(
+            id, model_name, set_first_utterance, flow_graph=flow_graph, sbert_model=sbert_model)
+
+
+_worker_dataset = None  # dataset of the current worker process (see BaseDialogDataset.iter_dialogs)
+
+
+def _init_dataset_worker(dataset: BaseDialogDataset):
+    """
+    Sets the dataset the worker processes of :meth:`BaseDialogDataset.iter_dialogs` read from.
+    """
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _read_dataset_dialogs(entries: List[Tuple[Any, str]]) -> List[Dialog]:
+    """
+    Reads a chunk of dialogues from their (ID, location) entries (run in the worker processes of
+    :meth:`BaseDialogDataset.iter_dialogs`).
+    """
+    return [_worker_dataset._read_dialog(dialog_id, location) for dialog_id, location in entries]
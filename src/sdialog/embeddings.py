@@ -0,0 +1,458 @@
+"""
+embeddings: Sentence Embedding Utilities for sdialog
+
+This module provides a process-wide registry of sentence encoders (so each model is loaded only once), an LRU
+embedding cache keyed by (model, text) shared by all the components encoding text (e.g. orchestrators), a
+micro-batching encoder front-end coalescing concurrent encode requests (from threads or asyncio), and a persistent
+on-disk store of memory-mapped embedding tables shared read-only across processes.
+
+Embedding tables (e.g. the STAR response tables) can be precomputed with:
+
+    python -m sdialog.embeddings precompute --store STORE_DIR --model MODEL [--star STAR_PATH] [FILE.json ...]
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import json
+import queue
+import asyncio
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+from time import monotonic
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Union
+from sentence_transformers import SentenceTransformer
+
+from . import profiling
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of sentence embeddings keyed by (model, text).
+
+    :ivar maxsize: Maximum number of embeddings kept in the cache.
+    :vartype maxsize: int
+    :ivar hits: Number of cache hits.
+    :vartype hits: int
+    :ivar misses: Number of cache misses.
+    :vartype misses: int
+    """
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, model: str, text: str):
+        """
+        Returns the cached embedding for `text` encoded with `model`, or None if not cached.
+        """
+        key = (model, text)
+        with self._lock:
+            emb = self._data.get(key)
+            if emb is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return emb
+
+    def put(self, model: str, text: str, emb: np.ndarray):
+        """
+        Adds the embedding of `text` encoded with `model` to the cache.
+        """
+        with self._lock:
+            self._data[(model, text)] = emb
+            self._data.move_to_end((model, text))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self, model: str = None):
+        """
+        Removes the embeddings of the given model from the cache (all of them, and the hit/miss counters, if no
+        model is given).
+        """
+        with self._lock:
+            if model is None:
+                self._data.clear()
+                self.hits = self.misses = 0
+            else:
+                for key in [key for key in self._data if key[0] == model]:
+                    del self._data[key]
+
+
+class CachedEncoder:
+    """
+    Sentence encoder wrapper that serves embeddings from the shared embedding cache, only encoding (in a single
+    batch) the texts that are not cached yet.
+
+    :ivar model_name: Name of the encoder model.
+    :vartype model_name: str
+    :ivar encoder: The wrapped encoder (e.g. a ``SentenceTransformer``).
+    """
+    def __init__(self, model_name: str, encoder, cache: EmbeddingCache = None):
+        self.model_name = model_name
+        self.encoder = encoder
+        self.cache = cache if cache is not None else _embedding_cache
+
+    def encode(self, sentences: Union[str, List[str]]) -> np.ndarray:
+        """
+        Encodes one or more sentences.
+
+        :param sentences: The sentence or list of sentences to encode.
+        :type sentences: Union[str, List[str]]
+        :return: The sentence embedding (1D array) or embeddings (2D array, one row per sentence).
+        :rtype: np.ndarray
+        """
+        if isinstance(sentences, str):
+            return self.encode([sentences])[0]
+
+        embs = [self.cache.get(self.model_name, text) for text in sentences]
+        missing = list(dict.fromkeys(text for text, emb in zip(sentences, embs) if emb is None))
+        if missing:
+            with profiling.span("encode", self.model_name):
+                new_embs = dict(zip(missing, np.asarray(self.encoder.encode(missing), dtype=np.float32)))
+            for text, emb in new_embs.items():
+                self.cache.put(self.model_name, text, emb)
+            embs = [emb if emb is not None else new_embs[text] for text, emb in zip(sentences, embs)]
+
+        if not embs:
+            return np.zeros((0, self.get_dimension()), dtype=np.float32)
+        return np.stack(embs)
+
+    def similarity(self, embs_a: np.ndarray, embs_b: np.ndarray) -> np.ndarray:
+        """
+        Computes the similarity matrix between two sets of embeddings, using the encoder similarity function if
+        available (cosine similarity otherwise).
+
+        :return: Similarity matrix of shape (len(embs_a), len(embs_b)).
+        :rtype: np.ndarray
+        """
+        embs_a, embs_b = np.atleast_2d(embs_a), np.atleast_2d(embs_b)
+        if embs_a.dtype == np.float16 or embs_b.dtype == np.float16:
+            embs_a, embs_b = embs_a.astype(np.float32), embs_b.astype(np.float32)
+        if hasattr(self.encoder, "similarity"):
+            return np.asarray(self.encoder.similarity(embs_a, embs_b))
+        embs_a = embs_a / (np.linalg.norm(embs_a, axis=1, keepdims=True) + 1e-12)
+        embs_b = embs_b / (np.linalg.norm(embs_b, axis=1, keepdims=True) + 1e-12)
+        return embs_a @ embs_b.T
+
+    def get_dimension(self) -> int:
+        """
+        Returns the dimension of the embeddings.
+
+        :rtype: int
+        """
+        if hasattr(self.encoder, "get_sentence_embedding_dimension"):
+            return self.encoder.get_sentence_embedding_dimension()
+        return len(np.asarray(self.encoder.encode([""]))[0])
+
+
+class BatchingEncoder:
+    """
+    Micro-batching front-end for an encoder: single-text encode requests coming concurrently from different threads
+    (or asyncio tasks) are collected for up to `max_wait` seconds (or until `max_batch_size` requests are queued)
+    and encoded together with a single batched ``encode`` call, results being handed back through futures.
+
+    It can be used as a drop-in replacement of :class:`CachedEncoder`.
+
+    :ivar encoder: The wrapped encoder.
+    :vartype encoder: CachedEncoder
+    :ivar max_batch_size: Maximum number of texts encoded in a single batch.
+    :vartype max_batch_size: int
+    :ivar max_wait: Maximum time (in seconds) a request waits for other requests to be batched with.
+    :vartype max_wait: float
+    """
+    def __init__(self, encoder: CachedEncoder, max_batch_size: int = 64, max_wait: float = 0.005):
+        self.encoder = encoder
+        self.model_name = encoder.model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """
+        Submits a text to be encoded in the next batch.
+
+        :param text: The text to encode.
+        :type text: str
+        :return: A future with the text embedding.
+        :rtype: concurrent.futures.Future
+        """
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="BatchingEncoder", daemon=True)
+                    self._worker.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences: Union[str, List[str]]) -> np.ndarray:
+        """
+        Encodes one or more sentences (single sentences are batched with concurrent requests).
+
+        :param sentences: The sentence or list of sentences to encode.
+        :type sentences: Union[str, List[str]]
+        :return: The sentence embedding (1D array) or embeddings (2D array, one row per sentence).
+        :rtype: np.ndarray
+        """
+        if isinstance(sentences, str):
+            with profiling.span("encode", self.model_name):
+                return self.submit(sentences).result()
+        return self.encoder.encode(sentences)
+
+    async def aencode(self, sentence: str) -> np.ndarray:
+        """
+        Encodes a sentence from asyncio code (batched with concurrent requests).
+
+        :param sentence: The sentence to encode.
+        :type sentence: str
+        :return: The sentence embedding.
+        :rtype: np.ndarray
+        """
+        return await asyncio.wrap_future(self.submit(sentence))
+
+    def similarity(self, embs_a: np.ndarray, embs_b: np.ndarray) -> np.ndarray:
+        """
+        Computes the similarity matrix between two sets of embeddings (see :meth:`CachedEncoder.similarity`).
+        """
+        return self.encoder.similarity(embs_a, embs_b)
+
+    def get_dimension(self) -> int:
+        """
+        Returns the dimension of the embeddings.
+        """
+        return self.encoder.get_dimension()
+
+    def _run(self):
+        """
+        Worker loop collecting and encoding batches of requests.
+        """
+        while True:
+            batch = [self._queue.get()]
+            deadline = monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                embs = self.encoder.encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), emb in zip(batch, embs):
+                future.set_result(emb)
+
+
+_embedding_cache = EmbeddingCache()
+_encoders = {}
+_batching_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_sentence_encoder(model_name: str, batching: bool = False) -> Union[CachedEncoder, BatchingEncoder]:
+    """
+    Returns the (process-wide) cached sentence encoder for the given model, loading the model the first time.
+
+    :param model_name: Name of the sentence-transformers model (or of a registered encoder).
+    :type model_name: str
+    :param batching: If True, returns the (process-wide) micro-batching front-end of the encoder instead.
+    :type batching: bool
+    :return: The cached encoder.
+    :rtype: Union[CachedEncoder, BatchingEncoder]
+    """
+    with _encoders_lock:
+        if model_name not in _encoders:
+            _encoders[model_name] = CachedEncoder(model_name, SentenceTransformer(model_name))
+        if batching:
+            if model_name not in _batching_encoders:
+                _batching_encoders[model_name] = BatchingEncoder(_encoders[model_name])
+            return _batching_encoders[model_name]
+        return _encoders[model_name]
+
+
+def register_sentence_encoder(model_name: str, encoder) -> CachedEncoder:
+    """
+    Registers a custom sentence encoder (any object with an ``encode(list_of_texts)`` method) under a model name,
+    so that it is used by all components requesting that model.
+
+    :param model_name: Name under which the encoder is registered.
+    :type model_name: str
+    :param encoder: The encoder.
+    :return: The cached encoder.
+    :rtype: CachedEncoder
+    """
+    with _encoders_lock:
+        _embedding_cache.clear(model_name)
+        _batching_encoders.pop(model_name, None)
+        _encoders[model_name] = CachedEncoder(model_name, encoder)
+        return _encoders[model_name]
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Returns the process-wide embedding cache (e.g. to inspect hits/misses or change its `maxsize`).
+
+    :rtype: EmbeddingCache
+    """
+    return _embedding_cache
+
+
+class EmbeddingStore:
+    """
+    Persistent store of embedding tables, saved as float16 ``.npy`` files named by the content hash of the model
+    name and the texts, and loaded as read-only memory maps (so they are shared across worker processes).
+
+    Embeddings are stored L2-normalized (i.e. ready for cosine similarity search, see :mod:`sdialog.similarity`).
+
+    :ivar path: Directory of the store.
+    :vartype path: str
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(model: str, texts: List[str]) -> str:
+        """
+        Returns the content hash identifying the embedding table of `texts` encoded with `model`.
+
+        :rtype: str
+        """
+        content = hashlib.sha256(model.encode("utf-8"))
+        for text in texts:
+            content.update(b"\x00" + str(text).encode("utf-8"))
+        return content.hexdigest()[:32]
+
+    def get(self, model: str, texts: List[str]) -> np.ndarray:
+        """
+        Returns the (memory-mapped, read-only) embedding table of `texts` encoded with `model`, or None if not stored.
+
+        :rtype: np.ndarray
+        """
+        key = self.get_key(model, texts)
+        with self._lock:
+            if key not in self._tables:
+                path = os.path.join(self.path, f"{key}.npy")
+                if not os.path.exists(path):
+                    return None
+                self._tables[key] = np.load(path, mmap_mode="r")
+            return self._tables[key]
+
+    def put(self, model: str, texts: List[str], embs: np.ndarray) -> np.ndarray:
+        """
+        Stores the embedding table of `texts` encoded with `model` (L2-normalized, as float16).
+
+        :return: The stored (memory-mapped) embedding table.
+        :rtype: np.ndarray
+        """
+        key = self.get_key(model, texts)
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, f"{key}.npy")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as writer:
+            embs = np.asarray(embs, dtype=np.float32)
+            embs = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12)
+            np.save(writer, embs.astype(np.float16))
+        os.replace(tmp_path, path)  # atomic, other processes never see partial files
+        with self._lock:
+            self._tables.pop(key, None)
+        return self.get(model, texts)
+
+    def get_or_encode(self, encoder: CachedEncoder, texts: List[str]) -> np.ndarray:
+        """
+        Returns the stored embedding table of `texts`, encoding and storing it first if needed.
+
+        :param encoder: The encoder to use.
+        :type encoder: CachedEncoder
+        :param texts: The texts.
+        :type texts: List[str]
+        :return: The (memory-mapped) embedding table.
+        :rtype: np.ndarray
+        """
+        embs = self.get(encoder.model_name, texts)
+        if embs is None:
+            embs = self.put(encoder.model_name, texts, encoder.encode(list(texts)))
+        return embs
+
+
+_stores = {}
+
+
+def get_embedding_store(store: Union[str, EmbeddingStore] = None) -> EmbeddingStore:
+    """
+    Returns the embedding store for the given path (if no store is given, the path in the
+    ``SDIALOG_EMBEDDING_STORE`` environment variable is used, if set).
+
+    :param store: Path of the store (or the store itself).
+    :type store: Union[str, EmbeddingStore]
+    :return: The embedding store, or None if no store is given nor configured.
+    :rtype: EmbeddingStore
+    """
+    if isinstance(store, EmbeddingStore):
+        return store
+    store = store or os.environ.get("SDIALOG_EMBEDDING_STORE")
+    if not store:
+        return None
+    with _encoders_lock:
+        if store not in _stores:
+            _stores[store] = EmbeddingStore(store)
+        return _stores[store]
+
+
+def main(argv: List[str] = None):
+    """
+    Command line interface to precompute embedding tables into an embedding store.
+    """
+    parser = argparse.ArgumentParser(prog="python -m sdialog.embeddings",
+                                     description="Embedding store utilities.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    precompute = subparsers.add_parser("precompute", help="Precompute embedding tables into a store.")
+    precompute.add_argument("files", nargs="*",
+                            help="JSON files with the texts to encode (a list of texts or an action:text dict).")
+    precompute.add_argument("--store", required=True, help="Path of the embedding store.")
+    precompute.add_argument("--model", default="sergioburdisso/dialog2flow-joint-bert-base",
+                            help="Sentence encoder model.")
+    precompute.add_argument("--star", help="Path to the STAR dataset (precomputes all its response tables).")
+    args = parser.parse_args(argv)
+
+    tables = []
+    for path in args.files:
+        with open(path) as reader:
+            texts = json.load(reader)
+        tables.append((path, list(texts.values()) if type(texts) is dict else texts))
+    if args.star:
+        from .datasets import STAR
+        STAR.set_path(args.star)
+        for task_name in sorted(os.listdir(os.path.join(args.star, "tasks"))):
+            if os.path.exists(os.path.join(args.star, f"tasks/{task_name}/responses.json")):
+                tables.append((task_name, list(STAR.read_graph_responses(task_name, as_dict=True).values())))
+
+    store = get_embedding_store(args.store)
+    encoder = get_sentence_encoder(args.model)
+    for name, texts in tables:
+        embs = store.get_or_encode(encoder, texts)
+        print(f"{name}: {embs.shape[0]} embeddings ({store.get_key(args.model, texts)}.npy)")
+
+
+if __name__ == "__main__":
+    main()
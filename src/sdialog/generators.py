@@ -14,9 +14,11 @@ from pydantic import BaseModel
 
 from typing import Union, List, Any
 from langchain_ollama.chat_models import ChatOllama
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages.ai import add_usage
 
 from . import Dialog, Turn
+from . import profiling
 from .personas import Persona, PersonaAgent
 
 
@@ -85,10 +87,10 @@ class DialogGenerator:
                 self.llm.format = output_format
 
         self.personas = personas
-        self.model_name = model
+        self.model_name = model if type(model) is str else str(model)
         self.set(dialogue_details, scenario)
 
-    def generate(self, seed: int = None, id: int = None):
+    def generate(self, seed: int = None, id: int = None, on_token: callable = None, profile: bool = False):
         """
         Generates a synthetic dialogue using the LLM.
 
@@ -96,9 +98,30 @@ class DialogGenerator:
         :type seed: int
         :param id: Dialogue ID.
         :type id: int
+        :param on_token: Optional callback called with each generated token as ``on_token(token, None)`` while
+                         the (raw) output is streamed from the LLM.
+        :type on_token: callable
+        :param profile: If True, the LLM call is timed and its stats are added to the dialogue (``Dialog.stats``,
+                        see :mod:`sdialog.profiling`).
+        :type profile: bool
         :return: The generated dialogue or output object.
         :rtype: Union[Dialog, dict, BaseModel]
         """
+        if profile:
+            with profiling.profile() as recorder:
+                output = self._generate(seed=seed, id=id, on_token=on_token)
+            if isinstance(output, Dialog):
+                output.stats = recorder.stats()
+        else:
+            output = self._generate(seed=seed, id=id, on_token=on_token)
+        if isinstance(output, Dialog):
+            profiling.emit_dialog_end(output)
+        return output
+
+    def _generate(self, seed: int = None, id: int = None, on_token: callable = None):
+        """
+        Generates a synthetic dialogue using the LLM (see :meth:`generate`).
+        """
         self.llm.seed = seed if seed is not None else random.getrandbits(32)
 
         # hack to avoid seed bug in prompt cache
@@ -108,7 +131,20 @@ class DialogGenerator:
         self.llm.invoke(self.messages)
         self.llm.num_predict = _
 
-        dialogue = self.llm.invoke(self.messages).content
+        with profiling.span("llm", "generate") as span:
+            if on_token and hasattr(self.llm, "stream"):
+                tokens, usage = [], None
+                for chunk in self.llm.stream(self.messages):
+                    if getattr(chunk, "usage_metadata", None):
+                        usage = add_usage(usage, chunk.usage_metadata)
+                    tokens.append(chunk.content)
+                    on_token(chunk.content, None)
+                dialogue = "".join(tokens)
+                span.set_usage(AIMessage(content=dialogue, usage_metadata=usage))
+            else:
+                response = self.llm.invoke(self.messages)
+                span.set_usage(response)
+                dialogue = response.content
 
         if not self.output_format:
             return dialogue
@@ -213,13 +249,16 @@ Finally, remember:
                              persona_b.name: persona_b.json()
                          })
 
-    def generate(self, seed: int = None, id: int = None, max_iterations: int = 20):
+    def generate(self, seed: int = None, id: int = None, max_iterations: int = 20, on_token: callable = None,
+                 profile: bool = False):
         if self._agent_a and self._agent_b:
             return self._agent_a.dialog_with(self._agent_b,
                                              max_iterations=max_iterations,
                                              id=id,
-                                             seed=seed)
+                                             seed=seed,
+                                             on_token=on_token,
+                                             profile=profile)
         else:
-            return super().generate(seed=seed, id=id)
+            return super().generate(seed=seed, id=id, on_token=on_token, profile=profile)
 
     __call__ = generate  # alias for generate method
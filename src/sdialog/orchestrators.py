@@ -7,22 +7,59 @@ Orchestrators can inject instructions, control agent responses, and manage dialo
 # SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
 # SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
 # SPDX-License-Identifier: MIT
+import copy
 import json
 import random
 import inspect
+import threading
 import numpy as np
 
 from time import time
+from collections import OrderedDict
 from abc import ABC, abstractmethod
-from typing import List, Union, Dict
-from sentence_transformers import SentenceTransformer
-from langchain_core.messages import SystemMessage, AIMessage
+from pydantic import BaseModel
+from typing import List, Union, Dict, Optional
 
-from . import Turn, Event, Instruction
+from . import Turn, Event, Instruction, DialogState
 from .util import make_serializable
+from .embeddings import get_sentence_encoder, get_embedding_store
+from .similarity import get_similarity_index
 # from .personas import PersonaAgent
 
 
+class Trigger(BaseModel):
+    """
+    Declares when an orchestrator can fire, so that agents can skip it (not call it) in all the other turns.
+
+    The orchestrator can fire if any of the given conditions holds (a trigger without conditions never fires).
+
+    :ivar turns: Dialogue lengths (number of turns so far, including the incoming utterance) at which it can fire.
+    :vartype turns: Optional[List[int]]
+    :ivar agent_turns: Number of turns of the target agent so far at which it can fire.
+    :vartype agent_turns: Optional[List[int]]
+    :ivar from_turn: Dialogue length from which it can fire in every turn.
+    :vartype from_turn: Optional[int]
+    """
+    turns: Optional[List[int]] = None
+    agent_turns: Optional[List[int]] = None
+    from_turn: Optional[int] = None
+
+    def fires(self, dialog: DialogState, agent_name: str) -> bool:
+        """
+        Checks whether the trigger holds for the current dialogue state.
+
+        :param dialog: The current dialogue state of the target agent.
+        :type dialog: DialogState
+        :param agent_name: Name of the target agent.
+        :type agent_name: str
+        :return: True if the orchestrator can fire.
+        :rtype: bool
+        """
+        return ((self.turns is not None and len(dialog) in self.turns)
+                or (self.agent_turns is not None and dialog.n_turns(agent_name) in self.agent_turns)
+                or (self.from_turn is not None and len(dialog) >= self.from_turn))
+
+
 class BaseOrchestrator(ABC):
     """
     Base class for orchestrators that control or influence PersonaAgent behavior during dialogue generation.
@@ -33,16 +70,24 @@ class BaseOrchestrator(ABC):
     :vartype _event_label: str
     :ivar _persistent: Whether the orchestrator is persistent.
     :vartype _persistent: bool
+    :ivar _independent: Whether the orchestrator is independent of the other orchestrators of the agent, and
+                        therefore can be run concurrently with them (e.g. to overlap their LLM or model calls).
+    :vartype _independent: bool
 
     :meth:`__call__`: Returns an instruction or action for the agent.
     :meth:`is_persistent`: Indicates if the instruction/action should persist across turns.
+    :meth:`is_independent`: Indicates if the orchestrator can be run concurrently with the other ones.
     :meth:`get_event_label`: Returns a label for the event generated by this orchestrator.
+    :meth:`get_trigger`: Returns the turns in which the orchestrator can fire (None if it can fire in any turn).
+    :meth:`is_exhausted`: Indicates if the orchestrator will not fire anymore (until reset).
     :meth:`reset`: Resets the orchestrator's internal state.
+    :meth:`clone`: Returns a copy of the orchestrator sharing heavy read-only resources (models, embeddings).
     :meth:`json`: Serializes the orchestrator configuration.
     """
     _target = None
     _event_label = None
     _persistent = False
+    _independent = False
 
     def __init__(self, target_agent=None, persistent: bool = None, event_label: str = None):
         self._target = target_agent
@@ -50,9 +95,10 @@ class BaseOrchestrator(ABC):
         self._event_label = event_label
 
     def __call__(self):
-        dialog = self.__get_current_dialog()
-        return self.instruct(dialog, dialog[-1].text
-                             if dialog and dialog[-1].speaker != self._target.get_name()
+        dialog = self._target.dialog_state
+        last_turn = dialog.last_turn()
+        return self.instruct(dialog.turns, last_turn.text
+                             if last_turn and last_turn.speaker != self._target.get_name()
                              else "")
 
     def __str__(self) -> str:
@@ -60,10 +106,6 @@ class BaseOrchestrator(ABC):
         attrs = " ".join(f"{key}={value}" for key, value in data["args"].items())
         return f"{data['name']}({attrs})"
 
-    def __get_current_dialog(self) -> List[Turn]:
-        return [Turn(speaker=self._target.get_name() if type(message) is AIMessage else None, text=message.content)
-                for message in self._target.memory if type(message) is not SystemMessage]
-
     def _set_target_agent(self, agent):  # target: PersonaAgent
         self._target = agent
 
@@ -87,9 +129,54 @@ class BaseOrchestrator(ABC):
     def set_persistent(self, value: bool):
         self._persistent = value
 
+    def is_independent(self) -> bool:
+        """
+        Indicates if the orchestrator is independent of the other orchestrators of the agent. Independent
+        orchestrators are run concurrently by the agent, all of them on the dialogue state before the instructions
+        of the current turn are added (their instructions are still added in the declared order). Orchestrators
+        using the agent's random generator (e.g. :class:`ChangeMindOrchestrator`, see :meth:`get_rng`) should not be
+        independent, since the order in which they consume random numbers would not be deterministic.
+
+        :return: True if the orchestrator is independent.
+        :rtype: bool
+        """
+        return self._independent
+
+    def set_independent(self, value: bool):
+        self._independent = value
+
+    def get_trigger(self) -> Optional[Trigger]:
+        """
+        Returns the trigger declaring the turns in which this orchestrator can fire. Agents do not call the
+        orchestrator in the other turns. By default, orchestrators can fire in any turn (None).
+
+        :return: The trigger, or None if the orchestrator has to be called in every turn.
+        :rtype: Optional[Trigger]
+        """
+        return None
+
+    def is_exhausted(self) -> bool:
+        """
+        Indicates if the orchestrator will not fire anymore (until it is reset), so agents can stop calling it.
+
+        :return: True if the orchestrator is exhausted.
+        :rtype: bool
+        """
+        return False
+
     def agent_response_lookahead(self):
         return self._target.response_lookahead()
 
+    def get_rng(self) -> random.Random:
+        """
+        Returns the random generator to use: the one of the target agent (seeded with the dialogue seed, so
+        dialogues are reproducible even when generated concurrently), or the global one if there is no target agent.
+
+        :return: The random generator.
+        :rtype: random.Random
+        """
+        return getattr(self._target, "rng", None) or random
+
     @abstractmethod
     def instruct(self, dialog: List[Turn], utterance: str) -> str:
         pass
@@ -97,6 +184,18 @@ class BaseOrchestrator(ABC):
     def reset(self):
         pass
 
+    def clone(self):
+        """
+        Returns a copy of this orchestrator with its own (mutable) state, used when forking agents.
+
+        The copy is shallow so that heavy read-only resources (e.g. sentence encoders, embeddings) are shared.
+        Subclasses with mutable container state should override it to copy that state.
+
+        :return: The cloned orchestrator.
+        :rtype: BaseOrchestrator
+        """
+        return copy.copy(self)
+
 
 class BasePersistentOrchestrator(BaseOrchestrator):
     """
@@ -155,6 +254,10 @@ class LengthOrchestrator(BaseOrchestrator):
         self.max = max
         self.min = min
 
+    def get_trigger(self) -> Trigger:
+        return Trigger(turns=list(range(2, self.min)) if self.min is not None else None,
+                       from_turn=self.max - 1 if self.max else None)
+
     def instruct(self, dialog: List[Turn], utterance: str) -> str:
         if self.min is not None and len(dialog) < self.min and len(dialog) > 1:
             return "Make sure you DO NOT finish the conversation, keep it going!"
@@ -192,15 +295,19 @@ class ChangeMindOrchestrator(BaseOrchestrator):
     def reset(self):
         self.times = 0
 
+    def is_exhausted(self) -> bool:
+        return bool(self.max_times) and self.times >= self.max_times
+
     def instruct(self, dialog: List[Turn], utterance: str) -> str:
-        if self.max_times and self.times >= self.max_times:
+        if self.is_exhausted():
             return
 
-        if random.random() <= self.probability:
+        rng = self.get_rng()
+        if rng.random() <= self.probability:
             self.times += 1
             instruction = "Change your mind completely, in your next utterance, suggest something completely different!"
             if self.reasons:
-                instruction += f" **Reason:** {random.choice(self.reasons)}."
+                instruction += f" **Reason:** {rng.choice(self.reasons)}."
             return instruction
 
 
@@ -212,10 +319,32 @@ class SimpleResponseOrchestrator(BaseOrchestrator):
     :type responses: List[Union[str, Dict[str, str]]]
     :param graph: A graph mapping actions to next actions for controlling dialogue flow.
     :type graph: Dict[str, str]
-    :param sbert_model: The sentence-BERT model used for encoding responses.
+    :param sbert_model: The sentence-BERT model used for encoding responses (loaded only once per process and
+                        shared by all orchestrators, as well as the embeddings of the responses, see
+                        :func:`sdialog.embeddings.get_sentence_encoder`).
     :type sbert_model: str
     :param top_k: The number of top similar responses to consider.
     :type top_k: int
+    :param speculative: If True, when the lookahead response already matches the top suggestion (see
+                        `speculative_threshold`), it is committed as the agent response (no extra LLM call).
+    :type speculative: bool
+    :param speculative_threshold: Minimum similarity between the lookahead response and the top suggestion for the
+                                  lookahead response to be committed in speculative mode.
+    :type speculative_threshold: float
+    :param embedding_store: Path to a persistent embedding store (see :class:`sdialog.embeddings.EmbeddingStore`)
+                            from which the response embeddings are memory-mapped (computed and stored if missing).
+                            By default, the ``SDIALOG_EMBEDDING_STORE`` environment variable is used, if set.
+    :type embedding_store: str
+    :param batch_encoding: If True, the encoding of the responses at each turn is batched together with the
+                           concurrent requests of other orchestrators (e.g. dialogues generated in parallel threads),
+                           see :class:`sdialog.embeddings.BatchingEncoder`.
+    :type batch_encoding: bool
+    :param similarity_index: Type of (cosine) similarity index used to find the top-k responses: "exact" or "ivf"
+                             (approximate, for very large response inventories), see :mod:`sdialog.similarity`.
+    :type similarity_index: str
+    :param index_dtype: Data type of the indexed response embeddings: "float32", "float16" or "int8" (by default,
+                        the one of the embeddings, e.g. float16 if loaded from an embedding store).
+    :type index_dtype: str
     """
 
     def __init__(self,
@@ -223,11 +352,20 @@ class SimpleResponseOrchestrator(BaseOrchestrator):
                  graph: Dict[str, str] = None,
                  #  sbert_model: str = "sentence-transformers/LaBSE",
                  sbert_model: str = "sergioburdisso/dialog2flow-joint-bert-base",
-                 top_k: int = 5):
-
-        self.sent_encoder = SentenceTransformer(sbert_model)
+                 top_k: int = 5,
+                 speculative: bool = False,
+                 speculative_threshold: float = 0.9,
+                 embedding_store: str = None,
+                 batch_encoding: bool = False,
+                 similarity_index: str = "exact",
+                 index_dtype: str = None):
+
+        self.sent_encoder = get_sentence_encoder(sbert_model, batching=batch_encoding)
+        self.batch_encoding = batch_encoding
         self.responses = responses
         self.top_k = top_k
+        self.speculative = speculative
+        self.speculative_threshold = speculative_threshold
 
         if type(responses) is dict:
             self.resp_utts = np.array([resp for resp in responses.values()])
@@ -238,17 +376,20 @@ class SimpleResponseOrchestrator(BaseOrchestrator):
             self.resp_acts = None
             self.graph = None
 
-        self.resp_utt_embs = self.sent_encoder.encode(self.resp_utts)
+        self.embedding_store = embedding_store
+        store = get_embedding_store(embedding_store)
+        if store:
+            self.resp_utt_embs = store.get_or_encode(get_sentence_encoder(sbert_model), self.resp_utts)
+        else:
+            self.resp_utt_embs = self.sent_encoder.encode(self.resp_utts)
+        self.similarity_index = similarity_index
+        self.index_dtype = index_dtype
+        self.index = get_similarity_index(self.resp_utt_embs, index=similarity_index, dtype=index_dtype)
 
     def instruct(self, dialog: List[Turn], utterance: str) -> str:
         agent = self.get_target_agent()
 
-        agent_last_turn = None
-        if self.graph and dialog:
-            for turn in dialog[::-1]:
-                if turn.speaker == agent.get_name():
-                    agent_last_turn = turn.text
-                    break
+        agent_last_turn = agent.dialog_state.last_utterance(agent.get_name()) if self.graph else None
 
         response = agent_last_turn if agent_last_turn else agent.response_lookahead()
 
@@ -260,8 +401,17 @@ class SimpleResponseOrchestrator(BaseOrchestrator):
                              else f'Lookahead response: "{response}"',
                         timestamp=int(time()))]
 
-        sims = self.sent_encoder.similarity(self.sent_encoder.encode(response), self.resp_utt_embs)[0]
-        top_k_ixs = sims.argsort(descending=True)[:self.top_k]
+        top_k_ixs, top_k_sims = self.index.search(self.sent_encoder.encode(response), self.top_k)
+
+        speculative_response = None
+        if self.speculative and not agent_last_turn and float(top_k_sims[0]) >= self.speculative_threshold:
+            speculative_response = response
+            events.append(Event(agent=agent.get_name(),
+                                action="request_suggestions",
+                                actionLabel=self.get_event_label(),
+                                text="Lookahead response committed (similarity with top suggestion: "
+                                     f"{float(top_k_sims[0]):.3f})",
+                                timestamp=int(time())))
 
         if self.resp_acts is None:
             instruction = ("If applicable, try to pick your next response from the following list: "
@@ -290,7 +440,7 @@ class SimpleResponseOrchestrator(BaseOrchestrator):
                             for ix, action in enumerate(next_actions))
             )
 
-        return Instruction(text=instruction, events=events)
+        return Instruction(text=instruction, events=events, response=speculative_response)
 
 
 class InstructionListOrchestrator(BaseOrchestrator):
@@ -309,14 +459,169 @@ class InstructionListOrchestrator(BaseOrchestrator):
         super().__init__(persistent=persistent)
         self.instructions = instructions
 
+    def get_trigger(self) -> Trigger:
+        if type(self.instructions) is dict:
+            return Trigger(agent_turns=list(self.instructions.keys()))
+        return Trigger(agent_turns=list(range(len(self.instructions))))
+
     def instruct(self, dialog: List[Turn], utterance: str) -> str:
         agent = self.get_target_agent()
 
-        if dialog:
-            current_user_len = len([t for t in dialog if t.speaker == agent.get_name()])
-        else:
-            current_user_len = 0
+        current_user_len = agent.dialog_state.n_turns(agent.get_name())
 
         if (type(self.instructions) is dict and current_user_len in self.instructions) or \
            (type(self.instructions) is list and current_user_len < len(self.instructions)):
             return self.instructions[current_user_len]
+
+
+class FlowGraphOrchestrator(BaseOrchestrator):
+    """
+    Orchestrator that makes the agent follow an action flow graph (e.g. STAR flowcharts, as returned by
+    ``STAR.read_graph(task_name, as_dot=False)``), suggesting the next actions of the graph in each turn.
+
+    The graph is compiled once into integer adjacency arrays, with the next agent actions reachable from each node
+    precomputed. The current node is tracked incrementally by classifying each new agent turn into its nearest
+    action (by embedding similarity with the action responses, the last ``ACTION_CACHE_SIZE`` classifications being
+    cached and shared by clones), so no extra LLM (lookahead) call is needed to produce the instructions.
+
+    :param graph: Action graph mapping each action to its next action(s).
+    :type graph: Dict[str, Union[str, List[str]]]
+    :param responses: Agent actions mapped to their example responses (actions of the graph not in `responses`,
+                      e.g. user actions, are traversed to reach the next agent actions).
+    :type responses: Dict[str, str]
+    :param sbert_model: The sentence-BERT model used to classify agent turns into actions (shared, see
+                        :func:`sdialog.embeddings.get_sentence_encoder`).
+    :type sbert_model: str
+    :param start: Action the dialogue starts from (by default, the first action of the graph).
+    :type start: str
+    :param embedding_store: Path to a persistent embedding store for the response embeddings (see
+                            :class:`SimpleResponseOrchestrator`).
+    :type embedding_store: str
+    :param max_depth: Maximum number of non-agent actions traversed to reach the next agent actions.
+    :type max_depth: int
+    """
+    ACTION_CACHE_SIZE = 4096  # number of agent turn classifications kept in memory
+
+    def __init__(self,
+                 graph: Dict[str, Union[str, List[str]]],
+                 responses: Dict[str, str],
+                 sbert_model: str = "sergioburdisso/dialog2flow-joint-bert-base",
+                 start: str = None,
+                 embedding_store: str = None,
+                 max_depth: int = 3):
+        super().__init__()
+        self.graph = graph
+        self.responses = responses
+        self.sbert_model = sbert_model
+        self.start = start
+        self.embedding_store = embedding_store
+        self.max_depth = max_depth
+
+        # Compiling the graph: nodes as integers, edges in CSR format (offsets + targets)
+        self.nodes = list(dict.fromkeys(list(graph.keys())
+                                        + [node for nexts in graph.values()
+                                           for node in ([nexts] if type(nexts) is str else nexts)]
+                                        + list(responses.keys())))
+        self.node_ixs = {node: ix for ix, node in enumerate(self.nodes)}
+        targets = [[self.node_ixs[node] for node in ([nexts] if type(nexts) is str else nexts)]
+                   for nexts in (graph.get(node, []) for node in self.nodes)]
+        self.adj_offsets = np.cumsum([0] + [len(nexts) for nexts in targets], dtype=np.int32)
+        self.adj_targets = np.array([ix for nexts in targets for ix in nexts], dtype=np.int32)
+
+        self.actions = list(responses.keys())
+        self.action_nodes = np.array([self.node_ixs[action] for action in self.actions], dtype=np.int32)
+        node2action = {node: ix for ix, node in enumerate(self.action_nodes.tolist())}
+        self.next_actions = [self._compile_next_actions(node, node2action) for node in range(len(self.nodes))]
+        self.start_node = self.node_ixs[start if start is not None else next(iter(graph))]
+
+        self.sent_encoder = get_sentence_encoder(sbert_model)
+        store = get_embedding_store(embedding_store)
+        resp_utts = [responses[action] for action in self.actions]
+        if store:
+            resp_utt_embs = store.get_or_encode(self.sent_encoder, resp_utts)
+        else:
+            resp_utt_embs = self.sent_encoder.encode(resp_utts)
+        self.index = get_similarity_index(resp_utt_embs)
+        self._action_cache = OrderedDict()  # agent turn -> action index (LRU, shared by clones)
+        self._action_cache_lock = threading.Lock()  # clones may run in different threads
+        self.reset()
+
+    def _compile_next_actions(self, node: int, node2action: Dict[int, int]) -> np.ndarray:
+        """
+        Returns the indexes of the agent actions reachable from the given node (breadth-first), only traversing
+        non-agent actions.
+        """
+        next_actions, frontier, visited = [], [node], {node}
+        for _ in range(self.max_depth + 1):
+            next_frontier = []
+            for ix in frontier:
+                for target in self.adj_targets[self.adj_offsets[ix]:self.adj_offsets[ix + 1]].tolist():
+                    if target in node2action:
+                        if node2action[target] not in next_actions:
+                            next_actions.append(node2action[target])
+                    elif target not in visited:
+                        visited.add(target)
+                        next_frontier.append(target)
+            frontier = next_frontier
+        return np.array(next_actions, dtype=np.int32)
+
+    def reset(self):
+        self.current_node = None
+        self._n_agent_turns = 0
+
+    def classify(self, utterance: str) -> int:
+        """
+        Returns the index of the agent action the given utterance corresponds to (cached).
+
+        :param utterance: The agent utterance.
+        :type utterance: str
+        :return: The action index.
+        :rtype: int
+        """
+        with self._action_cache_lock:
+            action = self._action_cache.get(utterance)
+            if action is not None:
+                self._action_cache.move_to_end(utterance)
+                return action
+        action = int(self.index.search(self.sent_encoder.encode(utterance), 1)[0][0])
+        with self._action_cache_lock:
+            self._action_cache[utterance] = action
+            if len(self._action_cache) > self.ACTION_CACHE_SIZE:
+                self._action_cache.popitem(last=False)
+        return action
+
+    def instruct(self, dialog: List[Turn], utterance: str) -> str:
+        agent = self.get_target_agent()
+        name = agent.get_name()
+        events = []
+
+        n_agent_turns = agent.dialog_state.n_turns(name)
+        if n_agent_turns > self._n_agent_turns:
+            self._n_agent_turns = n_agent_turns
+            action = self.actions[self.classify(agent.dialog_state.last_utterance(name))]
+            self.current_node = self.node_ixs[action]
+            events.append(Event(agent=name,
+                                action="request_suggestions",
+                                actionLabel=self.get_event_label(),
+                                text=f"Previous action: {action}",
+                                timestamp=int(time())))
+
+        if self.current_node is None and self.nodes[self.start_node] in self.responses:
+            next_actions = [self.nodes[self.start_node]]
+        else:
+            node = self.start_node if self.current_node is None else self.current_node
+            next_actions = [self.actions[ix] for ix in self.next_actions[node]]
+        if not next_actions:
+            return None
+
+        events.append(Event(agent=name,
+                            action="request_suggestions",
+                            actionLabel=self.get_event_label(),
+                            text="Graph next actions: " + ", ".join(next_actions),
+                            timestamp=int(time())))
+        instruction = (
+            "If applicable, pick your next response from the following action list in order of importance: "
+            + "; ".join(f'({ix + 1}) Action: {action}. Response: "{self.responses[action]}"'
+                        for ix, action in enumerate(next_actions))
+        )
+        return Instruction(text=instruction, events=events)
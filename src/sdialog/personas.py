@@ -8,23 +8,44 @@ complex behaviors.
 # SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
 # SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>, Séverin Baroudi <severin.baroudi@lis-lab.fr>
 # SPDX-License-Identifier: MIT
+import copy
 import json
 import random
+import hashlib
 import torch
+import threading
+import contextvars
 import transformers
 
 from time import time
-from tqdm.auto import trange
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.auto import tqdm, trange
+from typing import List, Union, Dict, Tuple
 
 from langchain_ollama.chat_models import ChatOllama
 from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages.ai import add_usage
 
-from . import Dialog, Turn, Event, Instruction
+from . import Dialog, Turn, Event, Instruction, DialogState
 from .orchestrators import BaseOrchestrator
+from . import profiling
 from .util import make_serializable
 
+_orchestrator_executor = None  # thread pool shared by all agents to run independent orchestrators
+_orchestrator_executor_lock = threading.Lock()
+
+
+def _get_orchestrator_executor() -> ThreadPoolExecutor:
+    """
+    Returns the (lazily created) thread pool used to run independent orchestrators concurrently.
+    """
+    global _orchestrator_executor
+    with _orchestrator_executor_lock:
+        if _orchestrator_executor is None:
+            _orchestrator_executor = ThreadPoolExecutor(thread_name_prefix="sdialog-orchestrator")
+        return _orchestrator_executor
+
 
 class __Meta__(type):
     """
@@ -115,6 +136,102 @@ class Persona(BasePersona):
     language: str = ""
 
 
+class BaseScenario(metaclass=__Meta__):
+    """
+    Base class for defining a dialogue scenario (the setting in which agents interact).
+
+    Scenarios have a stable content hash (:meth:`signature`), so that everything derived from a scenario (e.g.
+    persona prompts or agents) can be reused across dialogues sharing the same scenario.
+
+    :param kwargs: Arbitrary keyword arguments are stored as scenario attributes.
+    """
+    def __init__(self, **kwargs):
+        """
+        Initializes the scenario with arbitrary attributes.
+
+        :param kwargs: Arbitrary scenario attributes.
+        """
+        self.__dict__.update(kwargs)
+
+    def description(self) -> str:
+        """
+        Returns a string description of the scenario's attributes.
+
+        :return: Description of the scenario.
+        :rtype: str
+        """
+        return "\n".join(f"The {key}: {value}" for key, value in self.__dict__.items())
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of the scenario.
+
+        :return: Description of the scenario.
+        :rtype: str
+        """
+        return self.description()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, BaseScenario) and self.signature() == other.signature()
+
+    def __hash__(self) -> int:
+        return hash(self.signature())
+
+    def json(self, string: bool = False, indent=None):
+        """
+        Serializes the scenario to JSON.
+
+        :param string: If True, returns a JSON string; otherwise, returns a dict.
+        :type string: bool
+        :param indent: Indentation level for pretty-printing.
+        :type indent: int
+        :return: The serialized scenario.
+        :rtype: Union[str, dict]
+        """
+        data = self.__dict__.copy()
+        make_serializable(data)
+        return json.dumps(data, indent=indent) if string else data
+
+    def signature(self, fields: List[str] = None) -> str:
+        """
+        Returns a stable content hash of the scenario (independent of the attribute order).
+
+        :param fields: If given, only these attributes are hashed (e.g. the ones a persona depends on).
+        :type fields: List[str]
+        :return: The SHA-256 hex digest of the scenario.
+        :rtype: str
+        """
+        data = self.json()
+        if fields is not None:
+            data = {field: data.get(field) for field in fields}
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class Scenario(BaseScenario):
+    """
+    Standard scenario class with common attributes for task-oriented dialogues.
+
+    :ivar domains: Domains of the dialogue.
+    :vartype domains: List[str]
+    :ivar tasks: Tasks the system can perform (e.g. ``{"task": ..., "domain": ...}`` dicts).
+    :vartype tasks: List[dict]
+    :ivar user_task: Instructions for the user.
+    :vartype user_task: str
+    :ivar system_task: Instructions for the system.
+    :vartype system_task: str
+    :ivar happy: Whether the dialogue follows the 'happy path'.
+    :vartype happy: bool
+    :ivar multitask: Whether the user wants to perform multiple tasks.
+    :vartype multitask: bool
+    """
+    domains: List[str] = []
+    tasks: List[dict] = []
+    user_task: str = ""
+    system_task: str = ""
+    happy: bool = True
+    multitask: bool = False
+
+
 class PersonaAgent:
     """
     Agent that simulates a persona in dialogue using an LLM.
@@ -139,7 +256,9 @@ class PersonaAgent:
                  can_finish: bool = True,
                  orchestrators: Union[BaseOrchestrator, List[BaseOrchestrator]] = None,
                  scenario: Union[dict, str] = None,
-                 llm_kwargs: dict = None):
+                 llm_kwargs: dict = None,
+                 stream: bool = False,
+                 max_response_tokens: int = None):
 
         """
         Initializes a PersonaAgent for role-play dialogue.
@@ -164,6 +283,12 @@ class PersonaAgent:
         :type scenario: Union[dict, str]
         :param llm_kwargs: Additional parameters for the LLM.
         :type llm_kwargs: dict
+        :param stream: If True, responses are streamed from the LLM and generation is stopped as soon as the
+                       STOP word is generated (streaming is always used when a token callback is given).
+        :type stream: bool
+        :param max_response_tokens: If given, generation is cancelled once a response exceeds this number of
+                                    streamed tokens (the response is truncated).
+        :type max_response_tokens: int
         """
 
         if not system_prompt:
@@ -233,17 +358,26 @@ Finally, remember:
             self.hf_model = isinstance(model, ChatHuggingFace)
 
         self.memory = [SystemMessage(system_prompt)]
+        self.rng = random.Random()  # the agent's own random generator (seeded by reset())
+        self.seed = None
+        self.dialog_state = DialogState()
+        self._transient_ixs = []  # memory indexes of the non-persistent instructions
+        self._lookahead = None  # last lookahead response (and the memory state it was generated for)
+        self._schedule = None  # orchestrators to call per turn (built from their declared triggers)
+        self._lookahead_lock = threading.Lock()  # independent orchestrators may ask for the lookahead concurrently
 
         self.name = name if name else (persona.name if hasattr(persona, "name") else None)
         self.persona = persona
         self.model_name = str(self.llm)
         self.first_utterances = None
         self.finished = False
+        self.stream = stream
+        self.max_response_tokens = max_response_tokens
         self.scenario = scenario
         self.orchestrators = None
         self.add_orchestrators(orchestrators)
 
-    def __call__(self, utterance: str = "", return_events: bool = False) -> str:
+    def __call__(self, utterance: str = "", return_events: bool = False, on_token: callable = None) -> str:
         """
         Processes an input utterance and generates a response.
 
@@ -251,6 +385,9 @@ Finally, remember:
         :type utterance: str
         :param return_events: If True, returns a list of events instead of just the response string.
         :type return_events: bool
+        :param on_token: Optional callback called with each generated token and the agent name as
+                         ``on_token(token, speaker)`` while the response is streamed from the LLM.
+        :type on_token: callable
         :return: The agent's response or events, or None if finished.
         :rtype: Union[str, List[Event], None]
         """
@@ -259,12 +396,23 @@ Finally, remember:
 
         if utterance:
             self.memory.append(HumanMessage(content=utterance))
+            self.dialog_state.add(None, utterance)
 
         if return_events:
             events = []
+        speculative_response = None
+        speculative_only = True  # whether only speculative instructions were given (i.e. no material ones)
         if self.orchestrators:
-            for orchestrator in self.orchestrators:
-                instruction = orchestrator()
+            scheduled = self._scheduled_orchestrators()
+            independent_instructions = self._run_independent_orchestrators(scheduled)
+            for ix in scheduled:
+                orchestrator = self.orchestrators[ix]
+                if ix in independent_instructions:
+                    instruction = independent_instructions[ix]
+                else:
+                    instruction = self._call_orchestrator(orchestrator)
+                if orchestrator.is_exhausted():
+                    self._schedule["exhausted"].add(ix)
                 if instruction:
 
                     if type(instruction) is Instruction:
@@ -273,7 +421,16 @@ Finally, remember:
                                 events.append(instruction.events)
                             else:
                                 events.extend(instruction.events)
+                        if instruction.response is not None and speculative_response is None:
+                            speculative_response = instruction.response
+                        else:
+                            speculative_only = False
                         instruction = instruction.text
+                    else:
+                        speculative_only = False
+
+                    if not instruction:
+                        continue
 
                     persist = orchestrator.is_persistent()
                     self.instruct(instruction, persist=persist)
@@ -285,24 +442,23 @@ Finally, remember:
                                             timestamp=int(time())))
 
         if len(self.memory) <= 1 and self.first_utterances:
-            response = (random.choice(self.first_utterances)
+            response = (self.rng.choice(self.first_utterances)
                         if type(self.first_utterances) is list
                         else self.first_utterances)
             response = AIMessage(content=response)
+        elif speculative_response is not None and speculative_only:
+            # An already generated (lookahead) response is committed, no need to generate a new one
+            response = AIMessage(content=speculative_response)
         else:
-            if self.hf_model and not isinstance(self.memory[-1], HumanMessage):
-                # Ensure last message is HumanMessage to avoid "Last message must be a HumanMessage!"
-                # from langchain_huggingface (which makes no sense, for ollama is OK but for hugging face is not?)
-                # https://github.com/langchain-ai/langchain/blob/6d71b6b6ee7433716a59e73c8e859737800a0a86/libs/partners/huggingface/langchain_huggingface/chat_models/huggingface.py#L726
-                response = self.llm.invoke(self.memory + [HumanMessage(content="")])
-            else:
-                response = self.llm.invoke(self.memory)
-
-        if self.orchestrators:
-            self.memory[:] = [msg for msg in self.memory
-                              if not (msg.response_metadata
-                                      and "persist" in msg.response_metadata
-                                      and not msg.response_metadata["persist"])]
+            with profiling.span("llm", "response", self.get_name()) as span:
+                response = self._invoke(self.memory, on_token=on_token)
+                span.set_usage(response)
+        self._lookahead = None
+
+        if self._transient_ixs:
+            for ix in reversed(self._transient_ixs):
+                del self.memory[ix]
+            self._transient_ixs = []
         self.memory.append(response)
 
         response = response.content
@@ -310,6 +466,8 @@ Finally, remember:
             response = response.replace(self.STOP_WORD, self.STOP_WORD_TEXT).strip()
             self.memory[-1].content = self.memory[-1].content.replace(self.STOP_WORD, "").strip()
             self.finished = True
+        self.dialog_state.add(self.get_name(), self.memory[-1].content)
+        profiling.emit_turn(self.dialog_state.last_turn())
 
         if return_events:
             if response:
@@ -337,14 +495,153 @@ Finally, remember:
         """
         Generates a response to a hypothetical next utterance without updating memory.
 
+        The last lookahead is cached per memory state, so several orchestrators asking for it in the same turn
+        (with no instructions in between) share a single LLM call.
+
         :param utterance: The hypothetical next utterance.
         :type utterance: str
         :return: The predicted response.
         :rtype: str
         """
-        if not utterance:
-            return self.llm.invoke(self.memory).content
-        return self.llm.invoke(self.memory + [HumanMessage(utterance)]).content
+        with self._lookahead_lock:
+            key = (len(self.memory), utterance, getattr(self.llm, "seed", None))
+            if self._lookahead and self._lookahead[0] is self.memory[-1] and self._lookahead[1] == key:
+                return self._lookahead[2]
+
+            with profiling.span("llm", "lookahead", self.get_name()) as span:
+                if not utterance:
+                    response = self._invoke(self.memory)
+                else:
+                    response = self._invoke(self.memory + [HumanMessage(utterance)])
+                span.set_usage(response)
+            response = response.content
+            self._lookahead = (self.memory[-1], key, response)
+            return response
+
+    def _invoke(self, messages: list, on_token: callable = None):
+        """
+        Invokes the LLM with the given messages, streaming the response if needed.
+
+        :param messages: The messages to send to the LLM.
+        :type messages: list
+        :param on_token: Optional callback for each generated token (see :meth:`__call__`).
+        :type on_token: callable
+        :return: The LLM response.
+        :rtype: AIMessage
+        """
+        if self.hf_model and not isinstance(messages[-1], HumanMessage):
+            # Ensure last message is HumanMessage to avoid "Last message must be a HumanMessage!"
+            # from langchain_huggingface (which makes no sense, for ollama is OK but for hugging face is not?)
+            # https://github.com/langchain-ai/langchain/blob/6d71b6b6ee7433716a59e73c8e859737800a0a86/libs/partners/huggingface/langchain_huggingface/chat_models/huggingface.py#L726
+            messages = messages + [HumanMessage(content="")]
+
+        if not (self.stream or on_token or self.max_response_tokens):
+            return self.llm.invoke(messages)
+
+        if not hasattr(self.llm, "stream"):
+            response = self.llm.invoke(messages)
+            if on_token and response.content:
+                on_token(response.content, self.get_name())
+            return response
+
+        # Tokens are forwarded to `on_token` as they arrive, except for (a possible prefix of) the STOP word
+        tokens, pending, usage = [], "", None
+        stream = self.llm.stream(messages)
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage_metadata", None):
+                    usage = add_usage(usage, chunk.usage_metadata)
+                token = chunk.content
+                tokens.append(token)
+                pending += token
+                stop_ix = pending.find(self.STOP_WORD)
+                if stop_ix >= 0:
+                    # Closing the stream cancels the request, so the backend stops generating right away
+                    pending = pending[:stop_ix]
+                    break
+                keep = next((k for k in range(min(len(self.STOP_WORD) - 1, len(pending)), 0, -1)
+                             if pending.endswith(self.STOP_WORD[:k])), 0)
+                if on_token and len(pending) > keep:
+                    on_token(pending[:len(pending) - keep], self.get_name())
+                pending = pending[len(pending) - keep:]
+                if self.max_response_tokens and len(tokens) >= self.max_response_tokens:
+                    break
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+        if on_token and pending:
+            on_token(pending, self.get_name())
+
+        return AIMessage(content="".join(tokens), usage_metadata=usage)
+
+    def _build_schedule(self):
+        """
+        Builds the orchestrator schedule (indexed by dialogue length and agent turns) from the orchestrators'
+        declared triggers (see :meth:`sdialog.orchestrators.BaseOrchestrator.get_trigger`).
+        """
+        schedule = {"always": [], "turns": {}, "agent_turns": {}, "from_turn": [], "exhausted": set()}
+        for ix, orchestrator in enumerate(self.orchestrators or []):
+            if orchestrator.is_exhausted():
+                schedule["exhausted"].add(ix)
+            trigger = orchestrator.get_trigger()
+            if trigger is None:
+                schedule["always"].append(ix)
+                continue
+            for n_turns in trigger.turns or []:
+                schedule["turns"].setdefault(n_turns, []).append(ix)
+            for n_turns in trigger.agent_turns or []:
+                schedule["agent_turns"].setdefault(n_turns, []).append(ix)
+            if trigger.from_turn is not None:
+                schedule["from_turn"].append((trigger.from_turn, ix))
+        self._schedule = schedule
+
+    def _scheduled_orchestrators(self) -> List[int]:
+        """
+        Returns the indexes (in declared order) of the orchestrators that can fire in the current turn.
+
+        :return: Indexes of the orchestrators to call.
+        :rtype: List[int]
+        """
+        if self._schedule is None:
+            self._build_schedule()
+        schedule = self._schedule
+        n_turns = len(self.dialog_state)
+        ixs = set(schedule["always"])
+        ixs.update(schedule["turns"].get(n_turns, ()))
+        ixs.update(schedule["agent_turns"].get(self.dialog_state.n_turns(self.get_name()), ()))
+        ixs.update(ix for from_turn, ix in schedule["from_turn"] if n_turns >= from_turn)
+        return sorted(ixs - schedule["exhausted"])
+
+    def _call_orchestrator(self, orchestrator: BaseOrchestrator) -> Union[str, Instruction, None]:
+        """
+        Calls an orchestrator (profiled) and returns its instruction.
+        """
+        with profiling.span("orchestrator", orchestrator.get_event_label(), self.get_name()):
+            return orchestrator()
+
+    def _run_independent_orchestrators(self, ixs: List[int]) -> Dict[int, Union[str, Instruction, None]]:
+        """
+        Runs the independent orchestrators among the given ones concurrently, on the dialogue state before any
+        instruction of the current turn is added (see :meth:`sdialog.orchestrators.BaseOrchestrator.is_independent`).
+
+        :param ixs: Indexes of the orchestrators to be called in the current turn.
+        :type ixs: List[int]
+        :return: The instructions returned by the independent orchestrators, by orchestrator index.
+        :rtype: Dict[int, Union[str, Instruction, None]]
+        """
+        ixs = [ix for ix in ixs if self.orchestrators[ix].is_independent()]
+        if not ixs:
+            return {}
+
+        # The first one runs in the current thread while the others run in the thread pool (in a copy of the
+        # current context, so they are profiled too)
+        futures = {ix: _get_orchestrator_executor().submit(contextvars.copy_context().run,
+                                                           self._call_orchestrator, self.orchestrators[ix])
+                   for ix in ixs[1:]}
+        instructions = {ixs[0]: self._call_orchestrator(self.orchestrators[ixs[0]])}
+        for ix, future in futures.items():
+            instructions[ix] = future.result()
+        return instructions
 
     def add_orchestrators(self, orchestrators):
         """
@@ -363,6 +660,7 @@ Finally, remember:
             orchestrators = [orchestrators]
 
         self.orchestrators.extend(orchestrators)
+        self._schedule = None
 
         for orchestrator in orchestrators:
             orchestrator._set_target_agent(self)
@@ -372,6 +670,7 @@ Finally, remember:
         Removes all orchestrators from the agent.
         """
         self.orchestrators = None
+        self._schedule = None
 
     def instruct(self, instruction: str, persist: bool = False):
         """
@@ -382,6 +681,8 @@ Finally, remember:
         :param persist: If True, instruction persists across turns.
         :type persist: bool
         """
+        if not persist:
+            self._transient_ixs.append(len(self.memory))
         self.memory.append(SystemMessage(instruction, response_metadata={"persist": persist}))
 
     def set_first_utterances(self, utterances: Union[str, List[str]]):
@@ -433,16 +734,22 @@ Finally, remember:
             data["persona"]["orchestrators"] = [orc.json() for orc in self.orchestrators]
         return json.dumps(data, indent=indent) if string else data
 
-    def reset(self, seed: int = None):
+    def reset(self, seed: int = None, rng_seed: int = None):
         """
         Resets the agent's memory and orchestrators, optionally reseeding the LLM.
 
         :param seed: Random seed for reproducibility.
         :type seed: int
+        :param rng_seed: Seed of the agent's own random generator (by default, ``seed``).
+        :type rng_seed: int
         """
         self.memory[:] = self.memory[:1]
+        self.dialog_state.clear()
+        self._transient_ixs = []
+        self._lookahead = None
         self.finished = False
-        self.llm.seed = seed
+        self._set_seed(seed, rng_seed)
+        self._schedule = None
 
         if self.orchestrators:
             for orchestrator in self.orchestrators:
@@ -451,17 +758,110 @@ Finally, remember:
         if not self.hf_model:
             # hack to avoid seed bug in prompt cache
             # (to force a new cache, related to https://github.com/ollama/ollama/issues/5321)
-            _ = self.llm.num_predict
-            self.llm.num_predict = 1
-            self.llm.invoke(self.memory)
-            self.llm.num_predict = _
+            # done with a copy of the client, so num_predict is never changed on a client used for generation
+            llm = copy.copy(self.llm)
+            llm.num_predict = 1
+            llm.invoke(self.memory)
+
+    def _set_seed(self, seed: int, rng_seed: int = None):
+        """
+        Seeds the agent's random generator and sets the seed of its LLM client.
+
+        :param seed: Random seed.
+        :type seed: int
+        :param rng_seed: Seed of the agent's random generator (by default, ``seed``).
+        :type rng_seed: int
+        """
+        self.seed = seed
+        self.rng.seed(seed if rng_seed is None else rng_seed)
+        self.llm.seed = seed
+
+    @staticmethod
+    def _get_rng_seeds(seed: int) -> Tuple[int, int]:
+        """
+        Derives the random generator seeds of the two agents of a dialogue from its seed, so that they do not draw
+        the same random stream.
+
+        :return: The seeds of the first and the second agent.
+        :rtype: Tuple[int, int]
+        """
+        rng = random.Random(seed)
+        return rng.getrandbits(32), rng.getrandbits(32)
+
+    def snapshot(self) -> dict:
+        """
+        Takes a snapshot of the agent state (memory, dialogue state, orchestrators, RNG and finished flag).
+
+        Memory messages are shared with the agent (copy-on-write), only the containers are copied.
+
+        :return: The agent state, to be used with :meth:`restore`.
+        :rtype: dict
+        """
+        return {
+            "memory": list(self.memory),
+            "dialog_state": self.dialog_state.copy(),
+            "transient_ixs": list(self._transient_ixs),
+            "finished": self.finished,
+            "orchestrators": [orc.clone() for orc in self.orchestrators] if self.orchestrators else None,
+            "rng": self.rng.getstate(),
+            "seed": self.seed
+        }
+
+    def restore(self, snapshot: dict):
+        """
+        Restores the agent state from a snapshot taken with :meth:`snapshot`.
+
+        :param snapshot: The agent state.
+        :type snapshot: dict
+        """
+        self.memory[:] = snapshot["memory"]
+        self.dialog_state = snapshot["dialog_state"].copy()
+        self._transient_ixs = list(snapshot["transient_ixs"])
+        self._lookahead = None
+        self.finished = snapshot["finished"]
+        self.clear_orchestrators()
+        if snapshot["orchestrators"]:
+            self.add_orchestrators([orc.clone() for orc in snapshot["orchestrators"]])
+        self.rng.setstate(snapshot["rng"])
+        self.seed = snapshot["seed"]
+        if snapshot["seed"] is not None:
+            self.llm.seed = snapshot["seed"]
+
+    def fork(self) -> "PersonaAgent":
+        """
+        Returns a new agent with a copy of the current state of this one, to continue the dialogue independently.
+
+        The fork shares the persona and system prompt with this agent, while memory and orchestrators are copied
+        (copy-on-write), so forking is cheap and does not reset any backend prompt cache. The fork gets its own
+        random generator (with the same state) and its own shallow copy of the LLM client (sharing the underlying
+        connection or model), so that seeding one agent does not affect the other and both can generate dialogues
+        in different threads. Agents built with the same LLM instance share it and must not be used concurrently.
+
+        :return: The forked agent.
+        :rtype: PersonaAgent
+        """
+        agent = copy.copy(self)
+        agent.llm = copy.copy(self.llm)
+        agent.rng = random.Random()
+        agent.rng.setstate(self.rng.getstate())
+        agent.memory = list(self.memory)
+        agent.dialog_state = self.dialog_state.copy()
+        agent._transient_ixs = list(self._transient_ixs)
+        agent._lookahead_lock = threading.Lock()
+        agent.clear_orchestrators()
+        if self.orchestrators:
+            agent.add_orchestrators([orc.clone() for orc in self.orchestrators])
+        return agent
 
     def dialog_with(self,
                     agent: "PersonaAgent",
                     max_iterations: int = 20,
                     id: int = None,
                     seed: int = None,
-                    keep_bar: bool = True):
+                    keep_bar: bool = True,
+                    on_token: callable = None,
+                    watchdog=None,
+                    profile: bool = False):
         """
         Simulates a dialogue between this agent and another PersonaAgent.
 
@@ -475,31 +875,53 @@ Finally, remember:
         :type seed: int
         :param keep_bar: If True, keeps the progress bar visible.
         :type keep_bar: bool
+        :param on_token: Optional callback called with each generated token and its speaker name as
+                         ``on_token(token, speaker)``, as responses are streamed from the LLMs.
+        :type on_token: callable
+        :param watchdog: Optional watchdog to detect degenerated dialogues and end them early
+                         (e.g. :class:`~sdialog.watchdogs.DegenerationWatchdog`).
+        :type watchdog: DegenerationWatchdog
+        :param profile: If True, LLM, orchestrator and encoder calls are timed and their stats are added to the
+                        dialogue (``Dialog.stats``, see :mod:`sdialog.profiling`).
+        :type profile: bool
         :return: The generated dialogue object.
         :rtype: Dialog
         """
+        if profile:
+            with profiling.profile() as recorder:
+                dialog = self._dialog_with(agent, max_iterations, id, seed, keep_bar, on_token, watchdog)
+            dialog.stats = recorder.stats()
+        else:
+            dialog = self._dialog_with(agent, max_iterations, id, seed, keep_bar, on_token, watchdog)
+        profiling.emit_dialog_end(dialog)
+        return dialog
+
+    talk_with = dialog_with
+
+    def _dialog_with(self, agent: "PersonaAgent", max_iterations: int, id: int, seed: int, keep_bar: bool,
+                     on_token: callable, watchdog) -> Dialog:
+        """
+        Simulates a dialogue between this agent and another PersonaAgent (see :meth:`dialog_with`).
+        """
         seed = seed if seed is not None else random.getrandbits(32)
+        rng_seeds = self._get_rng_seeds(seed)
 
-        random.seed(seed)
-        self.reset(seed)
-        agent.reset(seed)
+        self.reset(seed, rng_seeds[0])
+        agent.reset(seed, rng_seeds[1])
 
         dialog = []
         events = []
 
+        if watchdog:
+            watchdog.reset()
+
         utter = None
         completion = False
+        discard = None
         tqdm_iterator = trange(max_iterations, desc="Dialogue", leave=keep_bar)
         for _ in tqdm_iterator:
-            utt_events = self(utter, return_events=True)
-
-            if utt_events and utt_events[-1].action == "utter":
-                utter = utt_events[-1].text
-                utt_events[-1].text = utter.replace(self.STOP_WORD_TEXT, "").strip()
-                if not utt_events[-1].text:
-                    break
-            else:
-                completion = True
+            utter, utt_events, completion = self._dialog_turn(utter, on_token)
+            if not utt_events:
                 break
 
             dialog.append(Turn(
@@ -507,15 +929,12 @@ Finally, remember:
                 text=utt_events[-1].text
             ))
             events.extend(utt_events)
+            discard = self._watch(watchdog, dialog, events, agent, max_iterations * 2)
+            if discard is not None:
+                break
 
-            utt_events = agent(utter, return_events=True)
-            if utt_events and utt_events[-1].action == "utter":
-                utter = utt_events[-1].text
-                utt_events[-1].text = utter.replace(self.STOP_WORD_TEXT, "").strip()
-                if not utt_events[-1].text:
-                    break
-            else:
-                completion = True
+            utter, utt_events, completion = agent._dialog_turn(utter, on_token)
+            if not utt_events:
                 break
 
             dialog.append(Turn(
@@ -523,6 +942,9 @@ Finally, remember:
                 text=utt_events[-1].text
             ))
             events.extend(utt_events)
+            discard = self._watch(watchdog, dialog, events, self, max_iterations * 2)
+            if discard is not None:
+                break
 
         if not keep_bar:
             try:
@@ -530,6 +952,135 @@ Finally, remember:
             except AttributeError:
                 pass
 
+        return self._build_dialog(agent, dialog, events, completion, id, seed, discard=discard or None)
+
+    def dialog_tree(self,
+                    agent: "PersonaAgent",
+                    branching: Dict[int, int],
+                    max_iterations: int = 20,
+                    id: int = None,
+                    seed: int = None,
+                    keep_bar: bool = True):
+        """
+        Generates a tree of dialogues between this agent and another PersonaAgent, branching at given turns.
+
+        The tree is expanded breadth-first and branches are created by forking both agents (see :meth:`fork`), so
+        the shared dialogue prefix is generated only once and the same LLM backends (and prompt caches) are reused
+        by all branches. Each new branch has its own seed, set on its forked agents and recorded in its "branch" event
+        (each dialogue of the tree has the seed of its last branch). Each complete path of the tree is yielded as soon
+        as it ends.
+
+        :param agent: The other agent to converse with.
+        :type agent: PersonaAgent
+        :param branching: Turn-index:number-of-branches dictionary (e.g. ``{6: 20}`` generates 20 different
+                          variants of the 7th turn, each one continued independently).
+        :type branching: Dict[int, int]
+        :param max_iterations: Maximum number of dialogue iterations (each iteration is one turn per agent).
+        :type max_iterations: int
+        :param id: Dialogue ID (shared by all dialogues of the tree).
+        :type id: int
+        :param seed: Random seed for reproducibility.
+        :type seed: int
+        :param keep_bar: If True, keeps the progress bar visible.
+        :type keep_bar: bool
+        :return: A generator of the dialogues of the tree (one per leaf).
+        :rtype: Iterator[Dialog]
+        """
+        seed = seed if seed is not None else random.getrandbits(32)
+        rng_seeds = self._get_rng_seeds(seed)
+
+        self.reset(seed, rng_seeds[0])
+        agent.reset(seed, rng_seeds[1])
+
+        def build_dialog(node: list, completion: bool) -> Dialog:
+            # each leaf records the seed of its own branch (the root seed for the first path)
+            dialog = node[0][0]._build_dialog(node[0][1], node[1], node[2], completion, id, node[0][0].seed)
+            profiling.emit_dialog_end(dialog)
+            return dialog
+
+        branch_rng = random.Random(seed)
+        # A node is: [agents, turns, events, last utterance]
+        frontier = [[(self, agent), [], [], None]]
+        pbar = tqdm(desc="Dialogue tree", unit="turn", leave=keep_bar)
+        for turn_ix in range(max_iterations * 2):
+            n_branches = branching.get(turn_ix, 1)
+            next_frontier = []
+            for node in frontier:
+                children = [node]
+                for branch_ix in range(1, n_branches):
+                    branch_seed = branch_rng.getrandbits(32)
+                    agents = (node[0][0].fork(), node[0][1].fork())
+                    for branch_agent, rng_seed in zip(agents, self._get_rng_seeds(branch_seed)):
+                        branch_agent._set_seed(branch_seed, rng_seed)
+                    children.append([agents, list(node[1]), list(node[2]), node[3]])
+                for branch_ix, child in enumerate(children):
+                    if n_branches > 1:
+                        child[2].append(Event(action="branch",
+                                              actionLabel=str(branch_ix),
+                                              text=f"Branch {branch_ix + 1}/{n_branches} at turn {turn_ix} "
+                                                   f"(seed {child[0][0].seed})",
+                                              timestamp=int(time())))
+                    speaker = child[0][turn_ix % 2]
+                    utter, utt_events, completion = speaker._dialog_turn(child[3])
+                    pbar.update()
+
+                    if not utt_events:
+                        yield build_dialog(child, completion)
+                        continue
+
+                    child[1].append(Turn(speaker=speaker.get_name(default="Me" if turn_ix % 2 == 0 else "Other"),
+                                         text=utt_events[-1].text))
+                    child[2].extend(utt_events)
+                    child[3] = utter
+                    next_frontier.append(child)
+            frontier = next_frontier
+
+        pbar.close()
+        for node in frontier:  # ran out of iterations
+            yield build_dialog(node, False)
+
+    def _dialog_turn(self, utterance: str, on_token: callable = None):
+        """
+        Takes one dialogue turn in response to `utterance`.
+
+        :return: The raw response, its events (None if the dialogue must stop) and whether the dialogue is complete.
+        :rtype: Tuple[str, List[Event], bool]
+        """
+        utt_events = self(utterance, return_events=True, on_token=on_token)
+
+        if utt_events and utt_events[-1].action == "utter":
+            utter = utt_events[-1].text
+            utt_events[-1].text = utter.replace(self.STOP_WORD_TEXT, "").strip()
+            if not utt_events[-1].text:
+                return utter, None, False
+            return utter, utt_events, False
+        return None, None, True
+
+    @staticmethod
+    def _watch(watchdog, dialog: List[Turn], events: List[Event], next_agent: "PersonaAgent", max_turns: int):
+        """
+        Runs the watchdog (if any) on the dialogue so far, recording its decision as an event.
+
+        :return: None if the dialogue can continue, otherwise whether it must be discarded.
+        :rtype: Optional[bool]
+        """
+        if not watchdog:
+            return None
+
+        event = watchdog(dialog, next_agent=next_agent, max_turns=max_turns)
+        if not event:
+            return None
+
+        events.append(event)
+        if event.action == "watchdog-instruct":
+            return None
+        return event.action == "watchdog-discard"
+
+    def _build_dialog(self, agent: "PersonaAgent", turns: List[Turn], events: List[Event],
+                      completion: bool, id: int = None, seed: int = None, discard: bool = None) -> Dialog:
+        """
+        Builds the Dialog object for a dialogue between this agent and `agent`.
+        """
         if self.scenario:
             scenario = self.scenario
         else:
@@ -549,8 +1100,7 @@ Finally, remember:
                 self.get_name(): self.persona.json(),
                 agent.get_name(default="Other"): agent.persona.json()},
             scenario=scenario,
-            turns=dialog,
-            events=events
+            turns=turns,
+            events=events,
+            discard=discard
         )
-
-    talk_with = dialog_with
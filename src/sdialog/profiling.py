@@ -0,0 +1,514 @@
+"""
+profiling: Lightweight Instrumentation for sdialog
+
+This module provides optional high-resolution timing of the dialogue generation process: LLM calls (responses and
+lookaheads), orchestrator calls and sentence encoder calls are recorded as spans (monotonic nanosecond start/end
+times, plus prompt/completion token counts when reported by the backend) while a profile is active, e.g.:
+
+.. code-block:: python
+
+    from sdialog import profiling
+
+    with profiling.profile() as run:
+        dialogs = [alice.dialog_with(bob, profile=True) for _ in range(10)]
+
+    print(dialogs[0].stats)  # per-dialogue stats
+    print(run.stats())  # aggregated stats for the whole run
+
+Spans (and turn / dialogue events) can also be fed to custom tooling by registering hooks (see
+:class:`BaseProfilingHook`), e.g. the built-in sinks writing JSONL traces (:class:`JSONLTraceSink`), Chrome
+trace-event files (:class:`ChromeTraceSink`, to be opened with ``chrome://tracing`` or Perfetto) or collecting
+in-process latency histograms (:class:`HistogramSink`):
+
+.. code-block:: python
+
+    sink = profiling.register_hook(profiling.ChromeTraceSink("trace.json"))
+    dialog = alice.dialog_with(bob)
+    profiling.unregister_hook(sink)  # (also closes the sink, writing the trace file)
+
+When no profile is active and no hooks are registered, instrumented calls only pay for a context variable lookup.
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import json
+import threading
+import numpy as np
+
+from time import monotonic_ns
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pydantic import BaseModel
+from typing import List, Optional, Union, Iterable, TextIO
+
+from . import Dialog, Turn
+
+_recorder = ContextVar("sdialog_profile_recorder", default=None)
+_hooks = ()  # registered hooks (immutable, replaced on registration so it can be iterated without locking)
+_hooks_lock = threading.Lock()
+
+
+class Span(BaseModel):
+    """
+    A timed operation (spans may be nested, e.g. the lookahead LLM call made by an orchestrator).
+
+    :ivar kind: Kind of operation ("llm", "orchestrator", "encode" or "tts").
+    :vartype kind: str
+    :ivar name: Name of the operation (e.g. "response" or "lookahead" for LLM calls, the orchestrator event label
+                or the encoder model name).
+    :vartype name: Optional[str]
+    :ivar agent: Name of the agent the operation was performed for (if any).
+    :vartype agent: Optional[str]
+    :ivar start: Start time (monotonic clock, in nanoseconds).
+    :vartype start: int
+    :ivar end: End time (monotonic clock, in nanoseconds).
+    :vartype end: int
+    :ivar prompt_tokens: Number of prompt tokens (LLM calls, if reported by the backend).
+    :vartype prompt_tokens: Optional[int]
+    :ivar completion_tokens: Number of generated tokens (LLM calls, if reported by the backend).
+    :vartype completion_tokens: Optional[int]
+    :ivar thread: Identifier of the thread the operation was performed in.
+    :vartype thread: Optional[int]
+    """
+    kind: str
+    name: Optional[str] = None
+    agent: Optional[str] = None
+    start: int
+    end: int
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    thread: Optional[int] = None
+
+    @property
+    def duration(self) -> int:
+        """
+        Duration of the span in nanoseconds.
+        """
+        return self.end - self.start
+
+
+class ProfileRecorder:
+    """
+    Collects the spans recorded while it is active (see :func:`profile`). Spans are also forwarded to the
+    recorder that was active when this one was created (if any), so runs can be profiled as a whole while
+    each dialogue is profiled separately.
+
+    :ivar spans: The recorded spans.
+    :vartype spans: List[Span]
+    """
+    def __init__(self, parent: "ProfileRecorder" = None):
+        self.parent = parent
+        self.spans = []
+        self.start = monotonic_ns()
+        self.end = None
+
+    def add(self, span: Span):
+        """
+        Adds a span to the recorder (and to its parent recorder).
+
+        :param span: The span to add.
+        :type span: Span
+        """
+        self.spans.append(span)  # list.append is atomic (spans may be added from several threads)
+        if self.parent is not None:
+            self.parent.add(span)
+
+    def stats(self) -> dict:
+        """
+        Returns the stats of the recorded spans (see :func:`get_stats`).
+
+        :return: The stats.
+        :rtype: dict
+        """
+        return get_stats(self.spans, (self.end or monotonic_ns()) - self.start)
+
+
+class BaseProfilingHook:
+    """
+    Base class for profiling hooks, called as dialogues are generated (see :func:`register_hook`). All methods
+    are optional no-ops to be overridden as needed. Hooks may be called from several threads at once.
+
+    :meth:`on_llm_start`: Called before each LLM call.
+    :meth:`on_llm_end`: Called after each LLM call with its span.
+    :meth:`on_orchestrator`: Called after each orchestrator call with its span.
+    :meth:`on_encode`: Called after each sentence encoder call with its span.
+    :meth:`on_span`: Called with every span (including the ones above and e.g. text-to-speech ones).
+    :meth:`on_turn`: Called each time an agent utters a turn.
+    :meth:`on_dialog_end`: Called each time a dialogue is generated.
+    :meth:`close`: Called when the hook is unregistered.
+    """
+    def on_llm_start(self, name: str, agent: Optional[str]):
+        pass
+
+    def on_llm_end(self, span: Span):
+        pass
+
+    def on_orchestrator(self, span: Span):
+        pass
+
+    def on_encode(self, span: Span):
+        pass
+
+    def on_span(self, span: Span):
+        pass
+
+    def on_turn(self, turn: Turn):
+        pass
+
+    def on_dialog_end(self, dialog: Dialog):
+        pass
+
+    def close(self):
+        pass
+
+
+class _SpanTimer:
+    """
+    Context manager recording a span in the active recorder (if any) and passing it to the registered hooks.
+    """
+    __slots__ = ("recorder", "hooks", "kind", "name", "agent", "start", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, recorder: Optional[ProfileRecorder], kind: str, name: str, agent: str):
+        self.recorder = recorder
+        self.hooks = _hooks
+        self.kind = kind
+        self.name = name
+        self.agent = agent
+        self.prompt_tokens = None
+        self.completion_tokens = None
+
+    def __enter__(self):
+        if self.kind == "llm":
+            for hook in self.hooks:
+                hook.on_llm_start(self.name, self.agent)
+        self.start = monotonic_ns()
+        return self
+
+    def __exit__(self, *exc):
+        span = Span(kind=self.kind, name=self.name, agent=self.agent, start=self.start, end=monotonic_ns(),
+                    prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens,
+                    thread=threading.get_ident())
+        if self.recorder is not None:
+            self.recorder.add(span)
+        for hook in self.hooks:
+            hook.on_span(span)
+            if self.kind == "llm":
+                hook.on_llm_end(span)
+            elif self.kind == "orchestrator":
+                hook.on_orchestrator(span)
+            elif self.kind == "encode":
+                hook.on_encode(span)
+        return False
+
+    def set_usage(self, message):
+        """
+        Sets the token counts of the span from an LLM response (if reported by the backend).
+
+        :param message: The LLM response message.
+        """
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.prompt_tokens = usage.get("input_tokens")
+            self.completion_tokens = usage.get("output_tokens")
+        else:
+            metadata = getattr(message, "response_metadata", None) or {}
+            self.prompt_tokens = metadata.get("prompt_eval_count")
+            self.completion_tokens = metadata.get("eval_count")
+
+
+class _NullSpanTimer:
+    """
+    No-op span context manager, used when no profile is active.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_usage(self, message):
+        pass
+
+
+_NULL_SPAN_TIMER = _NullSpanTimer()
+
+
+def get_recorder() -> Optional[ProfileRecorder]:
+    """
+    Returns the active recorder (in the current context), if any.
+
+    :return: The active recorder, or None if no profile is active.
+    :rtype: Optional[ProfileRecorder]
+    """
+    return _recorder.get()
+
+
+def span(kind: str, name: str = None, agent: str = None) -> Union[_SpanTimer, _NullSpanTimer]:
+    """
+    Returns a context manager timing the enclosed operation as a span of the active recorder (a no-op if no
+    profile is active). Token counts can be set with ``set_usage(llm_response)``.
+
+    :param kind: Kind of operation ("llm", "orchestrator", "encode" or "tts").
+    :type kind: str
+    :param name: Name of the operation.
+    :type name: str
+    :param agent: Name of the agent the operation is performed for.
+    :type agent: str
+    :return: The span context manager.
+    """
+    recorder = _recorder.get()
+    if recorder is None and not _hooks:
+        return _NULL_SPAN_TIMER
+    return _SpanTimer(recorder, kind, name, agent)
+
+
+def emit_turn(turn: Turn):
+    """
+    Passes a new dialogue turn to the registered hooks.
+
+    :param turn: The turn.
+    :type turn: Turn
+    """
+    for hook in _hooks:
+        hook.on_turn(turn)
+
+
+def emit_dialog_end(dialog: Dialog):
+    """
+    Passes a generated dialogue to the registered hooks.
+
+    :param dialog: The dialogue.
+    :type dialog: Dialog
+    """
+    for hook in _hooks:
+        hook.on_dialog_end(dialog)
+
+
+def register_hook(hook: BaseProfilingHook) -> BaseProfilingHook:
+    """
+    Registers a profiling hook (process-wide).
+
+    :param hook: The hook.
+    :type hook: BaseProfilingHook
+    :return: The registered hook.
+    :rtype: BaseProfilingHook
+    """
+    global _hooks
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks = _hooks + (hook,)
+    return hook
+
+
+def unregister_hook(hook: BaseProfilingHook):
+    """
+    Unregisters a profiling hook and closes it.
+
+    :param hook: The hook.
+    :type hook: BaseProfilingHook
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+    hook.close()
+
+
+def clear_hooks():
+    """
+    Unregisters (and closes) all the profiling hooks.
+    """
+    for hook in _hooks:
+        unregister_hook(hook)
+
+
+def get_hooks() -> List[BaseProfilingHook]:
+    """
+    Returns the registered profiling hooks.
+
+    :rtype: List[BaseProfilingHook]
+    """
+    return list(_hooks)
+
+
+@contextmanager
+def profile(recorder: ProfileRecorder = None):
+    """
+    Context manager activating a profile recorder (in the current context) for the enclosed code.
+
+    :param recorder: The recorder to activate (a new one, child of the currently active one, by default).
+    :type recorder: ProfileRecorder
+    :return: The active recorder.
+    :rtype: ProfileRecorder
+    """
+    recorder = recorder if recorder is not None else ProfileRecorder(parent=_recorder.get())
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        recorder.end = monotonic_ns()
+        _recorder.reset(token)
+
+
+def _new_metrics() -> dict:
+    return {"calls": 0, "total_ns": 0, "max_ns": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _add_metrics(metrics: dict, other: dict):
+    metrics["calls"] += other["calls"]
+    metrics["total_ns"] += other["total_ns"]
+    metrics["max_ns"] = max(metrics["max_ns"], other["max_ns"])
+    metrics["prompt_tokens"] += other["prompt_tokens"]
+    metrics["completion_tokens"] += other["completion_tokens"]
+
+
+def get_stats(spans: List[Span], wall_ns: int = None) -> dict:
+    """
+    Computes the stats of a list of spans: number of calls, total and maximum duration (in nanoseconds) and
+    number of prompt/completion tokens, per kind of operation (``"kinds"``) and per kind and name
+    (``"names"``, with ``"kind:name"`` keys).
+
+    :param spans: The spans.
+    :type spans: List[Span]
+    :param wall_ns: Total wall time (in nanoseconds) the spans were recorded in.
+    :type wall_ns: int
+    :return: The stats.
+    :rtype: dict
+    """
+    stats = {"wall_ns": wall_ns or 0, "kinds": {}, "names": {}}
+    for sp in spans:
+        metrics = {"calls": 1, "total_ns": sp.duration, "max_ns": sp.duration,
+                   "prompt_tokens": sp.prompt_tokens or 0, "completion_tokens": sp.completion_tokens or 0}
+        _add_metrics(stats["kinds"].setdefault(sp.kind, _new_metrics()), metrics)
+        _add_metrics(stats["names"].setdefault(f"{sp.kind}:{sp.name}", _new_metrics()), metrics)
+    return stats
+
+
+def aggregate_stats(stats: Iterable[Union[dict, Dialog]]) -> dict:
+    """
+    Aggregates the stats of several dialogues (e.g. all the dialogues of a run).
+
+    :param stats: The stats to aggregate, or the (profiled) dialogues whose stats are aggregated.
+    :type stats: Iterable[Union[dict, Dialog]]
+    :return: The aggregated stats (see :func:`get_stats`), with the number of aggregated dialogues (``"n"``).
+    :rtype: dict
+    """
+    total = {"n": 0, "wall_ns": 0, "kinds": {}, "names": {}}
+    for item in stats:
+        item = item.stats if isinstance(item, Dialog) else item
+        if not item:
+            continue
+        total["n"] += 1
+        total["wall_ns"] += item["wall_ns"]
+        for group in ["kinds", "names"]:
+            for key, metrics in item[group].items():
+                _add_metrics(total[group].setdefault(key, _new_metrics()), metrics)
+    return total
+
+
+class JSONLTraceSink(BaseProfilingHook):
+    """
+    Profiling hook writing spans, turns and dialogue ends as JSON lines (one record per line, with a ``"type"``
+    field: ``"span"``, ``"turn"`` or ``"dialog_end"``).
+
+    :param output: Path of the output file (appended to) or an already opened text file.
+    :type output: Union[str, TextIO]
+    """
+    def __init__(self, output: Union[str, TextIO]):
+        self._own_file = isinstance(output, str)
+        self.file = open(output, "a") if self._own_file else output
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.file.write(line)
+
+    def on_span(self, span: Span):
+        self._write({"type": "span", **span.model_dump()})
+
+    def on_turn(self, turn: Turn):
+        self._write({"type": "turn", "time": monotonic_ns(), "speaker": turn.speaker, "text": turn.text})
+
+    def on_dialog_end(self, dialog: Dialog):
+        self._write({"type": "dialog_end", "time": monotonic_ns(), "dialogId": dialog.dialogId,
+                     "seed": dialog.seed, "turns": len(dialog), "stats": dialog.stats})
+
+    def close(self):
+        with self._lock:
+            if self._own_file:
+                self.file.close()
+            else:
+                self.file.flush()
+
+
+class ChromeTraceSink(BaseProfilingHook):
+    """
+    Profiling hook collecting spans (as complete events) and turns (as instant events) in the Chrome trace-event
+    format, written to a JSON file when closed (to be opened with ``chrome://tracing`` or https://ui.perfetto.dev).
+
+    :param path: Path of the output trace file.
+    :type path: str
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.events = []
+        self._pid = os.getpid()
+
+    def on_span(self, span: Span):
+        args = {key: value for key, value in [("agent", span.agent),
+                                              ("prompt_tokens", span.prompt_tokens),
+                                              ("completion_tokens", span.completion_tokens)] if value is not None}
+        self.events.append({"name": f"{span.kind}:{span.name}" if span.name else span.kind, "cat": span.kind,
+                            "ph": "X", "ts": span.start / 1e3, "dur": span.duration / 1e3,
+                            "pid": self._pid, "tid": span.thread, "args": args})
+
+    def on_turn(self, turn: Turn):
+        self.events.append({"name": f"turn:{turn.speaker}", "cat": "turn", "ph": "i", "s": "t",
+                            "ts": monotonic_ns() / 1e3, "pid": self._pid, "tid": threading.get_ident(),
+                            "args": {"text": turn.text}})
+
+    def close(self):
+        with open(self.path, "w") as writer:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, writer)
+
+
+class HistogramSink(BaseProfilingHook):
+    """
+    Profiling hook collecting the span durations (per ``"kind:name"``) in memory, to get latency summaries and
+    histograms of the process.
+    """
+    def __init__(self):
+        self.durations = {}
+
+    def on_span(self, span: Span):
+        self.durations.setdefault(f"{span.kind}:{span.name}", []).append(span.duration)
+
+    def summary(self) -> dict:
+        """
+        Returns the latency summary (count, mean, percentiles and maximum, in milliseconds) per ``"kind:name"``.
+
+        :rtype: dict
+        """
+        summary = {}
+        for key, durations in self.durations.items():
+            durations = np.array(durations) / 1e6
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+            summary[key] = {"count": len(durations), "mean_ms": float(durations.mean()), "p50_ms": float(p50),
+                            "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": float(durations.max())}
+        return summary
+
+    def histogram(self, key: str, bins: Union[int, List[float]] = 10):
+        """
+        Returns the latency histogram (in milliseconds) of a given ``"kind:name"``.
+
+        :param key: The span key (e.g. ``"llm:response"``).
+        :type key: str
+        :param bins: Number of bins or bin edges (see ``numpy.histogram``).
+        :type bins: Union[int, List[float]]
+        :return: The histogram counts and bin edges.
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        return np.histogram(np.array(self.durations.get(key, [])) / 1e6, bins=bins)
@@ -0,0 +1,375 @@
+"""
+replay: Reference-vs-Synthetic Dialogue Replay Harness
+
+This module regenerates dataset dialogues (e.g. STAR dialogues, using the agents built from their scenarios) and
+writes each synthetic dialogue next to its reference one in a single aligned JSONL corpus. Dialogues are generated
+concurrently and the corpus doubles as a checkpoint (already replayed dialogues are skipped when resuming).
+Replays report their throughput and the turn-count and turn-length distribution deltas between the synthetic and
+reference dialogues; with the mock LLM of :mod:`sdialog.benchmark`, they are a reproducible performance benchmark
+of the whole STAR workload.
+
+Command line usage:
+
+    python -m sdialog.replay run --star PATH --n 100 --model qwen2.5:14b --workers 8 -o replay.jsonl
+    python -m sdialog.replay run --mock --n 200 --workers 8 -o replay.jsonl  # offline perf benchmark
+    python -m sdialog.replay stats replay.jsonl
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+import contextvars
+import numpy as np
+
+from time import perf_counter
+from tqdm.auto import tqdm
+from typing import List, Union, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import Dialog, profiling
+from .datasets import BaseDialogDataset, STAR
+
+
+def replay(dataset: BaseDialogDataset,
+           ids: list,
+           model: Union[str, object],
+           output_path: str,
+           workers: int = 4,
+           max_iterations: int = 20,
+           seed: int = 0,
+           resume: bool = True,
+           verbose: bool = True,
+           **agent_kwargs) -> dict:
+    """
+    Regenerates the given dataset dialogues with the agents built for them (see
+    :meth:`~sdialog.datasets.BaseDialogDataset.get_agents`), writing each (reference, synthetic) pair as one line
+    of the output JSONL file as soon as it is generated.
+
+    Example:
+
+        .. code-block:: python
+
+            from sdialog.datasets import STAR
+            from sdialog.replay import replay
+
+            STAR.set_path("STAR/")
+            ids = STAR.get_dialog_ids(task_name="bank_balance")
+            stats = replay(STAR.get_dataset(), ids, "qwen2.5:14b", "replay.jsonl", workers=8, flow_graph=True)
+
+    :param dataset: The dataset the dialogues belong to.
+    :type dataset: BaseDialogDataset
+    :param ids: IDs of the dialogues to replay.
+    :type ids: list
+    :param model: Model name or LLM to use.
+    :type model: Union[str, object]
+    :param output_path: Output JSONL file (``{"id", "seed", "reference", "synthetic"}`` lines).
+    :type output_path: str
+    :param workers: Number of dialogues generated concurrently.
+    :type workers: int
+    :param max_iterations: Maximum number of turns per agent in each synthetic dialogue.
+    :type max_iterations: int
+    :param seed: Base random seed (the seed of each dialogue is the base seed plus its position in `ids`).
+    :type seed: int
+    :param resume: If True, the dialogues already in the output file are not generated again; otherwise, the
+                   output file is overwritten.
+    :type resume: bool
+    :param verbose: If True, shows a progress bar.
+    :type verbose: bool
+    :param agent_kwargs: Additional arguments for the dataset ``get_agents()`` method (e.g. ``flow_graph=True``
+                         for STAR).
+    :return: Replay stats (see :func:`get_replay_stats`) of the whole output corpus, plus the ``throughput`` of
+             this run.
+    :rtype: dict
+    """
+    agents_lock = threading.Lock()  # dataset agent builders share (non thread-safe) caches
+
+    def generate(dialog_id, ix: int) -> Tuple[dict, int]:
+        with agents_lock:
+            system, user = dataset.get_agents(dialog_id, model, **agent_kwargs)
+        # Each dialogue gets its own copies of the LLM client and random generators (seeded by dialog_with()),
+        # so the output does not depend on how dialogues are scheduled across workers
+        system, user = system.fork(), user.fork()
+        synthetic = system.dialog_with(user, max_iterations=max_iterations, id=dialog_id, seed=seed + ix,
+                                       keep_bar=False)
+        return {"id": dialog_id, "seed": seed + ix,
+                "reference": dataset.get_dialog(dialog_id).json(),
+                "synthetic": synthetic.json()}, len(synthetic)
+
+    throughput = run_jsonl_jobs([(dialog_id, ix) for ix, dialog_id in enumerate(ids)], generate, output_path,
+                                id_field="id", workers=workers, resume=resume, desc="Replaying dialogs",
+                                verbose=verbose)
+    stats = get_replay_stats(read_replay(output_path))
+    stats["throughput"] = throughput
+    return stats
+
+
+def run_jsonl_jobs(jobs: List[tuple],
+                   generate: Callable[..., Tuple[dict, int]],
+                   output_path: str,
+                   id_field: str,
+                   workers: int = 4,
+                   resume: bool = True,
+                   desc: str = "Generating dialogs",
+                   verbose: bool = True) -> dict:
+    """
+    Runs dialogue generation jobs concurrently, writing the record of each job as one line of a JSONL file as soon
+    as it is generated (used by :func:`replay` and :func:`sdialog.cli.generate_dialogs`). The output file doubles
+    as a checkpoint: when resuming, the jobs whose record is already in it are skipped. Jobs run in worker threads,
+    each one in a copy of the caller's context (e.g. with its profiling hooks).
+
+    :param jobs: The jobs, as tuples of arguments of `generate` whose first element is the ID of their record.
+    :type jobs: List[tuple]
+    :param generate: Function generating the record of a job, returning the (JSON-serializable) record and its
+                     number of turns.
+    :type generate: Callable[..., Tuple[dict, int]]
+    :param output_path: Output JSONL file (one record per line).
+    :type output_path: str
+    :param id_field: Record field holding the ID of its job.
+    :type id_field: str
+    :param workers: Number of jobs run concurrently.
+    :type workers: int
+    :param resume: If True, the records already in the output file are kept; otherwise, it is overwritten.
+    :type resume: bool
+    :param desc: Description of the progress bar.
+    :type desc: str
+    :param verbose: If True, shows a progress bar.
+    :type verbose: bool
+    :return: The throughput of this run (number of dialogues and turns, wall time, dialogues and turns per second
+             and LLM calls and tokens).
+    :rtype: dict
+    """
+    done = set()
+    if resume and os.path.exists(output_path):
+        records = read_jsonl(output_path)
+        done = {str(record[id_field]) for record in records}
+        _write_jsonl(output_path, records)  # drops any partial line left by an interrupted run
+    elif os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    todo = [job for job in jobs if str(job[0]) not in done]
+    writer_lock = threading.Lock()
+
+    def run(job: tuple) -> int:
+        record, n_turns = generate(*job)
+        line = json.dumps(record)
+        with writer_lock:
+            writer.write(line + "\n")
+            writer.flush()
+        return n_turns
+
+    n_turns = 0
+    start = perf_counter()
+    with profiling.profile() as recorder, open(output_path, "a" if resume else "w") as writer:
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="sdialog-jobs") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, run, job) for job in todo]
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc,
+                               disable=not verbose, leave=False):
+                n_turns += future.result()
+    wall = perf_counter() - start
+
+    llm_stats = recorder.stats()["kinds"].get("llm", {})
+    return {"dialogs": len(todo),
+            "turns": n_turns,
+            "wall_s": wall,
+            "dialogs_per_s": len(todo) / wall if wall else 0.0,
+            "turns_per_s": n_turns / wall if wall else 0.0,
+            "llm_calls": llm_stats.get("calls", 0),
+            "prompt_tokens": llm_stats.get("prompt_tokens", 0),
+            "completion_tokens": llm_stats.get("completion_tokens", 0)}
+
+
+def read_jsonl(path: str) -> List[dict]:
+    """
+    Reads the records of a JSONL file (incomplete lines, e.g. of an interrupted run, are ignored).
+
+    :param path: The JSONL file.
+    :type path: str
+    :return: The records.
+    :rtype: List[dict]
+    """
+    records = []
+    with open(path) as reader:
+        for line in reader:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _write_jsonl(path: str, records: List[dict]):
+    """
+    Atomically rewrites a JSONL file with the given records.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as writer:
+        for record in records:
+            writer.write(json.dumps(record) + "\n")
+    os.replace(tmp_path, path)
+
+
+def read_replay(path: str) -> List[dict]:
+    """
+    Reads a replay corpus written by :func:`replay` (incomplete lines, e.g. of an interrupted run, are ignored).
+
+    :param path: The replay JSONL file.
+    :type path: str
+    :return: The ``{"id", "seed", "reference", "synthetic"}`` pairs, with the dialogues as
+             :class:`~sdialog.Dialog` objects.
+    :rtype: List[dict]
+    """
+    pairs = read_jsonl(path)
+    for pair in pairs:
+        pair["reference"] = Dialog.from_dict(pair["reference"])
+        pair["synthetic"] = Dialog.from_dict(pair["synthetic"])
+    return pairs
+
+
+def get_distribution(values: List[float]) -> dict:
+    """
+    Summarizes a distribution of values.
+
+    :param values: The values.
+    :type values: List[float]
+    :return: Their mean and 10th, 50th and 90th percentiles (``mean``, ``p10``, ``p50`` and ``p90``).
+    :rtype: dict
+    """
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return {"mean": 0.0, "p10": 0.0, "p50": 0.0, "p90": 0.0}
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {"mean": float(values.mean()), "p10": float(p10), "p50": float(p50), "p90": float(p90)}
+
+
+def _get_delta(synthetic: dict, reference: dict) -> dict:
+    return {key: synthetic[key] - reference[key] for key in reference}
+
+
+def get_replay_stats(pairs: List[dict]) -> dict:
+    """
+    Compares the synthetic dialogues of a replay corpus with their reference dialogues.
+
+    :param pairs: The replay pairs (see :func:`read_replay`).
+    :type pairs: List[dict]
+    :return: Number of pairs (``n``), distributions (mean, 10th, 50th and 90th percentiles) of the number of
+             turns per dialogue (``turns``) and of words per turn (``turn_length``) of both sides with their
+             deltas (synthetic minus reference), the mean absolute turn-count difference per pair
+             (``turns_mae``) and the distance between the turn-length distributions (``turn_length_w1``, the
+             1-Wasserstein distance, in words).
+    :rtype: dict
+    """
+    def turn_lengths(dialog: Dialog) -> List[int]:
+        return [len(turn.text.split()) for turn in dialog.turns]
+
+    reference_turns = [len(pair["reference"]) for pair in pairs]
+    synthetic_turns = [len(pair["synthetic"]) for pair in pairs]
+    reference_lengths = [length for pair in pairs for length in turn_lengths(pair["reference"])]
+    synthetic_lengths = [length for pair in pairs for length in turn_lengths(pair["synthetic"])]
+
+    stats = {"n": len(pairs)}
+    for name, reference, synthetic in [("turns", reference_turns, synthetic_turns),
+                                       ("turn_length", reference_lengths, synthetic_lengths)]:
+        stats[name] = {"reference": get_distribution(reference), "synthetic": get_distribution(synthetic)}
+        stats[name]["delta"] = _get_delta(stats[name]["synthetic"], stats[name]["reference"])
+    stats["turns_mae"] = float(np.mean(np.abs(np.subtract(synthetic_turns, reference_turns)))) if pairs else 0.0
+    if reference_lengths and synthetic_lengths:
+        quantiles = np.linspace(0, 100, 101)
+        stats["turn_length_w1"] = float(np.mean(np.abs(np.percentile(synthetic_lengths, quantiles)
+                                                       - np.percentile(reference_lengths, quantiles))))
+    else:
+        stats["turn_length_w1"] = 0.0
+    return stats
+
+
+def print_stats(stats: dict):
+    """
+    Prints the stats of a replay corpus (see :func:`get_replay_stats`), and the throughput of the run if given.
+
+    :param stats: The replay stats.
+    :type stats: dict
+    """
+    print(f"{stats['n']} replayed dialogues")
+    if "throughput" in stats:
+        throughput = stats["throughput"]
+        print(f"throughput: {throughput['dialogs']} dialogues in {throughput['wall_s']:.2f}s "
+              f"({throughput['dialogs_per_s']:.2f} dialogues/s, {throughput['turns_per_s']:.1f} turns/s, "
+              f"{throughput['llm_calls']} LLM calls)")
+    for name in ["turns", "turn_length"]:
+        print(f"{name:<12} {'mean':>8} {'p10':>8} {'p50':>8} {'p90':>8}")
+        for side in ["reference", "synthetic", "delta"]:
+            values = stats[name][side]
+            print(f"  {side:<10} {values['mean']:>8.2f} {values['p10']:>8.2f} {values['p50']:>8.2f} "
+                  f"{values['p90']:>8.2f}")
+    print(f"turns MAE: {stats['turns_mae']:.2f}, turn length W1: {stats['turn_length_w1']:.2f}")
+
+
+def main(argv: List[str] = None):
+    """
+    Command line interface to replay STAR dialogues and compare replay corpora.
+    """
+    parser = argparse.ArgumentParser(prog="python -m sdialog.replay",
+                                     description="Reference-vs-synthetic STAR dialogue replay.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Replay STAR dialogues.")
+    run_parser.add_argument("--star", help="Path to the STAR dataset (with --mock, a synthetic one by default).")
+    run_parser.add_argument("--ids", nargs="+", type=int, help="IDs of the dialogues to replay.")
+    run_parser.add_argument("--n", type=int, help="Replay (at most) the first N matching dialogues.")
+    run_parser.add_argument("--domain", help="Replay only the dialogues of this domain.")
+    run_parser.add_argument("--task", help="Replay only the dialogues of this task.")
+    run_parser.add_argument("--happy", action="store_true", default=None, help="Replay only happy path dialogues.")
+    run_parser.add_argument("--model", help="Model name (Ollama or Hugging Face).")
+    run_parser.add_argument("--mock", action="store_true",
+                            help="Use the mock LLM and offline encoder of sdialog.benchmark (perf benchmark).")
+    run_parser.add_argument("--latency", type=float, default=0.0, help="Mock LLM first-token latency (seconds).")
+    run_parser.add_argument("--token-rate", type=float, help="Mock LLM tokens per second.")
+    run_parser.add_argument("--flow-graph", action="store_true", help="Use FlowGraphOrchestrator for the system.")
+    run_parser.add_argument("--output", "-o", required=True, help="Output replay corpus (JSONL).")
+    run_parser.add_argument("--workers", type=int, default=4, help="Dialogues generated concurrently.")
+    run_parser.add_argument("--max-turns", type=int, default=20, help="Maximum turns per agent.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--no-resume", action="store_true", help="Overwrite the output file.")
+    run_parser.add_argument("--stats", help="Write the replay stats to this JSON file.")
+    stats_parser = subparsers.add_parser("stats", help="Compare the dialogues of a replay corpus.")
+    stats_parser.add_argument("replay", help="Replay corpus (JSONL).")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print_stats(get_replay_stats(read_replay(args.replay)))
+        return 0
+
+    if not args.mock and not (args.model and args.star):
+        parser.error("--model and --star are required (unless --mock is given)")
+
+    agent_kwargs = {"orchestration": True, "set_first_utterance": True, "flow_graph": args.flow_graph}
+    model = args.model
+    star_path = args.star
+    if args.mock:
+        from .benchmark import MockChatModel, HashingEncoder, ENCODER_NAME, make_synthetic_star
+        from .embeddings import register_sentence_encoder
+
+        register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+        agent_kwargs["sbert_model"] = ENCODER_NAME
+        model = MockChatModel(latency=args.latency, token_rate=args.token_rate, seed=args.seed)
+        if not star_path:
+            star_path = make_synthetic_star(os.path.join(tempfile.mkdtemp(prefix="sdialog-replay-"), "star"),
+                                            n_dialogs=max(args.n or 100, 1), seed=args.seed)
+
+    STAR.set_path(star_path)
+    ids = args.ids or STAR.get_dialog_ids(domain=args.domain, task_name=args.task, happy=args.happy)
+    ids = ids[:args.n] if args.n else ids
+    stats = replay(STAR.get_dataset(), ids, model, args.output, workers=args.workers,
+                   max_iterations=args.max_turns, seed=args.seed, resume=not args.no_resume, **agent_kwargs)
+    print_stats(stats)
+    if args.stats:
+        with open(args.stats, "w") as writer:
+            json.dump(stats, writer, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
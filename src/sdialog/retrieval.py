@@ -0,0 +1,292 @@
+"""
+retrieval: Retrieval of Reference Dialogues for Few-Shot Prompting
+
+This module provides a local vector index over reference dialogues (e.g. STAR dialogues), with dialogue-level and
+turn-level embeddings computed with the same sentence encoders used by the orchestrators (see
+:mod:`sdialog.embeddings`). Indexes are built once, persisted to disk as float16 tables and loaded as read-only
+memory maps, so that the most similar dialogues of a large corpus are found in milliseconds. A prompt builder
+injects the retrieved dialogues as few-shot examples within a token budget (e.g. in the ``dialogue_details`` of a
+``DialogGenerator`` or ``PersonaAgent``).
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import os
+import json
+import shutil
+import numpy as np
+
+from tqdm.auto import tqdm
+from typing import Iterable, List, Tuple, Union
+
+from . import Dialog, profiling
+from .util import count_tokens
+from .embeddings import get_sentence_encoder
+from .similarity import get_similarity_index, top_k
+
+DEFAULT_MODEL = "sergioburdisso/dialog2flow-joint-bert-base"  # same default as the response orchestrators
+
+
+class DialogIndex:
+    """
+    Persistent vector index over a corpus of reference dialogues.
+
+    Each turn is embedded with the sentence encoder and each dialogue is embedded as the (normalized) mean of its
+    turn embeddings. Dialogues can be retrieved by their own embedding (``level="dialog"``) or by their most
+    similar turn (``level="turn"``, e.g. to find dialogues containing a given utterance).
+
+    Example:
+
+        .. code-block:: python
+
+            from sdialog.datasets import STAR
+            from sdialog.retrieval import DialogIndex
+            from sdialog.generators import DialogGenerator
+
+            STAR.set_path("STAR/")
+            index = DialogIndex.build(STAR.iter_dialogs(workers=8), "star-index/")  # only once
+
+            index = DialogIndex("star-index/")
+            examples = index.get_few_shot_prompt("I want to check my bank balance",
+                                                 ids=STAR.get_dialog_ids(task_name="bank_balance"),
+                                                 max_tokens=1500)
+            generator = DialogGenerator("qwen2.5:14b", "A dialogue about a bank balance.\\n\\n" + examples)
+
+    :param path: Directory of the index (see :meth:`build`).
+    :type path: str
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "config.json")) as reader:
+            self.config = json.load(reader)
+        with open(os.path.join(path, "ids.json")) as reader:
+            self.ids = json.load(reader)
+        self.model = self.config["model"]
+        self.dialog_embs = np.load(os.path.join(path, "dialog_embs.npy"), mmap_mode="r")
+        self.turn_embs = np.load(os.path.join(path, "turn_embs.npy"), mmap_mode="r")
+        self.turn_dialogs = np.load(os.path.join(path, "turn_dialogs.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self._id_ixs = {str(dialog_id): ix for ix, dialog_id in enumerate(self.ids)}
+        self._dialog_index = get_similarity_index(self.dialog_embs) if len(self.ids) else None
+        self._turn_index = get_similarity_index(self.turn_embs) if len(self.turn_embs) else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def build(dialogs: Iterable[Dialog], path: str, model: str = DEFAULT_MODEL, batch_size: int = 64,
+              verbose: bool = True) -> "DialogIndex":
+        """
+        Builds the index of a corpus of dialogues and saves it to disk (atomically replacing any previous index).
+
+        :param dialogs: The dialogues (e.g. ``STAR.iter_dialogs(workers=8)``), read lazily.
+        :type dialogs: Iterable[Dialog]
+        :param path: Output directory.
+        :type path: str
+        :param model: Name of the sentence encoder (sentence-transformers model or registered encoder).
+        :type model: str
+        :param batch_size: Number of dialogues encoded at once.
+        :type batch_size: int
+        :param verbose: If True, shows a progress bar.
+        :type verbose: bool
+        :return: The built index.
+        :rtype: DialogIndex
+        """
+        encoder = get_sentence_encoder(model)
+        tmp_path = f"{os.path.normpath(path)}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        ids, dialog_embs, turn_embs, turn_dialogs, offsets = [], [], [], [], []
+
+        def encode_batch(batch: List[Dialog]):
+            texts = [turn.text for dialog in batch for turn in dialog.turns]
+            if not texts:
+                embs = np.zeros((0, encoder.get_dimension()), dtype=np.float32)
+            else:
+                # (not through the shared embedding cache, corpus turns would evict the orchestrators' embeddings)
+                with profiling.span("encode", model):
+                    embs = np.asarray(encoder.encoder.encode(texts), dtype=np.float32)
+                embs /= np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12
+            start = 0
+            for dialog in batch:
+                dialog_turn_embs = embs[start:start + len(dialog.turns)]
+                start += len(dialog.turns)
+                mean = dialog_turn_embs.mean(axis=0) if len(dialog_turn_embs) else np.zeros(embs.shape[1])
+                dialog_embs.append((mean / (np.linalg.norm(mean) + 1e-12)).astype(np.float16))
+                turn_embs.append(dialog_turn_embs.astype(np.float16))
+                turn_dialogs.extend([len(ids)] * len(dialog.turns))
+                ids.append(dialog.dialogId if dialog.dialogId is not None else len(ids))
+
+        try:
+            with open(os.path.join(tmp_path, "dialogs.jsonl"), "w") as writer:
+                batch = []
+                for dialog in tqdm(dialogs, desc="Indexing dialogs", disable=not verbose, leave=False):
+                    offsets.append(writer.tell())
+                    writer.write(dialog.json(string=True) + "\n")
+                    batch.append(dialog)
+                    if len(batch) >= batch_size:
+                        encode_batch(batch)
+                        batch = []
+                if batch:
+                    encode_batch(batch)
+
+            dimension = encoder.get_dimension() if ids else 0
+            turn_embs = [embs for embs in turn_embs if len(embs)]
+            np.save(os.path.join(tmp_path, "dialog_embs.npy"),
+                    np.stack(dialog_embs) if dialog_embs else np.zeros((0, dimension), dtype=np.float16))
+            np.save(os.path.join(tmp_path, "turn_embs.npy"),
+                    np.concatenate(turn_embs) if turn_embs else np.zeros((0, dimension), dtype=np.float16))
+            np.save(os.path.join(tmp_path, "turn_dialogs.npy"), np.asarray(turn_dialogs, dtype=np.int32))
+            np.save(os.path.join(tmp_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+            with open(os.path.join(tmp_path, "ids.json"), "w") as writer:
+                json.dump(ids, writer)
+            with open(os.path.join(tmp_path, "config.json"), "w") as writer:
+                json.dump({"model": model, "dimension": dimension,
+                           "n_dialogs": len(ids), "n_turns": len(turn_dialogs)}, writer)
+
+            if os.path.exists(path):
+                old_path = f"{tmp_path}.old"
+                os.replace(path, old_path)
+                os.replace(tmp_path, path)
+                shutil.rmtree(old_path)
+            else:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                shutil.rmtree(tmp_path)  # no partial index is left behind on failure
+        return DialogIndex(path)
+
+    def get_dialog(self, id) -> Dialog:
+        """
+        Reads an indexed dialogue by ID.
+
+        :param id: Dialogue ID.
+        :return: The dialogue.
+        :rtype: Dialog
+        """
+        with open(os.path.join(self.path, "dialogs.jsonl")) as reader:
+            reader.seek(int(self.offsets[self._id_ixs[str(id)]]))
+            return Dialog.from_dict(json.loads(reader.readline()))
+
+    def _encode_query(self, query: Union[str, Dialog]) -> np.ndarray:
+        encoder = get_sentence_encoder(self.model)
+        if isinstance(query, Dialog):
+            if not query.turns:
+                raise ValueError("Dialogue queries must have at least one turn (or use a text query instead)")
+            embs = encoder.encode([turn.text for turn in query.turns])
+            embs = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12)
+            return embs.mean(axis=0)
+        return encoder.encode(query)
+
+    def search(self, query: Union[str, Dialog], k: int = 5, level: str = "dialog", ids: list = None,
+               exclude_ids: list = None) -> List[Tuple[Union[int, str], float]]:
+        """
+        Returns the (up to) `k` dialogues most similar to the query.
+
+        :param query: The query: a text (e.g. an utterance or a scenario description) or a dialogue (with at least
+                      one turn).
+        :type query: Union[str, Dialog]
+        :param k: Number of dialogues to return.
+        :type k: int
+        :param level: "dialog" to compare the query with the dialogue embeddings, or "turn" to score each dialogue
+                      by its most similar turn.
+        :type level: str
+        :param ids: If given, only these dialogues are considered (e.g. the dialogues with the same tasks).
+        :type ids: list
+        :param exclude_ids: Dialogues not to return (e.g. the dialogue being generated).
+        :type exclude_ids: list
+        :return: The (ID, similarity) of the most similar dialogues, in descending order.
+        :rtype: List[Tuple[Union[int, str], float]]
+        """
+        if level not in ["dialog", "turn"]:
+            raise ValueError(f"Unknown level '{level}' (valid levels: dialog, turn)")
+        if not len(self.ids):
+            return []
+        query = self._encode_query(query)
+
+        if level == "dialog":
+            scores = self._dialog_index.scores(query)
+        else:
+            scores = np.full(len(self.ids), -np.inf, dtype=np.float32)
+            if self._turn_index is not None:
+                np.maximum.at(scores, self.turn_dialogs, self._turn_index.scores(query))
+
+        candidates = np.arange(len(self.ids))
+        if ids is not None:
+            candidates = np.asarray(sorted({self._id_ixs[str(id)] for id in ids if str(id) in self._id_ixs}),
+                                    dtype=np.int64)
+        if exclude_ids:
+            excluded = {self._id_ixs.get(str(id)) for id in exclude_ids}
+            candidates = np.asarray([ix for ix in candidates if ix not in excluded], dtype=np.int64)
+        if not len(candidates):
+            return []
+
+        top = top_k(scores[candidates], k)
+        return [(self.ids[candidates[ix]], float(scores[candidates[ix]])) for ix in top]
+
+    def get_few_shot_prompt(self, query: Union[str, Dialog], k: int = 3, max_tokens: int = 1024,
+                            tokenizer=None, **search_kwargs) -> str:
+        """
+        Retrieves the dialogues most similar to the query and formats them as few-shot examples within a token
+        budget (see :func:`build_few_shot_prompt`).
+
+        :param query: The query: a text or a dialogue.
+        :type query: Union[str, Dialog]
+        :param k: Maximum number of examples.
+        :type k: int
+        :param max_tokens: Token budget of the examples.
+        :type max_tokens: int
+        :param tokenizer: Tokenizer used to count tokens (see :func:`sdialog.util.count_tokens`).
+        :type tokenizer: Any
+        :param search_kwargs: Additional arguments for :meth:`search` (e.g. `level`, `ids` or `exclude_ids`).
+        :return: The few-shot examples prompt.
+        :rtype: str
+        """
+        dialogs = [self.get_dialog(dialog_id) for dialog_id, _ in self.search(query, k=k, **search_kwargs)]
+        return build_few_shot_prompt(dialogs, max_tokens=max_tokens, tokenizer=tokenizer)
+
+
+def build_few_shot_prompt(dialogs: List[Dialog], max_tokens: int = 1024, tokenizer=None,
+                          header: str = "The following are examples of real dialogues similar to the one to "
+                                        "generate:",
+                          turn_template: str = "{speaker}: {text}") -> str:
+    """
+    Formats dialogues as few-shot examples, adding them (in order) while they fit in the token budget; the first
+    example that does not fit is truncated to the turns that fit (if any).
+
+    :param dialogs: The example dialogues (e.g. the most similar first).
+    :type dialogs: List[Dialog]
+    :param max_tokens: Token budget of the prompt (header included).
+    :type max_tokens: int
+    :param tokenizer: Tokenizer used to count tokens (see :func:`sdialog.util.count_tokens`).
+    :type tokenizer: Any
+    :param header: Text introducing the examples.
+    :type header: str
+    :param turn_template: Template for formatting each turn.
+    :type turn_template: str
+    :return: The few-shot examples prompt (empty if no example fits).
+    :rtype: str
+    """
+    prompt = header
+    n_tokens = count_tokens(header, tokenizer)
+    n_examples = 0
+    for dialog in dialogs:
+        example_header = f"\n\n## Example {n_examples + 1}\n"
+        n_example_tokens = count_tokens(example_header, tokenizer)
+        turns = []
+        for turn in dialog.turns:
+            line = turn_template.format(speaker=turn.speaker, text=turn.text.replace("\n", " "))
+            n_line_tokens = count_tokens(line + "\n", tokenizer)
+            if n_tokens + n_example_tokens + n_line_tokens > max_tokens:
+                break
+            turns.append(line)
+            n_example_tokens += n_line_tokens
+        if turns:
+            prompt += example_header + "\n".join(turns)
+            n_tokens += n_example_tokens
+            n_examples += 1
+        if len(turns) < len(dialog.turns):
+            break
+    return prompt if n_examples else ""
@@ -0,0 +1,201 @@
+"""
+similarity: Similarity Search Backends for sdialog
+
+This module provides pluggable (cosine) similarity search backends over embedding tables, used for instance by
+orchestrators to find the most similar responses. Embeddings are precomputed as L2-normalized float32, float16 or
+int8 matrices, and top-k results are obtained with ``argpartition`` (no full sort). An approximate inverted-file
+(IVF) index is also provided for very large tables (e.g. merged multi-domain action sets).
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+
+class BaseSimilarityIndex(ABC):
+    """
+    Base class for cosine similarity search indexes over an embedding table.
+
+    :param embs: The embedding table (one row per item).
+    :type embs: np.ndarray
+    :param dtype: Data type used to store the normalized embeddings: "float32", "float16" or "int8" (row-wise
+                  quantized). If not given, the data type of `embs` is kept (if float16 or float32).
+    :type dtype: str
+    """
+    CHUNK_SIZE = 256  # rows scored at once (low precision rows are up-casted chunk by chunk)
+
+    def __init__(self, embs: np.ndarray, dtype: str = None):
+        if dtype is None:
+            dtype = "float16" if embs.dtype == np.float16 else "float32"
+        if dtype not in ["float32", "float16", "int8"]:
+            raise ValueError(f"Unsupported index dtype '{dtype}' (valid dtypes: float32, float16, int8)")
+        self.dtype = dtype
+        self.scales = None
+
+        if dtype != "int8" and embs.dtype == np.dtype(dtype) and self._is_normalized(embs):
+            self.embs = embs  # already normalized (e.g. memory-mapped from an embedding store), zero-copy
+        else:
+            embs = np.asarray(embs, dtype=np.float32)
+            embs = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12)
+            if dtype == "int8":
+                self.scales = np.abs(embs).max(axis=1) / 127 + 1e-12
+                self.embs = np.round(embs / self.scales[:, None]).astype(np.int8)
+                self.scales = self.scales.astype(np.float32)
+            else:
+                self.embs = embs.astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(self.embs)
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the indexes and similarity scores of the (up to) `k` most similar items, in descending order.
+
+        :param query: The query embedding.
+        :type query: np.ndarray
+        :param k: Number of items to return.
+        :type k: int
+        :return: Indexes and scores of the top-k items.
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        pass
+
+    def scores(self, query: np.ndarray, ixs: np.ndarray = None) -> np.ndarray:
+        """
+        Returns the cosine similarity between the query and all the items (or only the items in `ixs`).
+
+        :rtype: np.ndarray
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / (np.linalg.norm(query) + 1e-12)
+        embs = self.embs if ixs is None else self.embs[ixs]
+        scales = self.scales if ixs is None or self.scales is None else self.scales[ixs]
+
+        if self.dtype == "float32":
+            return embs @ query
+
+        scores = np.empty(len(embs), dtype=np.float32)
+        for start in range(0, len(embs), self.CHUNK_SIZE):
+            end = start + self.CHUNK_SIZE
+            scores[start:end] = embs[start:end].astype(np.float32) @ query
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    def _is_normalized(self, embs: np.ndarray) -> bool:
+        """
+        Checks whether all the rows of the embedding table are (approximately) L2-normalized.
+        """
+        for start in range(0, len(embs), self.CHUNK_SIZE):
+            norms = np.linalg.norm(embs[start:start + self.CHUNK_SIZE].astype(np.float32), axis=1)
+            if not np.allclose(norms, 1, atol=1e-2):
+                return False
+        return True
+
+
+class ExactIndex(BaseSimilarityIndex):
+    """
+    Exact (brute-force) cosine similarity search, with ``argpartition`` top-k selection.
+    """
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(query)
+        ixs = top_k(scores, k)
+        return ixs, scores[ixs]
+
+
+class IVFIndex(BaseSimilarityIndex):
+    """
+    Approximate cosine similarity search with an inverted-file index: items are clustered with (spherical) k-means
+    and only the items in the `n_probe` clusters closest to the query are scored.
+
+    :param embs: The embedding table (one row per item).
+    :type embs: np.ndarray
+    :param dtype: Data type used to store the normalized embeddings (see :class:`BaseSimilarityIndex`).
+    :type dtype: str
+    :param n_lists: Number of clusters (by default, the square root of the number of items).
+    :type n_lists: int
+    :param n_probe: Number of clusters scored for each query (the higher, the better the recall).
+    :type n_probe: int
+    :param n_iter: Number of k-means iterations.
+    :type n_iter: int
+    :param seed: Random seed for the k-means initialization.
+    :type seed: int
+    """
+    def __init__(self, embs: np.ndarray, dtype: str = None, n_lists: int = None, n_probe: int = 8,
+                 n_iter: int = 10, seed: int = 0):
+        super().__init__(embs, dtype=dtype)
+        self.n_lists = min(n_lists or max(int(np.sqrt(len(self.embs))), 1), len(self.embs))
+        self.n_probe = n_probe
+
+        rng = np.random.default_rng(seed)
+        sample = self.embs[rng.choice(len(self.embs), min(len(self.embs), self.n_lists * 64), replace=False)]
+        sample = sample.astype(np.float32)
+        if self.scales is not None:
+            sample /= np.linalg.norm(sample, axis=1, keepdims=True) + 1e-12
+        self.centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignment = np.argmax(sample @ self.centroids.T, axis=1)
+            for ix in range(self.n_lists):
+                members = sample[assignment == ix]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    self.centroids[ix] = centroid / (np.linalg.norm(centroid) + 1e-12)
+
+        assignment = np.empty(len(self.embs), dtype=np.int64)
+        for start in range(0, len(self.embs), self.CHUNK_SIZE):
+            chunk = self.embs[start:start + self.CHUNK_SIZE].astype(np.float32)
+            assignment[start:start + self.CHUNK_SIZE] = np.argmax(chunk @ self.centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(self.n_lists + 1))
+        self.lists = [order[bounds[ix]:bounds[ix + 1]] for ix in range(self.n_lists)]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query = np.asarray(query, dtype=np.float32).ravel()
+        probe = top_k(self.centroids @ query, self.n_probe)
+        candidates = np.sort(np.concatenate([self.lists[ix] for ix in probe]))
+        scores = self.scores(query, candidates)
+        ixs = top_k(scores, k)
+        return candidates[ixs], scores[ixs]
+
+
+def get_similarity_index(embs: np.ndarray, index: str = "exact", dtype: str = None, **kwargs) -> BaseSimilarityIndex:
+    """
+    Builds a similarity index over an embedding table.
+
+    :param embs: The embedding table (one row per item).
+    :type embs: np.ndarray
+    :param index: Type of index: "exact" or "ivf" (approximate).
+    :type index: str
+    :param dtype: Data type used to store the normalized embeddings ("float32", "float16" or "int8").
+    :type dtype: str
+    :param kwargs: Additional arguments for the index (e.g. `n_lists` and `n_probe` for "ivf").
+    :return: The similarity index.
+    :rtype: BaseSimilarityIndex
+    """
+    if index == "exact":
+        return ExactIndex(embs, dtype=dtype)
+    elif index == "ivf":
+        return IVFIndex(embs, dtype=dtype, **kwargs)
+    raise ValueError(f"Unknown similarity index '{index}' (valid indexes: exact, ivf)")
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the indexes of the top-k scores (descending order) using ``argpartition``.
+
+    :param scores: The scores.
+    :type scores: np.ndarray
+    :param k: Number of indexes to return.
+    :type k: int
+    :return: Indexes of the `k` highest scores (all of them if there are fewer than `k`).
+    :rtype: np.ndarray
+    """
+    if k < len(scores):
+        ixs = np.argpartition(-scores, k - 1)[:k]
+    else:
+        ixs = np.arange(len(scores))
+    return ixs[np.argsort(-scores[ixs], kind="stable")]
@@ -2,11 +2,12 @@
 util: Utility Functions for sdialog
 
 This module provides helper functions for the sdialog package, including serialization utilities to ensure
-objects can be safely converted to JSON for storage or transmission.
+objects can be safely converted to JSON for storage or transmission, and prompt size estimation.
 """
 # SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
 # SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
 # SPDX-License-Identifier: MIT
+import re
 import json
 
 
@@ -30,3 +31,27 @@ def make_serializable(data: dict) -> dict:
             data[key] = str(value)
 
     return data
+
+
+def count_tokens(text: str, tokenizer=None) -> int:
+    """
+    Counts the number of tokens of a text (e.g. to estimate prompt sizes).
+
+    :param text: The text.
+    :type text: str
+    :param tokenizer: Tokenizer to use: an object with an ``encode()`` method (e.g. a Hugging Face tokenizer, whose
+                      special tokens are not counted) or a function returning the list of tokens. If not given,
+                      tokens are approximated as words and punctuation marks.
+    :type tokenizer: Any
+    :return: Number of tokens.
+    :rtype: int
+    """
+    if tokenizer is None:
+        return len(re.findall(r"\w+|[^\w\s]", text))
+    if hasattr(tokenizer, "encode"):
+        try:
+            # the text is part of a prompt, so special tokens (e.g. BOS) are not counted
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        except TypeError:  # tokenizers without special tokens (e.g. tiktoken)
+            return len(tokenizer.encode(text))
+    return len(tokenizer(text))
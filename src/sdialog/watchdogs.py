@@ -0,0 +1,169 @@
+"""
+watchdogs: Online Degeneration Detection for sdialog
+
+This module provides watchdogs that monitor a dialogue while it is being generated and intervene when it degenerates
+(e.g. repetitive goodbye loops, agents echoing each other or near-empty turns), either by ending the dialogue early,
+injecting a corrective instruction, or marking the dialogue to be discarded.
+"""
+# SPDX-FileCopyrightText: Copyright © 2025 Idiap Research Institute <contact@idiap.ch>
+# SPDX-FileContributor: Sergio Burdisso <sergio.burdisso@idiap.ch>
+# SPDX-License-Identifier: MIT
+import re
+import numpy as np
+
+from time import time
+from collections import deque
+from typing import List, Optional
+
+from . import Turn, Event
+
+
+class DegenerationWatchdog:
+    """
+    Watchdog that incrementally tracks the similarity between recent turns to detect degenerated dialogues.
+
+    A turn is flagged when it is near-empty, when it is too similar to one of the recent turns (repetition or echo),
+    or when the two speakers keep repeating their previous turns (ping-pong). When `patience` consecutive turns are
+    flagged, the watchdog takes its `action`:
+
+    - ``"stop"``: the dialogue is ended early.
+    - ``"instruct"``: a corrective instruction is given to the next speaker (after `max_interventions`
+      interventions, the dialogue is ended).
+    - ``"discard"``: the dialogue is ended early and marked to be discarded (``Dialog.discard``).
+
+    Decisions are returned as events (``"watchdog-stop"``, ``"watchdog-instruct"`` and ``"watchdog-discard"``
+    actions, labeled with the detected problem) including the number of turns that were saved.
+
+    :param action: Action to take on degeneration ("stop", "instruct" or "discard").
+    :type action: str
+    :param ngram: Size of the word n-grams used to compare turns.
+    :type ngram: int
+    :param window: Number of recent turns each new turn is compared to.
+    :type window: int
+    :param threshold: Similarity threshold (n-gram Jaccard similarity, or cosine similarity if `encoder` is given)
+                      above which two turns are considered repetitions.
+    :type threshold: float
+    :param min_words: Turns with fewer words than this are considered near-empty.
+    :type min_words: int
+    :param patience: Number of consecutive flagged turns needed to take action.
+    :type patience: int
+    :param instruction: Corrective instruction used by the "instruct" action.
+    :type instruction: str
+    :param max_interventions: Maximum number of corrective instructions before ending the dialogue.
+    :type max_interventions: int
+    :param encoder: Optional sentence encoder (with an ``encode(text)`` method) to compare turns by embedding
+                    similarity instead of n-gram overlap.
+    """
+
+    def __init__(self,
+                 action: str = "stop",
+                 ngram: int = 2,
+                 window: int = 4,
+                 threshold: float = 0.7,
+                 min_words: int = 1,
+                 patience: int = 2,
+                 instruction: str = "The conversation is getting repetitive. Do NOT repeat what was already said, "
+                                    "move the conversation forward or finish it.",
+                 max_interventions: int = 1,
+                 encoder=None):
+        if action not in ["stop", "instruct", "discard"]:
+            raise ValueError(f"Unknown watchdog action '{action}' (valid actions: stop, instruct, discard)")
+        self.action = action
+        self.ngram = ngram
+        self.window = window
+        self.threshold = threshold
+        self.min_words = min_words
+        self.patience = patience
+        self.instruction = instruction
+        self.max_interventions = max_interventions
+        self.encoder = encoder
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the watchdog state (to be called before each new dialogue).
+        """
+        self._history = deque(maxlen=max(self.window, 3))
+        self._n_seen = 0
+        self._streak = 0
+        self._n_interventions = 0
+        self._last_pingpong_sim = 0
+
+    def __call__(self, dialog: List[Turn], next_agent=None, max_turns: int = None) -> Optional[Event]:
+        """
+        Processes the new turns of the dialogue and takes action if it has degenerated.
+
+        :param dialog: The dialogue so far (only the turns not seen before are processed).
+        :type dialog: List[Turn]
+        :param next_agent: The agent speaking next (target of the corrective instructions).
+        :type next_agent: PersonaAgent
+        :param max_turns: Maximum number of turns of the dialogue (used to report the number of saved turns).
+        :type max_turns: int
+        :return: The event describing the decision taken, or None if no action was taken.
+        :rtype: Optional[Event]
+        """
+        reason = None
+        while self._n_seen < len(dialog):
+            turn = dialog[self._n_seen]
+            self._n_seen += 1
+            reason = self._update(turn)
+
+        if reason is None or self._streak < self.patience:
+            return None
+
+        self._streak = 0
+        turn = dialog[-1]
+        saved = f"{max_turns - len(dialog)} turns" if max_turns else "remaining turns"
+        if self.action == "instruct" and next_agent is not None and self._n_interventions < self.max_interventions:
+            self._n_interventions += 1
+            next_agent.instruct(self.instruction)
+            return Event(agent=turn.speaker,
+                         action="watchdog-instruct",
+                         actionLabel=reason,
+                         text=f"Degenerated dialogue ({reason}), corrective instruction given: {self.instruction}",
+                         timestamp=int(time()))
+
+        action = "discard" if self.action == "discard" else "stop"
+        return Event(agent=turn.speaker,
+                     action=f"watchdog-{action}",
+                     actionLabel=reason,
+                     text=f"Degenerated dialogue ({reason}), dialogue ended early "
+                          f"({'marked to be discarded, ' if action == 'discard' else ''}saved up to {saved})",
+                     timestamp=int(time()))
+
+    def _update(self, turn: Turn) -> Optional[str]:
+        """
+        Updates the watchdog state with a new turn and returns the detected problem (if any).
+        """
+        words = re.findall(r"\w+", turn.text.lower())
+        if self.encoder is not None:
+            feats = np.asarray(self.encoder.encode(turn.text), dtype=float).ravel()
+            feats /= np.linalg.norm(feats) or 1
+        else:
+            n = max(min(self.ngram, len(words)), 1)
+            feats = set(tuple(words[ix:ix + n]) for ix in range(len(words) - n + 1))
+
+        reason = None
+        sims = [self._similarity(feats, prev_feats) for prev_feats in self._history]
+        pingpong_sim = sims[-2] if len(sims) >= 2 else 0
+        if len(words) < self.min_words:
+            reason = "empty"
+        elif pingpong_sim >= self.threshold and self._last_pingpong_sim >= self.threshold:
+            reason = "ping-pong"
+        elif sims and max(sims[-self.window:]) >= self.threshold:
+            reason = "repetition"
+
+        self._last_pingpong_sim = pingpong_sim
+        self._history.append(feats)
+        self._streak = self._streak + 1 if reason else 0
+        return reason
+
+    def _similarity(self, feats_a, feats_b) -> float:
+        """
+        Returns the similarity between the features of two turns.
+        """
+        if self.encoder is not None:
+            return float(np.dot(feats_a, feats_b))
+        if not feats_a or not feats_b:
+            return 0
+        return len(feats_a & feats_b) / len(feats_a | feats_b)
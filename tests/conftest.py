@@ -0,0 +1,58 @@
+import time
+import pytest
+
+from langchain_core.messages import AIMessage
+
+from sdialog.datasets import STAR
+from sdialog.benchmark import make_synthetic_star
+
+
+class DummyLLM:
+    """
+    Offline chat model for the tests (see the ``dummy_llm`` fixture): always answers with the same text, after
+    an optional delay, reporting its token usage.
+    """
+    seed = 0
+    num_predict = None
+
+    def __init__(self, text: str = "Ok", delay: float = 0):
+        self.text = text
+        self.delay = delay
+
+    def invoke(self, memory):
+        if self.delay:
+            time.sleep(self.delay)
+        n_tokens = len(self.text.split())
+        return AIMessage(content=self.text,
+                         usage_metadata={"input_tokens": len(memory), "output_tokens": n_tokens,
+                                         "total_tokens": len(memory) + n_tokens})
+
+    def __str__(self):
+        return "dummy"
+
+
+@pytest.fixture
+def dummy_llm():
+    """
+    The :class:`DummyLLM` class (e.g. ``PersonaAgent(dummy_llm("Hi"), persona)``).
+    """
+    return DummyLLM
+
+
+@pytest.fixture
+def synthetic_star(tmp_path):
+    """
+    Factory of synthetic STAR datasets in ``tmp_path`` (see :func:`sdialog.benchmark.make_synthetic_star`), e.g.
+    ``synthetic_star(n_dialogs=10)``. By default, each new dataset is also set as the global ``STAR`` path, which
+    is restored on teardown.
+    """
+    state = STAR._path, STAR._index_path, STAR._dataset
+
+    def make(name: str = "star", set_path: bool = True, **kwargs) -> str:
+        path = make_synthetic_star(str(tmp_path / name), **kwargs)
+        if set_path:
+            STAR.set_path(path)
+        return path
+
+    yield make
+    STAR._path, STAR._index_path, STAR._dataset = state
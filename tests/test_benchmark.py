@@ -0,0 +1,63 @@
+import os
+import json
+import shutil
+
+from sdialog.benchmark import MockChatModel, HashingEncoder, run_benchmarks, compare_results, main
+from sdialog.personas import Persona, PersonaAgent
+
+
+def test_mock_chat_model():
+    llm = MockChatModel(response_tokens=5, stop_after=2)
+    alice = PersonaAgent(llm, Persona(name="Alice"), name="Alice")
+    bob = PersonaAgent(MockChatModel(response_tokens=5), Persona(name="Bob"), name="Bob")
+    dialog = alice.dialog_with(bob, max_iterations=10, seed=0)
+    assert alice.finished and not bob.finished  # Alice ended the dialogue in her second turn
+    assert len(dialog) == 4 and dialog.complete
+    assert len(dialog.turns[0].text.split()) == 5
+
+    chunks = list(llm.stream(alice.memory))
+    assert len(chunks) == 6 and chunks[-1].content == " STOP"
+    assert chunks[-1].usage_metadata["output_tokens"] == 6
+    assert llm.invoke(alice.memory).content == "".join(chunk.content for chunk in chunks)
+
+
+def test_hashing_encoder():
+    embs = HashingEncoder(dimension=32).encode(["the price is fine", "the price is fine", "hello"])
+    assert embs.shape == (3, 32)
+    assert embs[0] @ embs[1] > .99 > embs[0] @ embs[2]
+
+
+def test_run_and_compare_benchmarks(tmp_path):
+    results = run_benchmarks(n_dialogs=2, max_turns=3, names=["DialogGenerator", "FlowGraph"])
+    assert set(results["results"]) == {"DialogGenerator", "PersonaDialogGenerator",
+                                       "dialog_with+FlowGraphOrchestrator",
+                                       "STAR.get_agents_from_dialogue+FlowGraphOrchestrator"}
+    for result in results["results"].values():
+        assert result["dialogs_per_sec"] > 0 and result["overhead_ms_per_turn"] >= 0
+
+    slower = json.loads(json.dumps(results))
+    slower["results"]["DialogGenerator"]["dialogs_per_sec"] /= 2
+    regressions = compare_results(results, slower)
+    assert [(r["name"], r["metric"]) for r in regressions] == [("DialogGenerator", "dialogs_per_sec")]
+
+    with open(tmp_path / "base.json", "w") as writer:
+        json.dump(results, writer)
+    with open(tmp_path / "new.json", "w") as writer:
+        json.dump(slower, writer)
+    assert main(["compare", str(tmp_path / "base.json"), str(tmp_path / "new.json")]) == 1
+
+
+def test_benchmarks_star_dataset_ids(synthetic_star):
+    path = synthetic_star(set_path=False, n_dialogs=8, n_tasks=2)
+    shutil.rmtree(os.path.join(path, "tasks", "task_0"))
+    for fname in os.listdir(os.path.join(path, "dialogues")):
+        with open(os.path.join(path, "dialogues", fname)) as reader:
+            dialog = json.load(reader)
+        os.remove(os.path.join(path, "dialogues", fname))
+        if dialog["Scenario"]["WizardCapabilities"][0]["Task"] != "task_0":
+            with open(os.path.join(path, "dialogues", f"{int(fname[:-5]) * 10}.json"), "w") as writer:
+                json.dump(dialog, writer)  # non-contiguous IDs, without any "task_0" dialogue
+
+    results = run_benchmarks(n_dialogs=3, max_turns=3, names=["SimpleResponse"], star_path=path)
+    assert set(results["results"]) == {"dialog_with+SimpleResponseOrchestrator",
+                                       "STAR.get_agents_from_dialogue+SimpleResponseOrchestrator"}
@@ -0,0 +1,59 @@
+import json
+
+from sdialog.cli import main, load_config, read_dialogs, run_pipeline, generate_dialogs
+from sdialog.personas import Persona, PersonaAgent
+from sdialog.embeddings import register_sentence_encoder
+from sdialog.benchmark import MockChatModel, HashingEncoder, ENCODER_NAME
+
+
+def test_generate(tmp_path, capsys):
+    config = {"model": "mock",
+              "mock": {"stop_after": 4},
+              "agents": [{"name": "Alice", "persona": {"name": "Alice", "role": "customer"},
+                          "orchestrators": [{"type": "LengthOrchestrator", "min": 2}]},
+                         {"name": "Bob", "persona": {"name": "Bob", "role": "receptionist"}}],
+              "generation": {"n": 3, "workers": 2, "max_turns": 6, "profile": True},
+              "output": {"path": str(tmp_path / "dialogs.jsonl")}}
+    config_path = tmp_path / "pipeline.json"
+    config_path.write_text(json.dumps(config))
+    assert load_config(str(config_path)) == config
+
+    assert main(["generate", str(config_path), "--quiet"]) == 0
+    dialogs = read_dialogs(str(tmp_path / "dialogs.jsonl"))
+    assert sorted(d.dialogId for d in dialogs) == [1, 2, 3]
+    assert all(len(d) > 0 and d.stats for d in dialogs)
+
+    with open(tmp_path / "dialogs.jsonl", "a") as writer:
+        writer.write('{"dialogId": 4, "tur')  # interrupted run
+    assert main(["generate", str(config_path), "--quiet", "--n", "5"]) == 0
+    assert sorted(d.dialogId for d in read_dialogs(str(tmp_path / "dialogs.jsonl"))) == [1, 2, 3, 4, 5]
+
+    assert main(["stats", str(tmp_path / "dialogs.jsonl"), "-o", str(tmp_path / "stats.json")]) == 0
+    stats = json.loads((tmp_path / "stats.json").read_text())
+    assert stats["n"] == 5 and stats["profile"]["n"] == 5
+    assert "5 dialogues" in capsys.readouterr().out
+
+
+def test_generate_dialogs_deterministic(tmp_path):
+    llm = MockChatModel(latency=0.001, stop_after=5, stop_probability=.2)  # shared by both agents
+    agents = [PersonaAgent(llm, Persona(name="Alice"), name="Alice", can_finish=True),
+              PersonaAgent(llm, Persona(name="Bob"), name="Bob")]
+    outputs = []
+    for workers in [1, 4]:
+        output = str(tmp_path / f"dialogs-{workers}.jsonl")
+        generate_dialogs(agents, output, n=12, workers=workers, max_iterations=6, verbose=False)
+        outputs.append({d.dialogId: [turn.text for turn in d.turns] for d in read_dialogs(output)})
+    assert outputs[0] == outputs[1]  # the same dialogues regardless of the number of workers
+
+
+def test_replay_source_and_index(tmp_path, synthetic_star):
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    star_path = synthetic_star(set_path=False, n_dialogs=6)
+    throughput = run_pipeline({"model": "mock", "source": {"type": "star", "path": star_path, "n": 4},
+                               "generation": {"max_turns": 4},
+                               "output": {"path": str(tmp_path / "replay.jsonl")}}, verbose=False)
+    assert throughput["dialogs"] == 4 and throughput["replay"]["n"] == 4
+    assert main(["stats", str(tmp_path / "replay.jsonl")]) == 0
+
+    assert main(["index", star_path, "--retrieval", str(tmp_path / "index"), "--encoder", ENCODER_NAME]) == 0
+    assert (tmp_path / "index" / "dialog_embs.npy").exists()
@@ -1,4 +1,10 @@
-from sdialog.datasets import STAR
+import os
+import json
+import pytest
+
+from sdialog import Dialog, Turn
+from sdialog.datasets import STAR, STARDataset, STARRecord, STARTaskAssets, JSONDialogDataset
+from sdialog.benchmark import MockChatModel
 
 
 def test_star_import():
@@ -21,3 +27,209 @@ def test_star_get_agents_for_scenario(monkeypatch):
     sys, usr = STAR.get_agents_for_scenario({}, "llama2")
     assert sys == "sys"
     assert usr == "usr"
+
+
+def test_star_index_get_dialogs(tmp_path, synthetic_star, monkeypatch):
+    synthetic_star(n_dialogs=30)
+    index_path = STAR.build_index()
+    assert index_path.startswith(str(tmp_path))
+    mtime = os.path.getmtime(index_path)
+    assert STAR.build_index() == index_path and os.path.getmtime(index_path) == mtime  # up to date, not rebuilt
+
+    filters = [{}, {"happy": True}, {"multitask": False},
+               {"task_name": "task_1"}, {"domain": "bank", "happy": False}]
+    for kwargs in filters:
+        expected = sorted(d.dialogId for d in STAR.get_dialogs(use_index=False, **kwargs))
+        assert STAR.get_dialog_ids(**kwargs) == expected
+
+    # Only the matching dialogues are parsed
+    dataset = STAR.get_dataset()
+    read_dialog = dataset._read_dialog
+    parsed = []
+    monkeypatch.setattr(dataset, "_read_dialog", lambda id, location: parsed.append(id) or read_dialog(id, location))
+    dialogs = STAR.get_dialogs(task_name="task_1")
+    assert parsed == [d.dialogId for d in dialogs] == STAR.get_dialog_ids(task_name="task_1")
+
+
+def test_star_index_checked_once(synthetic_star, monkeypatch):
+    dataset = STARDataset(synthetic_star(set_path=False, n_dialogs=6))
+    stamps = []
+    get_index_stamp = dataset._get_index_stamp
+    monkeypatch.setattr(dataset, "_get_index_stamp", lambda: stamps.append(1) or get_index_stamp())
+    dataset.get_dialog_ids(happy=True)
+    dataset.get_dialog_ids()
+    list(dataset.iter_dialogs())
+    assert len(stamps) == 1  # the index is checked on the first access only
+
+    # Editing a dialogue in place makes the index stale
+    fpath = os.path.join(dataset.path, "dialogues", "2.json")
+    with open(fpath) as reader:
+        dialog = json.load(reader)
+    dialog["Scenario"]["Happy"] = not dialog["Scenario"]["Happy"]
+    dialog["Scenario"]["Domains"] = ["edited"]
+    with open(fpath, "w") as writer:
+        json.dump(dialog, writer)
+    assert dataset.get_dialog_ids(domain="edited") == []
+    dataset.refresh()
+    assert dataset.get_dialog_ids(domain="edited") == [2] and len(stamps) == 2
+
+
+def test_star_dialog_record(synthetic_star, monkeypatch):
+    synthetic_star(n_dialogs=5)
+    with open(os.path.join(STAR._path, "dialogues", "3.json")) as reader:
+        events = json.load(reader)["Events"]
+
+    n_user_turns, instructions = 0, {}
+    for event in events:
+        if event["Agent"] == "User" and event["Action"] == "utter":
+            n_user_turns += 1
+        elif event["Agent"] == "UserGuide" and event["Action"] == "instruct":
+            instructions[n_user_turns] = event["Text"]
+
+    parsed = []
+    from_json = STARRecord.from_json
+    monkeypatch.setattr(STARRecord, "from_json", lambda id, *args: parsed.append(id) or from_json(id, *args))
+    assert STAR.get_dialog_user_instructions(3) == instructions
+    assert STAR.get_dialog_events(3) == events
+    assert STAR.get_dialog_first_turn(3).text == next(e["Text"] for e in events if e["Agent"] in ["User", "Wizard"])
+    assert STAR.get_dialog_first_turn(3, "User").speaker == "User"
+    STAR.get_dialog_graphs_and_responses(3)
+    dialog = STAR.get_dialog(3)
+    assert all(turn.speaker in ["User", "System"] for turn in dialog.turns)
+    assert STAR.get_dialog_scenario(3) == dialog.scenario
+    assert parsed == [3]  # the dialogue file is read and parsed once
+
+
+def test_star_task_assets_cache(synthetic_star, monkeypatch):
+    synthetic_star(n_dialogs=10, n_tasks=2)
+    assert STAR.preload_task_assets() == ["task_0", "task_1"]
+
+    tasks_loaded = []
+    from_json = STARTaskAssets.from_json
+    monkeypatch.setattr(STARTaskAssets, "from_json",
+                        lambda task_name, *args: tasks_loaded.append(task_name) or from_json(task_name, *args))
+    for dialog_id in range(1, 11):
+        scenario = STAR.get_dialog_scenario(dialog_id)
+        STAR.get_scenario_description(scenario)
+        STAR.get_flowchart_description_for_scenario(scenario)
+        STAR.get_dialog_graphs_and_responses(dialog_id)
+    assert tasks_loaded == []  # served from the preloaded assets
+
+    assert STAR.read_graph("task_0").startswith("digraph task_0  {\n    hello -> ")
+    graph = STAR.read_graph("task_0", as_dot=False)
+    graph.clear()  # returned copies do not alter the cache
+    assert STAR.read_graph("task_0", as_dot=False)
+    assert all("{" not in value for value in STAR.read_graph_responses("task_0", as_dict=True).values())
+
+
+def test_star_scenario_agent_pool(synthetic_star):
+    synthetic_star(n_dialogs=4, n_tasks=1)
+    STAR.clear_cache()
+    scenario = STAR.get_dialog_scenario(1)
+    other = json.loads(json.dumps(scenario))
+    other["UserTask"] = "Another user task"
+    assert STAR.get_scenario(scenario) == STAR.get_scenario(json.loads(json.dumps(scenario)))
+    assert STAR.get_scenario(scenario).signature() != STAR.get_scenario(other).signature()
+    assert STAR.get_system_persona_for_scenario(scenario) is STAR.get_system_persona_for_scenario(other)
+    assert STAR.get_user_persona_for_scenario(scenario) is not STAR.get_user_persona_for_scenario(other)
+
+    llm = MockChatModel(response_tokens=5, stop_after=2)
+    system_a, user_a = STAR.get_agents_for_scenario(scenario, llm)
+    dialog = system_a.dialog_with(user_a, max_iterations=4)
+    system_b, user_b = STAR.get_agents_for_scenario(other, llm)
+    assert system_b is not system_a and system_b.llm is not system_a.llm  # forks own a copy of the client
+    assert system_b.get_prompt() == system_a.get_prompt() and user_b.get_prompt() != user_a.get_prompt()
+    assert len(system_b.memory) == 1 and not user_b.finished  # pooled agents are handed out in their initial state
+    assert len(STAR.get_dataset()._agent_templates) == 3
+    assert len(dialog.turns) > 0
+
+    synthetic_star("star_b", n_dialogs=4, n_tasks=1, seed=1)
+    system_c, _ = STAR.get_agents_for_scenario(scenario, llm)
+    assert len(STAR.get_dataset()._agent_templates) == 2  # each dataset has its own pool
+
+
+def test_star_iter_dialogs(synthetic_star):
+    synthetic_star(n_dialogs=25)
+    expected = [dialog.dialogId for dialog in STAR.get_dialogs(happy=True)]
+    assert [d.dialogId for d in STAR.iter_dialogs(happy=True)] == expected
+    assert [d.dialogId for d in STAR.iter_dialogs(happy=True, workers=2, chunk_size=3)] == expected
+    assert sorted(d.dialogId for d in STAR.iter_dialogs(happy=True, workers=2, chunk_size=3, ordered=False)) == expected
+
+    shards = [[d.dialogId for d in STAR.iter_dialogs(happy=True, shard_index=ix, num_shards=3)] for ix in range(3)]
+    assert sorted(sum(shards, [])) == expected
+    assert all(shards) and not set(shards[0]) & set(shards[1])
+
+
+def test_star_flowchart_encodings(synthetic_star):
+    graph = {"a": "b", "b": "c", "c": "a", "d": "b", "x": "y"}
+    paths = STARTaskAssets._get_graph_paths(graph).split("\n")
+    edges = [(p[ix], p[ix + 1]) for p in (path.split(" -> ") for path in paths) for ix in range(len(p) - 1)]
+    assert sorted(edges) == sorted(graph.items())
+
+    synthetic_star(n_dialogs=5, n_tasks=2)
+    scenario = STAR.get_dialog_scenario(1)
+    report = STAR.get_flowchart_token_report([scenario])
+    assert report["dot"]["ratio"] == 1
+    assert report["graph"]["tokens"] < report["compact"]["tokens"] < report["dot"]["tokens"]
+
+    with pytest.raises(ValueError):
+        STAR.set_flowchart_encoding("xml")
+    dot_prompt = STAR.get_system_persona_for_scenario(scenario).role
+    STAR.set_flowchart_encoding("compact")
+    try:
+        compact_prompt = STAR.get_system_persona_for_scenario(scenario).role
+        assert "digraph" not in compact_prompt and len(compact_prompt) < len(dot_prompt)
+        assert "digraph" in STAR.get_scenario_description(scenario, encoding="dot")
+    finally:
+        STAR.set_flowchart_encoding("dot")
+
+
+def test_json_dialog_dataset(tmp_path):
+    sgd = [{"dialogue_id": f"1_{ix:05d}", "services": ["Hotels_1"] if ix % 2 else ["Restaurants_1"],
+            "turns": [{"speaker": "USER", "utterance": f"hi {ix}"}, {"speaker": "SYSTEM", "utterance": "hello"}]}
+           for ix in range(6)]
+    os.makedirs(tmp_path / "sgd")
+    with open(tmp_path / "sgd" / "dialogues_001.json", "w") as writer:
+        json.dump(sgd[:4], writer)
+    with open(tmp_path / "sgd" / "dialogues_002.json", "w") as writer:
+        json.dump(sgd[4:], writer)
+    with open(tmp_path / "sgd" / "schema.json", "w") as writer:
+        json.dump([{"service_name": "Hotels_1"}], writer)
+    with open(tmp_path / "sgd" / "extra.jsonl", "w") as writer:
+        for ix in range(3):
+            writer.write(Dialog(dialogId=100 + ix, turns=[Turn(speaker="System", text=f"hey {ix}")]).json(True) + "\n")
+
+    dataset = JSONDialogDataset(str(tmp_path / "sgd"))
+    assert len(dataset) == 9
+    assert dataset.get_dialog_ids(domain="Hotels_1") == ["1_00001", "1_00003", "1_00005"]
+    assert dataset.get_dialog("1_00004").turns[0].text == "hi 4"
+    assert dataset[-1].dialogId == 102 and dataset[-1].turns[0].text == "hey 2"
+    assert [d.dialogId for d in dataset.iter_dialogs(workers=2, chunk_size=2)] == [d.dialogId for d in dataset]
+    shards = [dataset.get_dialog_ids(shard_index=ix, num_shards=2) for ix in range(2)]
+    assert sorted(map(str, sum(shards, []))) == sorted(map(str, dataset.get_dialog_ids()))
+
+    multiwoz = {"PMUL0001.json": {"goal": {"hotel": {"info": {}}, "taxi": {}, "message": ["Book a hotel"]},
+                                  "log": [{"text": "I need a hotel"}, {"text": "Sure"}]}}
+    with open(tmp_path / "data.json", "w") as writer:
+        json.dump(multiwoz, writer)
+    dataset = JSONDialogDataset(str(tmp_path / "data.json"))
+    dialog = dataset.get_dialog("PMUL0001.json")
+    assert [t.speaker for t in dialog.turns] == ["User", "System"] and dialog.scenario["domains"] == ["hotel"]
+    system, user = dataset.get_agents("PMUL0001.json", MockChatModel())
+    assert "Book a hotel" in user.get_prompt()
+
+
+def test_star_dataset(synthetic_star):
+    dataset = STARDataset(synthetic_star(set_path=False, n_dialogs=8))
+    assert len(dataset) == 8 and dataset[0].dialogId == 1
+    assert dataset.get_dialog_ids(happy=True) == [d.dialogId for d in dataset if d.scenario["Happy"]]
+    assert dataset.get_scenario(2) == dataset.get_dialog(2).scenario
+    system, user = dataset.get_agents(2, MockChatModel(), orchestration=False)
+    assert system.name == "System" and user.name == "User"
+
+    STAR.set_path(None)
+    other = STARDataset(synthetic_star("star_b", set_path=False, n_dialogs=4, seed=1))
+    system_b, user_b = other.get_agents(2, MockChatModel(), orchestration=False)
+    assert STAR._path is None  # datasets do not use the global STAR path
+    assert user_b.get_prompt() != user.get_prompt()
+    assert other.get_scenario(2) != dataset.get_scenario(2)
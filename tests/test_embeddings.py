@@ -0,0 +1,112 @@
+import numpy as np
+
+from sdialog.embeddings import (get_sentence_encoder, register_sentence_encoder,
+                                get_embedding_cache, EmbeddingCache)
+from sdialog.orchestrators import SimpleResponseOrchestrator
+
+
+class DummyEncoder:
+    def __init__(self):
+        self.n_encoded = 0
+
+    def encode(self, texts):
+        self.n_encoded += len(texts)
+        return np.array([[len(text), text.count(" ") + 1, 1] for text in texts], dtype=float)
+
+
+def test_embedding_cache_lru():
+    cache = EmbeddingCache(maxsize=2)
+    cache.put("m", "a", np.ones(2))
+    cache.put("m", "b", np.ones(2))
+    assert cache.get("m", "a") is not None
+    cache.put("m", "c", np.ones(2))  # evicts "b" (least recently used)
+    assert cache.get("m", "b") is None
+    assert len(cache) == 2
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_registered_encoder_is_shared_and_cached():
+    encoder = DummyEncoder()
+    register_sentence_encoder("dummy-encoder", encoder)
+    assert get_sentence_encoder("dummy-encoder") is get_sentence_encoder("dummy-encoder")
+
+    embs = get_sentence_encoder("dummy-encoder").encode(["hi there", "bye", "hi there"])
+    assert embs.shape == (3, 3)
+    assert encoder.n_encoded == 2
+    hits = get_embedding_cache().hits
+    assert np.allclose(get_sentence_encoder("dummy-encoder").encode("bye"), embs[1])
+    assert encoder.n_encoded == 2
+    assert get_embedding_cache().hits == hits + 1
+
+
+def test_simple_response_orchestrator_shares_embeddings():
+    encoder = DummyEncoder()
+    register_sentence_encoder("dummy-encoder", encoder)
+    responses = ["Yes, of course", "No", "Maybe later"]
+    SimpleResponseOrchestrator(responses=responses, sbert_model="dummy-encoder")
+    SimpleResponseOrchestrator(responses=responses, sbert_model="dummy-encoder")
+    assert encoder.n_encoded == len(responses)
+
+
+def test_embedding_store_memmap(tmp_path):
+    from sdialog.embeddings import EmbeddingStore
+
+    encoder = DummyEncoder()
+    cached_encoder = register_sentence_encoder("dummy-encoder", encoder)
+    texts = ["Yes, of course", "No"]
+    embs = EmbeddingStore(str(tmp_path)).get_or_encode(cached_encoder, texts)
+    assert isinstance(embs, np.memmap) and embs.dtype == np.float16
+    # A new store (e.g. in another process) loads it from disk without encoding
+    embs = EmbeddingStore(str(tmp_path)).get("dummy-encoder", texts)
+    assert embs.shape == (2, 3) and not embs.flags.writeable
+    assert encoder.n_encoded == 2
+    assert EmbeddingStore(str(tmp_path)).get("dummy-encoder", ["Maybe"]) is None
+
+
+def test_embedding_store_precompute_cli(tmp_path):
+    import json
+    from sdialog.embeddings import main
+
+    encoder = DummyEncoder()
+    register_sentence_encoder("dummy-encoder", encoder)
+    responses = {"yes": "Yes, of course", "no": "No"}
+    (tmp_path / "responses.json").write_text(json.dumps(responses))
+    main(["precompute", "--store", str(tmp_path / "store"), "--model", "dummy-encoder",
+          str(tmp_path / "responses.json")])
+    assert encoder.n_encoded == 2
+
+    orch = SimpleResponseOrchestrator(responses=responses, sbert_model="dummy-encoder",
+                                      embedding_store=str(tmp_path / "store"))
+    assert isinstance(orch.resp_utt_embs, np.memmap)
+    assert encoder.n_encoded == 2
+
+
+def test_batching_encoder_threads_and_asyncio():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    class CountingEncoder(DummyEncoder):
+        n_calls = 0
+
+        def encode(self, texts):
+            self.n_calls += 1
+            return super().encode(texts)
+
+    encoder = CountingEncoder()
+    register_sentence_encoder("dummy-encoder", encoder)
+    batching_encoder = get_sentence_encoder("dummy-encoder", batching=True)
+    batching_encoder.max_wait = 0.05
+    texts = [f"text number {ix}" for ix in range(16)]
+
+    with ThreadPoolExecutor(8) as pool:
+        embs = list(pool.map(batching_encoder.encode, texts))
+    assert all(np.allclose(emb, [len(text), 3, 1]) for emb, text in zip(embs, texts))
+    assert encoder.n_calls < len(texts)
+
+    async def encode_all():
+        return await asyncio.gather(*[batching_encoder.aencode(f"async {text}") for text in texts])
+
+    n_calls = encoder.n_calls
+    embs = asyncio.run(encode_all())
+    assert len(embs) == len(texts)
+    assert encoder.n_calls == n_calls + 1
@@ -59,3 +59,16 @@ def test_persona_dialog_generator_with_agents(monkeypatch):
     assert hasattr(dialog, "turns")
     assert "A" in dialog.personas
     assert "B" in dialog.personas
+
+
+def test_dialog_generator_streaming_usage():
+    from sdialog import profiling
+    from sdialog.benchmark import MockChatModel
+
+    gen = DialogGenerator(MockChatModel(), "A dialogue between a customer and a shop assistant.")
+    tokens = []
+    with profiling.profile() as run:
+        dialog = gen.generate(seed=1, on_token=lambda token, speaker: tokens.append(token))
+    assert "".join(tokens) and dialog.turns
+    stats = run.stats()["names"]["llm:generate"]
+    assert stats["prompt_tokens"] > 0 and stats["completion_tokens"] > 0  # summed over the streamed chunks
@@ -4,8 +4,10 @@ from sdialog.orchestrators import (
     ChangeMindOrchestrator,
     SimpleReflexOrchestrator,
     SimpleResponseOrchestrator,
-    InstructionListOrchestrator
+    InstructionListOrchestrator,
+    Trigger
 )
+from sdialog.personas import Persona, PersonaAgent
 
 
 def test_base_orchestrator_instruct():
@@ -41,3 +43,188 @@ def test_simple_response_orchestrator():
 def test_instruction_list_orchestrator():
     orch = InstructionListOrchestrator(["Step 1", "Step 2"])
     assert hasattr(orch, "instruct")
+
+
+def test_instruction_list_orchestrator_with_agent():
+    class DummyLLM:
+        seed = 0
+        num_predict = 1
+
+        def invoke(self, memory):
+            return type("Msg", (), {"content": "Ok", "response_metadata": {}})()
+
+    agent = PersonaAgent(DummyLLM(), Persona(name="A"), name="A")
+    agent = agent | InstructionListOrchestrator({1: "Step 1", 3: "Step 3"})
+    instructions = []
+    for _ in range(4):
+        events = agent("Hi", return_events=True)
+        instructions.append([e.text for e in events if e.action == "instruct"])
+    assert instructions == [[], ["Step 1"], [], ["Step 3"]]
+    assert agent.dialog_state.n_turns("A") == 4
+    # non-persistent instructions are removed from memory after each turn
+    assert not any(msg.content.startswith("Step") for msg in agent.memory)
+
+
+def test_simple_response_orchestrator_speculative_with_agent():
+    import numpy as np
+    from sdialog.embeddings import register_sentence_encoder
+
+    class DummyEncoder:
+        def encode(self, texts):
+            return np.array([[text.count("price"), text.count("hello"), 1] for text in texts], dtype=float)
+
+    class DummyLLM:
+        seed = 0
+        num_predict = None
+        calls = 0
+
+        def invoke(self, memory):
+            self.calls += 1
+            return type("Msg", (), {"content": "hello hello", "response_metadata": {}})()
+
+    register_sentence_encoder("dummy-encoder", DummyEncoder())
+    orch = SimpleResponseOrchestrator(responses={"greet": "hello!", "price": "The price is PRICE"},
+                                      graph={"greet": "price"},
+                                      sbert_model="dummy-encoder",
+                                      top_k=1,
+                                      speculative=True)
+    llm = DummyLLM()
+    agent = PersonaAgent(llm, Persona(name="A"), name="A") | orch
+    events = agent("Hi", return_events=True)
+    assert "Action: greet" in [e.text for e in events if e.action == "instruct"][0]
+    assert events[-1].text == "hello hello"
+    assert llm.calls == 1  # lookahead committed
+    events = agent("How much?", return_events=True)
+    assert "Action: price" in [e.text for e in events if e.action == "instruct"][0]
+    assert llm.calls == 2  # previous turn used, no lookahead
+
+
+def test_orchestrator_triggers_schedule():
+    class DummyLLM:
+        seed = 0
+        num_predict = 1
+
+        def invoke(self, memory):
+            return type("Msg", (), {"content": "Ok", "response_metadata": {}})()
+
+    calls = []
+
+    class CountingOrchestrator(BaseOrchestrator):
+        def __init__(self, name, trigger=None):
+            super().__init__()
+            self.name = name
+            self.trigger = trigger
+
+        def get_trigger(self):
+            return self.trigger
+
+        def instruct(self, dialog, utterance):
+            calls.append((len(dialog), self.name))
+
+    length = LengthOrchestrator(min=4, max=8)
+    assert length.get_trigger() == Trigger(turns=[2, 3], from_turn=7)
+    change_mind = ChangeMindOrchestrator(probability=1.0, max_times=1)
+    agent = PersonaAgent(DummyLLM(), Persona(name="A"), name="A")
+    agent = agent | [CountingOrchestrator("always"),
+                     CountingOrchestrator("turn-3", Trigger(turns=[3])),
+                     CountingOrchestrator("from-5", Trigger(from_turn=5)),
+                     change_mind]
+    instructed = []
+    for _ in range(4):
+        events = agent("Hi", return_events=True)
+        instructed.append(len([e for e in events if e.action == "instruct"]))
+    assert calls == [(1, "always"), (3, "always"), (3, "turn-3"), (5, "always"), (5, "from-5"),
+                     (7, "always"), (7, "from-5")]
+    assert instructed == [1, 0, 0, 0]  # change of mind only once, then exhausted (not called anymore)
+    assert agent._scheduled_orchestrators() == [0, 2]
+
+    agent.reset()
+    calls.clear()
+    agent("Hi")
+    assert calls == [(1, "always")] and change_mind.times == 1
+
+
+def test_independent_orchestrators_run_concurrently():
+    import time
+
+    class SlowLLM:
+        seed = 0
+        num_predict = 1
+        calls = 0
+
+        def invoke(self, memory):
+            self.calls += 1
+            time.sleep(.2)
+            return type("Msg", (), {"content": "Ok", "response_metadata": {}})()
+
+    class SlowOrchestrator(BaseOrchestrator):
+        def __init__(self, instruction, delay):
+            super().__init__()
+            self.instruction = instruction
+            self.delay = delay
+            self.set_independent(True)
+
+        def instruct(self, dialog, utterance):
+            self.agent_response_lookahead()
+            time.sleep(self.delay)
+            return self.instruction
+
+    llm = SlowLLM()
+    agent = PersonaAgent(llm, Persona(name="A"), name="A")
+    agent = agent | [SlowOrchestrator("First", .3),
+                     InstructionListOrchestrator(["Second"]),
+                     SlowOrchestrator("Third", .3)]
+    start = time.perf_counter()
+    events = agent("Hi", return_events=True)
+    elapsed = time.perf_counter() - start
+    assert [e.text for e in events if e.action == "instruct"] == ["First", "Second", "Third"]
+    assert llm.calls == 2  # a single (shared) lookahead call plus the response
+    assert elapsed < .9  # lookahead + max(.3, .3) + response, instead of lookahead + .3 + .3 + response
+
+
+def test_flow_graph_orchestrator():
+    import numpy as np
+    from sdialog.embeddings import register_sentence_encoder
+    from sdialog.orchestrators import FlowGraphOrchestrator
+
+    class DummyEncoder:
+        def encode(self, texts):
+            return np.array([[text.count("hello"), text.count("name"), text.count("bye"), .1] for text in texts])
+
+    class DummyLLM:
+        seed = 0
+        num_predict = None
+        calls = 0
+
+        def invoke(self, memory):
+            self.calls += 1
+            return type("Msg", (), {"content": ["hello", "your name?", "bye"][self.calls - 1],
+                                    "response_metadata": {}})()
+
+    register_sentence_encoder("dummy-encoder-graph", DummyEncoder())
+    orch = FlowGraphOrchestrator(graph={"hello": "user_greet", "user_greet": "ask_name",
+                                        "ask_name": "user_name", "user_name": "goodbye"},
+                                 responses={"hello": "hello!", "ask_name": "name?", "goodbye": "bye"},
+                                 sbert_model="dummy-encoder-graph")
+    assert orch.adj_targets.dtype == np.int32
+    assert [orch.actions[ix] for ix in orch.next_actions[orch.node_ixs["hello"]]] == ["ask_name"]
+
+    llm = DummyLLM()
+    agent = PersonaAgent(llm, Persona(name="A"), name="A") | orch
+    next_actions = []
+    for _ in range(3):
+        events = agent("Hi", return_events=True)
+        next_actions.append([e.text for e in events if e.text.startswith("Graph next actions")])
+    assert next_actions == [["Graph next actions: hello"],
+                            ["Graph next actions: ask_name"],
+                            ["Graph next actions: goodbye"]]
+    assert llm.calls == 3  # no lookahead calls
+    assert orch.clone().current_node == orch.node_ixs["ask_name"]
+
+    clone = orch.clone()
+    clone.ACTION_CACHE_SIZE = 2
+    assert clone.classify("bye bye") == orch.actions.index("goodbye")
+    assert list(orch._action_cache) == ["your name?", "bye bye"]  # shared by clones, "hello" evicted
+    clone.classify("your name?")
+    clone.classify("hello there")
+    assert list(orch._action_cache) == ["your name?", "hello there"]  # least recently used evicted
@@ -81,3 +81,129 @@ def test_persona_agent_dialog_with():
     assert len(dialog.turns) > 0
     assert "A" in dialog.personas
     assert "B" in dialog.personas
+
+
+def test_persona_agent_dialog_with_seeds():
+    agent1 = PersonaAgent(DummyLLM(), persona=Persona(name="A"), name="A")
+    agent2 = PersonaAgent(DummyLLM(), persona=Persona(name="B"), name="B")
+    dialog = agent1.dialog_with(agent2, max_iterations=2, seed=3, keep_bar=False)
+    assert dialog.seed == agent1.llm.seed == agent2.llm.seed == 3
+    assert agent1.rng.random() != agent2.rng.random()  # each agent draws its own random stream
+
+
+class CountingLLM(DummyLLM):
+    num_predict = None
+
+    def __init__(self, *a, **kw):
+        self.log = []  # shared by the copies of the client (e.g. of forked agents)
+
+    @property
+    def calls(self):
+        return len(self.log)
+
+    def invoke(self, memory):
+        if self.num_predict != 1:  # ignore the prompt-cache reset calls
+            self.log.append(self.seed)
+        return type("Msg", (), {"content": f"utterance {self.calls}", "response_metadata": {}})()
+
+
+def test_persona_agent_snapshot_and_fork():
+    agent = PersonaAgent(DummyLLM(), persona=Persona(name="A"), name="A")
+    snapshot = agent.snapshot()
+    agent("Hello")
+    fork = agent.fork()
+    fork("How are you?")
+    assert len(fork.memory) == len(agent.memory) + 2
+    assert fork.llm is not agent.llm and fork.rng.getstate() == agent.rng.getstate()
+    fork._set_seed(7)
+    assert agent.llm.seed != 7
+    agent.restore(snapshot)
+    assert len(agent.memory) == 1
+    assert not agent.finished
+
+
+def test_persona_agent_dialog_tree():
+    llm_a, llm_b = CountingLLM(), CountingLLM()
+    agent1 = PersonaAgent(llm_a, persona=Persona(name="A"), name="A")
+    agent2 = PersonaAgent(llm_b, persona=Persona(name="B"), name="B")
+    dialogs = list(agent1.dialog_tree(agent2, branching={1: 3}, max_iterations=2, keep_bar=False))
+    assert len(dialogs) == 3
+    assert all(len(dialog) == 4 for dialog in dialogs)
+    assert all(dialog.turns[0].text == dialogs[0].turns[0].text for dialog in dialogs)
+    # shared prefix is generated only once: 1 + 3 * 3 unique turns instead of 3 * 4
+    assert llm_a.calls + llm_b.calls == 10
+    # each branch generates with its own seed, recorded in the dialogue
+    assert len(set(llm_b.log)) == 3 and len(set(llm_a.log)) == 3
+    assert len({dialog.seed for dialog in dialogs}) == 3
+    assert all(next(e for e in dialog.events if e.action == "branch").text.endswith(f"(seed {dialog.seed})")
+               for dialog in dialogs)
+
+
+def test_persona_agent_dialog_tree_emits_dialog_end():
+    from sdialog import profiling
+
+    class DialogEndHook(profiling.BaseProfilingHook):
+        def __init__(self):
+            self.dialogs = []
+
+        def on_dialog_end(self, dialog):
+            self.dialogs.append(dialog)
+
+    hook = profiling.register_hook(DialogEndHook())
+    try:
+        agent1 = PersonaAgent(CountingLLM(), persona=Persona(name="A"), name="A")
+        agent2 = PersonaAgent(CountingLLM(), persona=Persona(name="B"), name="B")
+        dialogs = list(agent1.dialog_tree(agent2, branching={1: 2}, max_iterations=2, keep_bar=False))
+    finally:
+        profiling.unregister_hook(hook)
+    assert hook.dialogs == dialogs
+
+
+def test_persona_agent_lookahead_cache_and_speculative_response():
+    from sdialog import Instruction
+    from sdialog.orchestrators import BaseOrchestrator
+
+    class LookaheadOrchestrator(BaseOrchestrator):
+        def instruct(self, dialog, utterance):
+            lookahead = self.agent_response_lookahead()
+            assert self.agent_response_lookahead() == lookahead  # cached
+            return Instruction(text="Say it", response=lookahead)
+
+    llm = CountingLLM()
+    agent = PersonaAgent(llm, persona=Persona(name="A"), name="A") | LookaheadOrchestrator()
+    response = agent("Hello")
+    assert response == "utterance 1"
+    assert llm.calls == 1  # the lookahead was committed as the response
+    agent("Bye")
+    assert llm.calls == 2
+
+
+class StreamingLLM(DummyLLM):
+    num_predict = None
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.n_streamed = 0
+
+    def stream(self, memory):
+        for token in self.tokens:
+            self.n_streamed += 1
+            yield type("Chunk", (), {"content": token})()
+
+
+def test_persona_agent_streaming_early_stop():
+    llm = StreamingLLM(["Good", " bye!", " ST", "OP", " never", " generated"])
+    agent = PersonaAgent(llm, persona=Persona(name="A"), name="A")
+    tokens = []
+    response = agent("Bye", on_token=lambda token, speaker: tokens.append(token))
+    assert "".join(tokens) == "Good bye! "
+    assert llm.n_streamed == 4  # stream closed right after the STOP word
+    assert agent.finished
+    assert response == "Good bye! " + agent.STOP_WORD_TEXT
+
+
+def test_persona_agent_streaming_max_response_tokens():
+    llm = StreamingLLM(["one", " two", " three", " four"])
+    agent = PersonaAgent(llm, persona=Persona(name="A"), name="A", max_response_tokens=2)
+    assert agent("Hi") == "one two"
+    assert llm.n_streamed == 2
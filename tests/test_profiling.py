@@ -0,0 +1,110 @@
+import numpy as np
+
+from sdialog import profiling
+from sdialog.embeddings import register_sentence_encoder, get_sentence_encoder
+from sdialog.orchestrators import BaseOrchestrator
+from sdialog.personas import Persona, PersonaAgent
+
+
+class LookaheadOrchestrator(BaseOrchestrator):
+    def instruct(self, dialog, utterance):
+        self.agent_response_lookahead()
+        return "Be nice"
+
+
+def test_span_without_profile_is_noop():
+    assert profiling.get_recorder() is None
+    with profiling.span("llm") as span:
+        span.set_usage(None)
+    assert profiling.get_recorder() is None
+
+
+def test_dialog_with_profile(dummy_llm):
+    alice = (PersonaAgent(dummy_llm("Hi there", delay=.001), Persona(name="Alice"), name="Alice")
+             | LookaheadOrchestrator())
+    bob = PersonaAgent(dummy_llm("Hi there", delay=.001), Persona(name="Bob"), name="Bob")
+
+    with profiling.profile() as run:
+        dialogs = [alice.dialog_with(bob, max_iterations=2, profile=True) for _ in range(2)]
+        alice.dialog_with(bob, max_iterations=1)  # not profiled on its own, but still part of the run
+
+    stats = dialogs[0].stats
+    assert stats["kinds"]["llm"]["calls"] == 6  # 4 responses + 2 lookaheads
+    assert stats["names"]["llm:lookahead"]["calls"] == 2
+    assert stats["names"]["orchestrator:LookaheadOrchestrator"]["calls"] == 2
+    assert stats["kinds"]["llm"]["completion_tokens"] == 12
+    assert stats["kinds"]["llm"]["prompt_tokens"] > 0
+    assert 0 < stats["kinds"]["llm"]["max_ns"] <= stats["kinds"]["llm"]["total_ns"] <= stats["wall_ns"]
+
+    total = profiling.aggregate_stats(dialogs)
+    assert total["n"] == 2 and total["kinds"]["llm"]["calls"] == 12
+    assert run.stats()["kinds"]["llm"]["calls"] == 15
+    assert all(span.end >= span.start for span in run.spans)
+    assert profiling.get_recorder() is None
+
+
+def test_encoder_profile():
+    class DummyEncoder:
+        def encode(self, texts):
+            return np.ones((len(texts), 3))
+
+    register_sentence_encoder("dummy-encoder-profile", DummyEncoder())
+    encoder = get_sentence_encoder("dummy-encoder-profile")
+    with profiling.profile() as recorder:
+        encoder.encode(["a", "b"])
+        encoder.encode(["a", "b"])  # cached, no encoder call
+    assert [(span.kind, span.name) for span in recorder.spans] == [("encode", "dummy-encoder-profile")]
+
+
+def test_profiling_hooks_and_sinks(tmp_path, dummy_llm):
+    import json
+
+    class RecordingHook(profiling.BaseProfilingHook):
+        def __init__(self):
+            self.calls = []
+
+        def on_llm_start(self, name, agent):
+            self.calls.append(("llm_start", name, agent))
+
+        def on_llm_end(self, span):
+            self.calls.append(("llm_end", span.name, span.agent))
+
+        def on_orchestrator(self, span):
+            self.calls.append(("orchestrator", span.name, span.agent))
+
+        def on_turn(self, turn):
+            self.calls.append(("turn", turn.speaker, turn.text))
+
+        def on_dialog_end(self, dialog):
+            self.calls.append(("dialog_end", len(dialog)))
+
+    hook = profiling.register_hook(RecordingHook())
+    profiling.register_hook(profiling.JSONLTraceSink(str(tmp_path / "trace.jsonl")))
+    profiling.register_hook(profiling.ChromeTraceSink(str(tmp_path / "trace.json")))
+    histogram = profiling.register_hook(profiling.HistogramSink())
+    try:
+        alice = (PersonaAgent(dummy_llm("Hi there", delay=.001), Persona(name="Alice"), name="Alice")
+                 | LookaheadOrchestrator())
+        bob = PersonaAgent(dummy_llm("Hi there", delay=.001), Persona(name="Bob"), name="Bob")
+        dialog = alice.dialog_with(bob, max_iterations=1)
+    finally:
+        profiling.clear_hooks()
+
+    assert dialog.stats is None
+    assert hook.calls == [("llm_start", "lookahead", "Alice"), ("llm_end", "lookahead", "Alice"),
+                          ("orchestrator", "LookaheadOrchestrator", "Alice"),
+                          ("llm_start", "response", "Alice"), ("llm_end", "response", "Alice"),
+                          ("turn", "Alice", "Hi there"),
+                          ("llm_start", "response", "Bob"), ("llm_end", "response", "Bob"),
+                          ("turn", "Bob", "Hi there"),
+                          ("dialog_end", 2)]
+    records = [json.loads(line) for line in open(tmp_path / "trace.jsonl")]
+    assert [r["type"] for r in records] == ["span", "span", "span", "turn", "span", "turn", "dialog_end"]
+    trace = json.load(open(tmp_path / "trace.json"))
+    assert [e["name"] for e in trace["traceEvents"] if e["ph"] == "X"] == [
+        "llm:lookahead", "orchestrator:LookaheadOrchestrator", "llm:response", "llm:response"
+    ]
+    summary = histogram.summary()
+    assert summary["llm:response"]["count"] == 2 and summary["llm:response"]["p50_ms"] >= 1
+    assert histogram.histogram("llm:response", bins=2)[0].sum() == 2
+    assert profiling.get_hooks() == []
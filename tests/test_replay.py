@@ -0,0 +1,73 @@
+import os
+import json
+
+from sdialog.datasets import STAR, JSONDialogDataset
+from sdialog.embeddings import register_sentence_encoder
+from sdialog.benchmark import MockChatModel, HashingEncoder, ENCODER_NAME
+from sdialog.replay import replay, read_replay, run_jsonl_jobs, read_jsonl, main
+
+
+def test_replay_resume(tmp_path, synthetic_star):
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    synthetic_star(n_dialogs=6)
+    ids = STAR.get_dialog_ids()
+    output = str(tmp_path / "replay.jsonl")
+
+    stats = replay(STAR.get_dataset(), ids[:4], MockChatModel(response_tokens=5), output, workers=2,
+                   max_iterations=4, verbose=False, set_first_utterance=True, sbert_model=ENCODER_NAME)
+    assert stats["n"] == 4 and stats["throughput"]["dialogs"] == 4 and stats["throughput"]["llm_calls"] > 0
+    assert stats["turn_length"]["synthetic"]["p50"] == 5
+    assert stats["turns"]["delta"]["mean"] == stats["turns"]["synthetic"]["mean"] - stats["turns"]["reference"]["mean"]
+
+    with open(output, "a") as writer:
+        writer.write('{"id": 5, "refer')  # interrupted write
+    stats = replay(STAR.get_dataset(), ids, MockChatModel(response_tokens=5), output, workers=2,
+                   max_iterations=4, verbose=False, sbert_model=ENCODER_NAME)
+    assert stats["n"] == 6 and stats["throughput"]["dialogs"] == 2
+    pairs = read_replay(output)
+    assert sorted(pair["id"] for pair in pairs) == ids
+    assert all(pair["reference"].dialogId == pair["synthetic"].dialogId == pair["id"] for pair in pairs)
+
+
+def test_replay_cli_mock(tmp_path, capsys):
+    output = str(tmp_path / "replay.jsonl")
+    assert main(["run", "--mock", "--n", "3", "--max-turns", "3", "--workers", "2", "-o", output]) == 0
+    assert main(["stats", output]) == 0
+    assert "3 replayed dialogues" in capsys.readouterr().out
+
+
+def test_replay_workers_deterministic(tmp_path, synthetic_star):
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    synthetic_star(n_dialogs=16)
+    os.makedirs(tmp_path / "json")
+    with open(tmp_path / "json" / "dialogs.json", "w") as writer:
+        json.dump([{"dialogue_id": f"d{ix}", "services": ["hotel"],
+                    "turns": [{"speaker": "SYSTEM", "utterance": f"hello {ix}"}]} for ix in range(16)], writer)
+    json_dataset = JSONDialogDataset(str(tmp_path / "json"))
+
+    for dataset, kwargs in [(STAR.get_dataset(), {"sbert_model": ENCODER_NAME, "flow_graph": True}),
+                            (json_dataset, {})]:
+        outputs = []
+        for workers in [1, 4]:
+            output = str(tmp_path / f"replay-{len(outputs)}.jsonl")
+            replay(dataset, dataset.get_dialog_ids(), MockChatModel(latency=0.001, stop_after=5, stop_probability=.2),
+                   output, workers=workers, max_iterations=6, verbose=False, **kwargs)
+            outputs.append({pair["id"]: [turn.text for turn in pair["synthetic"].turns]
+                            for pair in read_replay(output)})
+        assert outputs[0] == outputs[1]  # the same dialogues regardless of the number of workers
+
+
+def test_run_jsonl_jobs(tmp_path):
+    output = str(tmp_path / "out" / "records.jsonl")
+    throughput = run_jsonl_jobs([(ix, ix * 2) for ix in range(4)], lambda id, value: ({"id": id, "v": value}, 1),
+                                output, id_field="id", workers=2, verbose=False)
+    assert throughput["dialogs"] == throughput["turns"] == 4
+
+    with open(output, "a") as writer:
+        writer.write('{"id": 4, "v"')  # interrupted write
+    calls = []
+    throughput = run_jsonl_jobs([(ix, ix * 2) for ix in range(6)],
+                                lambda id, value: calls.append(id) or ({"id": id, "v": value}, 1),
+                                output, id_field="id", workers=2, verbose=False)
+    assert sorted(calls) == [4, 5] and throughput["dialogs"] == 2
+    assert sorted((record["id"], record["v"]) for record in read_jsonl(output)) == [(ix, ix * 2) for ix in range(6)]
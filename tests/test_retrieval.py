@@ -0,0 +1,57 @@
+import os
+import pytest
+
+from sdialog import Dialog, Turn
+from sdialog.datasets import STARDataset
+from sdialog.embeddings import register_sentence_encoder
+from sdialog.benchmark import HashingEncoder, ENCODER_NAME
+from sdialog.retrieval import DialogIndex, build_few_shot_prompt
+
+
+def test_dialog_index(tmp_path, synthetic_star):
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    dataset = STARDataset(synthetic_star(set_path=False, n_dialogs=12))
+    dialogs = list(dataset.iter_dialogs())
+
+    DialogIndex.build(dialogs, str(tmp_path / "index"), model=ENCODER_NAME, batch_size=5, verbose=False)
+    index = DialogIndex.build(dialogs, str(tmp_path / "index"), model=ENCODER_NAME, batch_size=5, verbose=False)
+    assert len(index) == len(dialogs)
+    assert index.get_dialog(dialogs[3].dialogId).turns == dialogs[3].turns
+
+    top = index.search(dialogs[3], k=3)
+    assert top[0][0] == dialogs[3].dialogId and len(top) == 3
+    assert [s for _, s in top] == sorted([s for _, s in top], reverse=True)
+    assert index.search(dialogs[3].turns[1].text, k=1, level="turn")[0][1] > .99
+
+    ids = [d.dialogId for d in dialogs[5:8]]
+    assert {i for i, _ in index.search(dialogs[3], k=5, ids=ids)} == set(ids)
+    assert dialogs[3].dialogId not in [i for i, _ in index.search(dialogs[3], exclude_ids=[dialogs[3].dialogId])]
+
+    prompt = index.get_few_shot_prompt(dialogs[3], k=2, max_tokens=10000)
+    assert "Example 2" in prompt and dialogs[3].turns[0].text in prompt
+
+
+def test_dialog_index_turnless_dialog(tmp_path):
+    register_sentence_encoder(ENCODER_NAME, HashingEncoder())
+    dialogs = [Dialog(dialogId=1, turns=[Turn(speaker="A", text="hello there")]), Dialog(dialogId=2, turns=[])]
+    index = DialogIndex.build(dialogs, str(tmp_path / "index"), model=ENCODER_NAME, batch_size=1, verbose=False)
+    assert len(index) == 2 and index.search(dialogs[0], k=1)[0][0] == 1
+    with pytest.raises(ValueError):
+        index.search(dialogs[1])  # no turns to compare
+    assert os.listdir(tmp_path) == ["index"]
+
+    def failing_dialogs():
+        yield dialogs[0]
+        raise RuntimeError("corrupted corpus")
+
+    with pytest.raises(RuntimeError):
+        DialogIndex.build(failing_dialogs(), str(tmp_path / "other"), model=ENCODER_NAME, verbose=False)
+    assert os.listdir(tmp_path) == ["index"]  # the temporary directory was removed
+
+
+def test_build_few_shot_prompt():
+    dialogs = [Dialog(turns=[Turn(speaker="A", text="hello there"), Turn(speaker="B", text="hi, how are you?")])] * 3
+    assert build_few_shot_prompt(dialogs, max_tokens=5) == ""
+    prompt = build_few_shot_prompt(dialogs, max_tokens=40)
+    assert "Example 2" in prompt and "Example 3" not in prompt
+    assert prompt.endswith("A: hello there")
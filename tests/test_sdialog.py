@@ -1,4 +1,4 @@
-from sdialog import Dialog, Turn, Event, Instruction, _get_dynamic_version
+from sdialog import Dialog, Turn, Event, Instruction, DialogState, _get_dynamic_version
 
 
 def test_turn_and_event():
@@ -57,3 +57,18 @@ def test_dialog_print(capsys):
     assert "Dialogue Begins" in out
     assert "A" in out
     assert "Hi" in out
+
+
+def test_dialog_state():
+    state = DialogState()
+    assert state.last_turn() is None
+    state.add("A", "Hi")
+    state.add(None, "Hello")
+    state.add("A", "How are you?")
+    assert len(state) == 3
+    assert state.n_turns("A") == 2
+    assert state.last_utterance("A") == "How are you?"
+    assert state.last_turn().text == "How are you?"
+    copy = state.copy()
+    copy.add(None, "Fine")
+    assert len(state) == 3 and len(copy) == 4
@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+
+from sdialog.similarity import ExactIndex, IVFIndex, get_similarity_index, top_k
+
+
+def get_embeddings(n=2000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return (centers[rng.integers(20, size=n)] + rng.normal(scale=.3, size=(n, dim))).astype(np.float32)
+
+
+def brute_force_top_k(embs, query, k):
+    sims = (embs / np.linalg.norm(embs, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+    return np.argsort(-sims)[:k]
+
+
+def test_exact_index_matches_brute_force():
+    embs = get_embeddings()
+    for dtype in ["float32", "float16"]:
+        ixs, scores = ExactIndex(embs, dtype=dtype).search(embs[7], 5)
+        assert ixs.tolist() == brute_force_top_k(embs, embs[7], 5).tolist()
+        assert scores[0] == pytest.approx(1, abs=1e-2)
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_top_k():
+    scores = np.array([.1, .9, .5, .7, .3], dtype=np.float32)
+    assert top_k(scores, 3).tolist() == [1, 3, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 4, 0]
+
+
+def test_exact_index_int8_and_zero_copy():
+    embs = get_embeddings()
+    ixs, _ = ExactIndex(embs, dtype="int8").search(embs[3], 5)
+    assert ixs[0] == 3
+    normalized = (embs / np.linalg.norm(embs, axis=1, keepdims=True)).astype(np.float16)
+    assert ExactIndex(normalized).embs is normalized
+
+
+def test_ivf_index_recall():
+    embs = get_embeddings()
+    index = get_similarity_index(embs, index="ivf", n_probe=4)
+    assert isinstance(index, IVFIndex)
+    recall = np.mean([len(set(index.search(embs[ix], 5)[0]) & set(brute_force_top_k(embs, embs[ix], 5))) / 5
+                      for ix in range(0, 2000, 100)])
+    assert recall >= .9
+
+
+def test_invalid_index():
+    with pytest.raises(ValueError):
+        get_similarity_index(get_embeddings(), index="hnsw")
+    with pytest.raises(ValueError):
+        ExactIndex(get_embeddings(), dtype="int4")
+
+
+def test_simple_response_orchestrator_ivf_index():
+    from sdialog.embeddings import register_sentence_encoder
+    from sdialog.orchestrators import SimpleResponseOrchestrator
+
+    class DummyEncoder:
+        def encode(self, texts):
+            return np.array([[text.count("price"), text.count("hello"), 1] for text in texts], dtype=float)
+
+    register_sentence_encoder("dummy-encoder-ivf", DummyEncoder())
+    orch = SimpleResponseOrchestrator(responses=["hello!", "The price is PRICE"],
+                                      sbert_model="dummy-encoder-ivf",
+                                      top_k=1,
+                                      similarity_index="ivf",
+                                      index_dtype="int8")
+    assert isinstance(orch.index, IVFIndex)
+    assert orch.index.search(DummyEncoder().encode(["price?"])[0], 1)[0].tolist() == [1]
@@ -1,6 +1,6 @@
 import pytest
 
-from sdialog.util import make_serializable
+from sdialog.util import make_serializable, count_tokens
 
 
 def test_make_serializable_dict():
@@ -15,3 +15,19 @@ def test_make_serializable_non_dict():
     lt = [1, 2, 3]
     with pytest.raises(TypeError):
         make_serializable(lt)
+
+
+def test_count_tokens():
+    assert count_tokens("hello -> world, bye!") == 7
+    assert count_tokens("a b c", tokenizer=str.split) == 3
+
+    class BOSTokenizer:  # like Hugging Face tokenizers, adds a BOS token by default
+        def encode(self, text, add_special_tokens=True):
+            return ["<s>"] * add_special_tokens + text.split()
+
+    class PlainTokenizer:  # like tiktoken, no special tokens argument
+        def encode(self, text):
+            return text.split()
+
+    assert count_tokens("a b c", tokenizer=BOSTokenizer()) == 3
+    assert count_tokens("a b c", tokenizer=PlainTokenizer()) == 3
@@ -0,0 +1,40 @@
+import pytest
+
+from sdialog import Turn
+from sdialog.personas import Persona, PersonaAgent
+from sdialog.watchdogs import DegenerationWatchdog
+
+
+def test_watchdog_invalid_action():
+    with pytest.raises(ValueError):
+        DegenerationWatchdog(action="explode")
+
+
+def test_watchdog_detection():
+    watchdog = DegenerationWatchdog(patience=1)
+    dialog = [Turn(speaker="A", text="Hi, how are you?"), Turn(speaker="B", text="Fine, thanks! And you?")]
+    assert watchdog(dialog) is None
+    dialog.append(Turn(speaker="A", text="..."))
+    assert watchdog(dialog).actionLabel == "empty"
+    dialog.append(Turn(speaker="B", text="Fine, thanks! And you?"))
+    assert watchdog(dialog).actionLabel == "repetition"
+
+
+def test_watchdog_stops_dialog(dummy_llm):
+    agent1 = PersonaAgent(dummy_llm("Goodbye, have a nice day!"), persona=Persona(name="A"), name="A")
+    agent2 = PersonaAgent(dummy_llm("Goodbye, have a nice day!"), persona=Persona(name="B"), name="B")
+    dialog = agent1.dialog_with(agent2, max_iterations=10, keep_bar=False,
+                                watchdog=DegenerationWatchdog(action="discard"))
+    assert len(dialog) == 3
+    assert dialog.discard
+    assert dialog.events[-1].action == "watchdog-discard"
+
+
+def test_watchdog_instructs_next_agent(dummy_llm):
+    agent1 = PersonaAgent(dummy_llm("Goodbye, have a nice day!"), persona=Persona(name="A"), name="A")
+    agent2 = PersonaAgent(dummy_llm("Goodbye, have a nice day!"), persona=Persona(name="B"), name="B")
+    dialog = agent1.dialog_with(agent2, max_iterations=10, keep_bar=False,
+                                watchdog=DegenerationWatchdog(action="instruct"))
+    actions = [e.action for e in dialog.events if e.action.startswith("watchdog")]
+    assert actions == ["watchdog-instruct", "watchdog-stop"]
+    assert not dialog.discard